@@ -1,32 +1,225 @@
-from flask import Flask, render_template, request, session, jsonify, url_for, send_file, redirect
-from flask_socketio import SocketIO, emit, disconnect
-import qrcode
-import io
+from flask import Flask, render_template, request, session, jsonify, url_for, redirect, Response, g
+from flask_socketio import SocketIO, emit, disconnect, join_room, leave_room
+import functools
+import inspect
 import os
+import time
 from datetime import datetime, timedelta
 import secrets
 import database as db
+import metrics
+from logs import get_logger
+from broadcast import BroadcastScheduler
+from session_store import create_session_store
+import qr_cache
+import backups
+from offload import Offloader, HubMonitor
+from history import ScoreHistory
+from payload_cache import Encoded, PayloadCache, WireJSON, GZIP_MIN_BYTES
+import wire_format
+from rate_limit import RateLimiter, parse_limits, scale_limits
+
+log = get_logger('app')
+
+STARTUP_BEGAN = time.perf_counter()
 
 # Initialize Flask app
 app = Flask(__name__)
-app.config['SECRET_KEY'] = secrets.token_hex(16)
 
 # Configure persistent session cookies (7 days)
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 
+# Scale-out mode: several workers behind a load balancer with sticky
+# sessions share the database and fan Socket.IO emits out through a message
+# queue (e.g. redis://localhost:6379/0). Only the worker with WORKER_ID 0
+# broadcasts leaderboard patches, so clients see a single sequence.
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+SCALE_OUT = os.environ.get('SCALE_OUT', '1' if SOCKETIO_MESSAGE_QUEUE else '0') == '1'
+WORKER_ID = int(os.environ.get('WORKER_ID', '0'))
+IS_BROADCAST_LEADER = WORKER_ID == 0
+
 # Initialize SocketIO with CORS enabled
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='eventlet')
+socketio = SocketIO(
+    app,
+    cors_allowed_origins="*",
+    async_mode='eventlet',
+    message_queue=SOCKETIO_MESSAGE_QUEUE,
+    json=WireJSON
+)
+
+# Behind PROXY_COUNT reverse proxies, take the client address from
+# X-Forwarded-For so per-IP rate limits see players rather than the proxy
+PROXY_COUNT = int(os.environ.get('PROXY_COUNT', '0'))
+if PROXY_COUNT:
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_COUNT)
 
 # Configuration
 HOST = '0.0.0.0'
-PORT = 8080  # Using port 8080 to avoid conflicts
+PORT = int(os.environ.get('PORT', '8080'))  # Using port 8080 to avoid conflicts
 DEBUG = True
 
-# Simple in-memory session store for team associations
-# Format: {session_id: team_id}
-session_teams = {}
+# Host players use to reach the server (e.g. 192.168.1.20:8080). When set,
+# the join QR code is rendered at startup instead of on the first request.
+PUBLIC_HOST = os.environ.get('PUBLIC_HOST')
+
+# Leaderboard broadcasts are coalesced: at most one every BROADCAST_INTERVAL
+# seconds, and no change waits longer than BROADCAST_MAX_LATENCY seconds
+BROADCAST_INTERVAL = float(os.environ.get('BROADCAST_INTERVAL', '0.1'))
+BROADCAST_MAX_LATENCY = float(os.environ.get('BROADCAST_MAX_LATENCY', '0.5'))
+
+# Session -> team store: 'sqlite' (default, survives restarts and is shared
+# between workers), 'memory' or 'redis'
+SESSION_STORE = os.environ.get('SESSION_STORE', 'sqlite')
+SESSION_TTL = int(os.environ.get('SESSION_TTL', str(7 * 24 * 3600)))
+SESSION_MAX_ENTRIES = int(os.environ.get('SESSION_MAX_ENTRIES', '10000'))
+
+session_teams = create_session_store(
+    SESSION_STORE,
+    ttl=SESSION_TTL,
+    max_entries=SESSION_MAX_ENTRIES,
+    redis_url=os.environ.get('REDIS_URL')
+)
+
+if SCALE_OUT and SESSION_STORE == 'memory':
+    log.warning('memory_session_store_not_shared', hint='use SESSION_STORE=sqlite or redis')
+
+# SQLite and Pillow calls made from handlers run on native threads so they
+# don't stall the eventlet hub; hub_monitor reports any stalls that remain
+offloader = Offloader()
+hub_monitor = HubMonitor(socketio)
+
+# Token buckets on Socket.IO events, per session and per client IP. The
+# per-IP limits are RATE_LIMIT_IP_MULTIPLIER times the session ones, so a
+# room of phones behind one NAT still fits; 0 turns them off. Events over
+# either limit are dropped, never queued. RATE_LIMITS overrides the
+# defaults in rate_limit.py, e.g. "increment_score=20/40,join_game=0".
+RATE_LIMITS = parse_limits(os.environ.get('RATE_LIMITS'))
+RATE_LIMIT_IP_MULTIPLIER = float(os.environ.get('RATE_LIMIT_IP_MULTIPLIER', '10'))
+RATE_LIMIT_MAX_BUCKETS = int(os.environ.get('RATE_LIMIT_MAX_BUCKETS', '10000'))
+session_limiter = RateLimiter(RATE_LIMITS, max_buckets=RATE_LIMIT_MAX_BUCKETS)
+ip_limiter = RateLimiter(scale_limits(RATE_LIMITS, RATE_LIMIT_IP_MULTIPLIER), max_buckets=RATE_LIMIT_MAX_BUCKETS)
+
+# Prometheus metrics served at /metrics
+SOCKET_EVENTS = metrics.registry.counter(
+    'scoreboard_socketio_events_total', 'Socket.IO events handled',
+    labels=('event', 'outcome')
+)
+SOCKET_EVENT_SECONDS = metrics.registry.histogram(
+    'scoreboard_socketio_event_seconds', 'Socket.IO handler duration', labels=('event',)
+)
+HTTP_REQUESTS = metrics.registry.counter(
+    'scoreboard_http_requests_total', 'HTTP requests served',
+    labels=('route', 'method', 'status')
+)
+HTTP_REQUEST_SECONDS = metrics.registry.histogram(
+    'scoreboard_http_request_seconds', 'HTTP request duration', labels=('route',)
+)
+RATE_LIMITED = metrics.registry.counter(
+    'scoreboard_socketio_rate_limited_total', 'Socket.IO events dropped by a rate limit',
+    labels=('event', 'scope')
+)
+CONNECTED_CLIENTS = metrics.registry.gauge(
+    'scoreboard_connected_clients', 'Socket.IO clients connected to this worker'
+)
+BROADCAST_BYTES = metrics.registry.histogram(
+    'scoreboard_broadcast_payload_bytes', 'Size of leaderboard broadcasts in bytes',
+    labels=('type', 'format'), buckets=metrics.SIZE_BUCKETS
+)
+BROADCAST_SECONDS = metrics.registry.histogram(
+    'scoreboard_broadcast_fanout_seconds', 'Time to hand a leaderboard broadcast to every client',
+    labels=('type', 'format')
+)
+metrics.registry.gauge('scoreboard_teams', 'Teams in live games', fn=lambda: len(db.leaderboards))
+metrics.registry.gauge('scoreboard_live_games', 'Games with a leaderboard in memory',
+                       fn=lambda: len(db.leaderboards.games()))
+metrics.registry.gauge('scoreboard_offload_pending', 'Blocking calls waiting for a thread',
+                       fn=lambda: offloader.pending)
+metrics.registry.counter('scoreboard_offload_calls_total', 'Blocking calls run on threads',
+                         fn=lambda: offloader.calls)
+metrics.registry.counter('scoreboard_offload_rejected_total', 'Blocking calls turned away as overloaded',
+                         fn=lambda: offloader.rejected)
+metrics.registry.counter('scoreboard_hub_stalls_total', 'Event loop stalls above the threshold',
+                         fn=lambda: hub_monitor.stalls)
+metrics.registry.gauge('scoreboard_hub_max_lag_seconds', 'Longest event loop stall seen',
+                       fn=lambda: hub_monitor.max_lag)
+metrics.registry.counter('scoreboard_payload_cache_hits_total', 'Leaderboard payloads served already encoded',
+                         fn=lambda: payloads.hits)
+metrics.registry.counter('scoreboard_payload_cache_misses_total', 'Leaderboard payloads encoded',
+                         fn=lambda: payloads.misses)
+metrics.registry.gauge('scoreboard_rate_limit_buckets', 'Rate limit buckets held in memory',
+                       fn=lambda: len(session_limiter) + len(ip_limiter))
+metrics.registry.counter('scoreboard_rate_limit_evictions_total', 'Idle rate limit buckets evicted',
+                         fn=lambda: session_limiter.evicted + ip_limiter.evicted)
+metrics.registry.counter('scoreboard_broadcast_flushes_total', 'Coalesced leaderboard broadcasts sent',
+                         fn=lambda: broadcaster.flushes)
+metrics.registry.counter('scoreboard_broadcast_mutations_total', 'Leaderboard changes fed to the broadcaster',
+                         fn=lambda: broadcaster.mutations)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=str(response.status_code))
+    if 'request_start' in g:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.request_start, route=route)
+    return response
+
+def rate_limit_over(event):
+    """``(scope, seconds to wait)`` if the current event is over a rate limit, else None."""
+    for scope, limiter, key in (('session', session_limiter, session.get('session_id') or request.sid),
+                                ('ip', ip_limiter, request.remote_addr)):
+        if not limiter.allow(event, key):
+            return scope, limiter.retry_after(event, key)
+    return None
+
+def on_event(event):
+    """``socketio.on`` that also counts and times the handler.
+
+    The outcome is 'error' when the handler answered with ``emit_error``,
+    'exception' when it raised and 'rate_limited' when the event was
+    dropped without running it. A dropped connect refuses the connection;
+    any other event is answered with ``rate_limited`` and how long to wait.
+    """
+    def decorator(handler):
+        # Drop arguments the handler doesn't take (e.g. connect's auth), as
+        # Flask-SocketIO does for undecorated handlers
+        accepts = len(inspect.signature(handler).parameters)
+
+        @functools.wraps(handler)
+        def wrapper(*args):
+            over = rate_limit_over(event) if event != 'disconnect' else None
+            if over:
+                scope, retry_after = over
+                RATE_LIMITED.inc(event=event, scope=scope)
+                SOCKET_EVENTS.inc(event=event, outcome='rate_limited')
+                if event == 'connect':
+                    return False
+                emit('rate_limited', {'event': event, 'retry_after': round(retry_after, 2)})
+                return None
+            g.event_outcome = 'ok'
+            start = time.perf_counter()
+            try:
+                return handler(*args[:accepts])
+            except Exception:
+                g.event_outcome = 'exception'
+                raise
+            finally:
+                SOCKET_EVENT_SECONDS.observe(time.perf_counter() - start, event=event)
+                SOCKET_EVENTS.inc(event=event, outcome=g.event_outcome)
+        return socketio.on(event)(wrapper)
+    return decorator
+
+def emit_error(message):
+    """Send an error to the client behind the current event."""
+    g.event_outcome = 'error'
+    emit('error', {'message': message})
+
 
 def get_session_id():
     """Get or create a session ID for the current request."""
@@ -38,40 +231,330 @@ def get_session_id():
 def get_team_for_session():
     """Get team ID for current session."""
     session_id = get_session_id()
-    return session_teams.get(session_id)
+    # Most lookups hit the store's memory cache; only misses need a thread
+    team_id = session_teams.cached(session_id)
+    if team_id is None:
+        team_id = offloader.run(session_teams.get, session_id)
+    return team_id
 
 def set_team_for_session(team_id):
     """Set team ID for current session."""
     session_id = get_session_id()
-    session_teams[session_id] = team_id
-    print(f"STORED: session_id {session_id} -> team_id {team_id}")
+    offloader.run(session_teams.set, session_id, team_id)
+    log.debug('session_stored', sample=True, session_id=session_id, team_id=team_id)
 
 def clear_team_for_session():
     """Clear team for current session."""
     session_id = get_session_id()
-    if session_id in session_teams:
-        del session_teams[session_id]
-        print(f"CLEARED: session_id {session_id}")
+    offloader.run(session_teams.delete, session_id)
+    log.debug('session_cleared', session_id=session_id)
 
 def get_join_url():
     """Get the join URL for QR code generation."""
-    return f"http://{request.host}/join"
-
-def emit_leaderboard_update():
-    """Emit leaderboard update to all connected clients."""
-    teams = db.get_all_teams()
-    socketio.emit('leaderboard_update', {'teams': teams})
+    game_id = request.args.get('game')
+    return f"http://{request.host}/join" + (f"?game={game_id}" if game_id else "")
+
+def requested_game():
+    """The live game an HTTP request is for: ?game=<id>, else the active game.
+
+    None if the game asked for doesn't exist or has been archived.
+    """
+    game_id = request.args.get('game') or db.get_active_game_id()
+    return game_id if db.is_live_game(game_id) else None
+
+def session_game():
+    """The game this socket was put on when it connected."""
+    return session.get('game_id')
+
+# Socket.IO rooms. Every socket is on one game (see handle_connect) and
+# only joins that game's rooms, so a broadcast reaches that game's clients
+# and costs nothing for the others. Pages pass the view they show in the
+# connection's auth data and are put in its rooms: leaderboard patches go to
+# 'display', top-teams lists to 'players' (the player pages) and 'scan' (the
+# /scan page), lock changes to 'players' and 'admin', and a team's own
+# updates to its 'team:<id>' room. Clients that don't say which view they
+# are get the full leaderboard.
+VIEW_ROOMS = {
+    'display': ('display',),
+    'admin': ('display', 'admin'),
+    'player': ('players',),
+    'scan': ('scan',)
+}
+
+# Leaderboard patches and snapshots go to one display room per wire format
+# (see wire_format.py); clients pick theirs with 'format' in the auth data
+DISPLAY_ROOMS = {'json': 'display', 'compact': 'display:compact'}
+
+# Teams shown on the player pages' mini leaderboard, and on /scan's
+PLAYER_TOP_TEAMS = 5
+SCAN_TOP_TEAMS = 10
+# Rooms sent a top-teams list, and how many teams each shows
+TOP_TEAMS_ROOMS = {'players': PLAYER_TOP_TEAMS, 'scan': SCAN_TOP_TEAMS}
+# Largest top-N list and neighbours per side a socket client may ask for
+MAX_TOP_TEAMS = 100
+MAX_WINDOW = 25
+
+# Sockets that didn't ask for a game follow the active one and are told
+# when it changes; admins hear about every change to the list of games
+ACTIVE_GAME_ROOM = 'active-game'
+ADMINS_ROOM = 'admins'
+
+def game_room(game_id, room):
+    return f'game:{game_id}:{room}'
+
+def all_game_rooms(game_id):
+    return [game_room(game_id, room) for room in (*DISPLAY_ROOMS.values(), *TOP_TEAMS_ROOMS, 'admin')]
+
+def team_room(team_id):
+    return f'team:{team_id}'
+
+def team_payload(team):
+    return {
+        'team_id': team['id'],
+        'team_name': team['name'],
+        'score': team['score']
+    }
+
+def emit_team_data(team):
+    """Send a team's name and score to every device playing as it."""
+    # A no-op for sockets already in the room; covers clients that connected
+    # before they had a team
+    join_room(team_room(team['id']))
+    socketio.emit('team_data', team_payload(team), to=team_room(team['id']))
+
+# Leaderboard payloads encoded once per state version and reused by every
+# emit and HTTP response until the next change
+payloads = PayloadCache()
+
+def cached_json_response(encoded):
+    """Serve a cached payload with its ETag: a 304 if the client has it, gzipped if it accepts that.
+
+    The gzipped body is a different representation, so its strong ETag
+    gets a '-gz' suffix.
+    """
+    use_gzip = 'gzip' in request.accept_encodings and len(encoded) >= GZIP_MIN_BYTES
+    etag = encoded.etag + '-gz' if use_gzip else encoded.etag
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    elif use_gzip:
+        response = Response(encoded.gzipped, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(encoded.body, mimetype='application/json')
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    # Cacheable, but always revalidated so a change shows up immediately
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Sequence number of the last leaderboard broadcast, per game. Clients
+# track it to detect missed patches and fall back to a full snapshot. In
+# scale-out mode the leader publishes it in the database so it survives
+# restarts and other workers can tag their snapshots with it.
+leaderboard_seqs = {}
+
+def seq_setting(game_id):
+    return f'leaderboard_seq:{game_id}'
+
+def get_leaderboard_seq(game_id):
+    if game_id not in leaderboard_seqs:
+        leaderboard_seqs[game_id] = int(offloader.run(db.get_setting, seq_setting(game_id), 0)) if SCALE_OUT else 0
+    return leaderboard_seqs[game_id]
+
+def next_leaderboard_seq(game_id):
+    """Advance a game's broadcast sequence and share it with the other workers."""
+    seq = leaderboard_seqs[game_id] = get_leaderboard_seq(game_id) + 1
+    if SCALE_OUT:
+        offloader.run(db.set_setting, seq_setting(game_id), seq)
+    return seq
+
+def leaderboard_snapshot(game_id, fmt='json'):
+    """A game's full leaderboard payload tagged with its current sequence number.
+
+    Encoded once per (leaderboard version, seq) and wire format, and shared
+    by every client that asks until the next change.
+    """
+    if SCALE_OUT and not IS_BROADCAST_LEADER:
+        # Read the leader's sequence first, then catch up with the database,
+        # so the snapshot holds at least every change broadcast up to seq
+        seq = int(offloader.run(db.get_setting, seq_setting(game_id), 0))
+        offloader.run(db.sync_from_peers)
+    else:
+        seq = get_leaderboard_seq(game_id)
+    # Read the version before the teams: a change landing in between is
+    # then rebuilt on the next call rather than hidden under the new version
+    version = (db.get_leaderboard_version(game_id), seq)
+
+    def build():
+        payload = {'teams': db.get_all_teams(game_id), 'seq': seq}
+        return wire_format.compact_snapshot(payload) if fmt == 'compact' else payload
+    return payloads.get(f'snapshot:{game_id}:{fmt}', version, build)
+
+def broadcast_to_display(game_id, event, kind, encoded_by_format):
+    """Emit one encoding of a leaderboard broadcast to each format's room of a game."""
+    for fmt, encoded in encoded_by_format.items():
+        BROADCAST_BYTES.observe(len(encoded), type=kind, format=fmt)
+        with BROADCAST_SECONDS.time(type=kind, format=fmt):
+            socketio.emit(event, encoded, to=game_room(game_id, DISPLAY_ROOMS[fmt]))
+
+def patch_row(team):
+    """The fields clients need to place a changed team on the board."""
+    return {
+        'id': team['id'],
+        'name': team['name'],
+        'score': team['score'],
+        'is_locked': bool(team.get('is_locked', False)),
+        'created_at': team['created_at'],
+        'rank': db.get_rank(team['id'])
+    }
+
+def emit_leaderboard_update(game_id, changed_ids=(), removed_ids=()):
+    """Broadcast only the teams of a game that changed since its last update."""
+    rows = []
+    for team_id in changed_ids:
+        team = db.get_team_by_id(team_id)
+        if team:
+            rows.append(patch_row(team))
+
+    seq = next_leaderboard_seq(game_id)
+    payload = {
+        'base': seq - 1,
+        'seq': seq,
+        'teams': rows,
+        'removed': list(removed_ids)
+    }
+    # Encoded once here rather than once per client by python-socketio
+    broadcast_to_display(game_id, 'leaderboard_patch', 'patch', {
+        'json': Encoded(payload),
+        'compact': Encoded(wire_format.compact_patch(payload))
+    })
+
+def emit_leaderboard_snapshot(game_id):
+    """Broadcast a game's full leaderboard (used when the whole board changes)."""
+    next_leaderboard_seq(game_id)
+    broadcast_to_display(game_id, 'leaderboard_update', 'snapshot', {
+        fmt: leaderboard_snapshot(game_id, fmt) for fmt in wire_format.FORMATS
+    })
+
+# Top teams last sent to each (game, top-teams room)
+last_top_teams = {}
+
+def board_row(team):
+    """The fields a mini leaderboard shows for one ranked team."""
+    return {'id': team['id'], 'name': team['name'], 'score': team['score'], 'rank': team['rank']}
+
+def top_teams(game_id, n=PLAYER_TOP_TEAMS):
+    return [board_row(team) for team in db.get_top_teams(n, game_id)]
+
+def emit_top_teams(game_id):
+    """Update a game's top-teams lists, each only if it changed."""
+    teams = top_teams(game_id, max(TOP_TEAMS_ROOMS.values()))
+    for room, n in TOP_TEAMS_ROOMS.items():
+        top = teams[:n]
+        if top == last_top_teams.get((game_id, room)):
+            continue
+        last_top_teams[(game_id, room)] = top
+        encoded = Encoded({'teams': top})
+        BROADCAST_BYTES.observe(len(encoded), type='top', format='json')
+        with BROADCAST_SECONDS.time(type='top', format='json'):
+            socketio.emit('leaderboard_top', encoded, to=game_room(game_id, room))
+
+def flush_leaderboard(game_id, changed_ids, removed_ids, full):
+    """Send one broadcast covering every change to a game coalesced by the scheduler."""
+    if not IS_BROADCAST_LEADER:
+        return  # The leader picks this worker's writes up via sync_from_peers
+    if full:
+        emit_leaderboard_snapshot(game_id)
+    else:
+        emit_leaderboard_update(game_id, changed_ids, removed_ids)
+    emit_top_teams(game_id)
+
+def forget_game(game_id):
+    """Drop the broadcast state kept for a game once it's archived."""
+    leaderboard_seqs.pop(game_id, None)
+    for room in TOP_TEAMS_ROOMS:
+        last_top_teams.pop((game_id, room), None)
+    payloads.discard(*(f'top:{game_id}:{room}' for room in TOP_TEAMS_ROOMS), f'teams:{game_id}',
+                     *(f'snapshot:{game_id}:{fmt}' for fmt in wire_format.FORMATS))
+
+broadcaster = BroadcastScheduler(
+    socketio,
+    flush_leaderboard,
+    interval=BROADCAST_INTERVAL,
+    max_latency=BROADCAST_MAX_LATENCY,
+    poll=(lambda: offloader.run(db.sync_from_peers)) if SCALE_OUT else None
+)
+
+# Score rollups for /api/history, read incrementally from the score event log
+# every HISTORY_INTERVAL seconds
+score_history = ScoreHistory()
+HISTORY_INTERVAL = float(os.environ.get('HISTORY_INTERVAL', '1'))
+
+backup_task = None
+history_task = None
+
+def run_backup():
+    """Take an online backup on a worker thread so the hub keeps serving."""
+    result = offloader.run(backups.create_backup)
+    log.info('backup_written', path=result['path'], bytes=result['bytes'], seconds=result['seconds'])
+    return result
+
+def backup_loop():
+    while True:
+        socketio.sleep(backups.BACKUP_INTERVAL)
+        try:
+            run_backup()
+        except Exception as e:
+            log.error('scheduled_backup_failed', error=str(e))
+
+def history_loop():
+    while True:
+        try:
+            offloader.run(score_history.catch_up)
+        except Exception as e:
+            log.error('history_catch_up_failed', error=str(e))
+        socketio.sleep(HISTORY_INTERVAL)
+
+def init_app():
+    """Prepare the database and the app before serving; returns the database report.
+
+    Importing this module touches neither: scripts and benchmarks that
+    import it call this first, and so does ``__main__``.
+    """
+    # Migrate the schema (a single PRAGMA when it's current) and load the
+    # leaderboards before anything reads settings
+    report = db.init_database()
+    # The key signs session cookies, so it must survive restarts and be the
+    # same in every worker. It is stored in the database unless SECRET_KEY is set.
+    app.config['SECRET_KEY'] = (
+        os.environ.get('SECRET_KEY') or db.get_or_create_setting('secret_key', secrets.token_hex(16))
+    )
+    return report
+
+def start_background_tasks():
+    """Start tasks that must run even before the first client connects."""
+    global backup_task, history_task
+    hub_monitor.start()
+    if history_task is None:
+        history_task = socketio.start_background_task(history_loop)
+    if SCALE_OUT:
+        broadcaster.start()
+    # One process is enough to back up the shared database
+    if backups.BACKUP_INTERVAL > 0 and IS_BROADCAST_LEADER and backup_task is None:
+        backup_task = socketio.start_background_task(backup_loop)
+
+# Pages show the game in ?game=<id>, or the active game without one
 
 @app.route('/')
 def index():
     """Main leaderboard page."""
-    return render_template('leaderboard.html')
+    return render_template('leaderboard.html', game_id=request.args.get('game'))
 
 @app.route('/scan')
 def scan():
     """Scan page with QR code and mini leaderboard."""
     join_url = get_join_url()
-    return render_template('scan.html', join_url=join_url)
+    return render_template('scan.html', join_url=join_url, game_id=request.args.get('game'))
 
 @app.route('/join')
 def join():
@@ -79,21 +562,21 @@ def join():
     # Check if user already has a team in session
     team_id = get_team_for_session()
     session_id = get_session_id()
-    print(f"JOIN ROUTE: session_id: {session_id}, team_id: {team_id}")
+    log.debug('join_page', sample=True, session_id=session_id, team_id=team_id)
 
     if team_id:
         # Verify team still exists
         team = db.get_team_by_id(team_id)
         if team:
             # User has an active team, redirect to edit page
-            print(f"JOIN ROUTE: Redirecting to edit - user has team {team_id}")
+            log.debug('join_redirect_to_edit', team_id=team_id)
             return redirect(url_for('edit'))
         else:
             # Team was deleted, clear session
-            print(f"JOIN ROUTE: Team {team_id} not found, clearing session")
+            log.info('session_team_missing', route='join', team_id=team_id)
             clear_team_for_session()
 
-    return render_template('join.html')
+    return render_template('join.html', game_id=request.args.get('game'))
 
 @app.route('/edit')
 def edit():
@@ -101,65 +584,147 @@ def edit():
     # Check if user has a team in session
     team_id = get_team_for_session()
     session_id = get_session_id()
-    print(f"EDIT ROUTE: session_id: {session_id}, team_id: {team_id}")
+    log.debug('edit_page', sample=True, session_id=session_id, team_id=team_id)
 
     if not team_id:
         # No team in session, redirect to join
-        print("EDIT ROUTE: No team_id in session, redirecting to join")
-        return redirect(url_for('join'))
+        log.debug('edit_redirect_to_join', session_id=session_id)
+        return redirect(url_for('join', game=request.args.get('game')))
 
     # Verify team still exists
     team = db.get_team_by_id(team_id)
     if not team:
         # Team was deleted, clear session and redirect to join
-        print(f"EDIT ROUTE: Team {team_id} not found, clearing session")
+        log.info('session_team_missing', route='edit', team_id=team_id)
         clear_team_for_session()
-        return redirect(url_for('join'))
+        return redirect(url_for('join', game=request.args.get('game')))
 
-    print(f"EDIT ROUTE: Rendering edit page for team {team['name']} (id: {team_id})")
-    return render_template('edit.html', team=team)
+    return render_template('edit.html', team=team, game_id=team['game_id'])
 
 @app.route('/admin')
 def admin():
     """Admin panel for managing teams and scores."""
-    return render_template('admin.html')
+    return render_template('admin.html', game_id=request.args.get('game'))
 
 @app.route('/qr')
 def qr_code():
-    """Generate QR code for joining the game."""
+    """Generate QR code for joining the game (?size=2-40, ?format=png|svg)."""
     join_url = get_join_url()
+    box_size = qr_cache.parse_box_size(request.args.get('size'))
+    fmt = request.args.get('format', 'png').lower()
+    if fmt not in qr_cache.FORMATS:
+        return jsonify({'error': 'format must be png or svg'}), 400
 
-    # Create QR code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-    qr.add_data(join_url)
-    qr.make(fit=True)
-
-    # Create QR code image
-    img = qr.make_image(fill_color="black", back_color="white")
+    body, mimetype, etag = offloader.run(qr_cache.render_qr, join_url, box_size, fmt)
 
-    # Save to BytesIO
-    img_io = io.BytesIO()
-    img.save(img_io, 'PNG')
-    img_io.seek(0)
+    # Let browsers keep the image and revalidate it with a cheap 304
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
 
-    return send_file(img_io, mimetype='image/png')
+def game_not_found():
+    return jsonify({'error': 'Game not found'}), 404
 
 @app.route('/api/stats')
 def api_stats():
-    """API endpoint for database statistics."""
-    stats = db.get_database_stats()
-    return jsonify(stats)
+    """API endpoint for a game's statistics (?game=, the active game by default)."""
+    game_id = requested_game()
+    if game_id is None:
+        return game_not_found()
+    return jsonify(dict(db.get_database_stats(game_id), game_id=game_id))
+
+@app.route('/api/games')
+def api_games():
+    """Every game, live and archived, with team counts; the active one is flagged."""
+    return jsonify({'games': offloader.run(db.get_games), 'active_game_id': db.get_active_game_id()})
+
+@app.route('/api/games/<game_id>/results')
+def api_game_results(game_id):
+    """Final standings of an archived game (live games: /api/teams?game=)."""
+    games = offloader.run(db.get_games)
+    game = next((game for game in games if game['id'] == game_id and game['archived_at']), None)
+    if game is None:
+        return game_not_found()
+    return jsonify({'game': game, 'teams': offloader.run(db.get_archived_teams, game_id)})
+
+@app.route('/healthz')
+def healthz():
+    """Liveness check for Docker; doesn't touch the database."""
+    return jsonify({'status': 'ok'})
+
+@app.route('/api/hub-stats')
+def api_hub_stats():
+    """API endpoint for event loop blocking and offloaded-call metrics."""
+    return jsonify({'hub': hub_monitor.stats(), 'offload': offloader.stats()})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint for this worker."""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/broadcast-stats')
+def api_broadcast_stats():
+    """API endpoint for leaderboard broadcast coalescing metrics."""
+    return jsonify(broadcaster.stats())
+
+@app.route('/api/history')
+def api_history():
+    """Score history per team of a game (?game=, ?window=seconds, ?resolution=5|30|300, ?limit=top N teams)."""
+    game_id = requested_game()
+    if game_id is None:
+        return game_not_found()
+    window = request.args.get('window', 900, type=float)
+    resolution = request.args.get('resolution', type=int)
+    limit = request.args.get('limit', type=int)
+    if resolution is not None and resolution not in score_history.resolutions:
+        return jsonify({'error': f'resolution must be one of {score_history.resolutions}'}), 400
+    if window <= 0:
+        return jsonify({'error': 'window must be positive'}), 400
+
+    if not score_history.loaded:
+        return jsonify({'error': 'Score history is still loading'}), 503
+
+    teams = db.get_top_teams(limit, game_id) if limit else db.get_all_teams(game_id)
+    history = offloader.run(score_history.series, [team['id'] for team in teams], window, resolution)
+    history['names'] = [team['name'] for team in teams]
+    return jsonify(history)
 
 @app.route('/api/teams')
 def api_teams():
-    """API endpoint for getting all teams."""
-    teams = db.get_all_teams()
-    return jsonify({'teams': teams})
+    """A game's teams (?game=, the active game by default), or the top ?limit=N,
+    and/or ?around=<team id> with ?k= neighbours per side (just that window
+    unless ?limit is given too)."""
+    game_id = requested_game()
+    if game_id is None:
+        return game_not_found()
+    limit = request.args.get('limit', type=int)
+    around = request.args.get('around')
+    k = request.args.get('k', 2, type=int)
+    if (limit is not None and limit < 1) or not 0 <= k <= MAX_WINDOW:
+        return jsonify({'error': f'limit must be positive and k between 0 and {MAX_WINDOW}'}), 400
+
+    if not limit and not around:
+        # The common poll: served from the cache, usually as a 304
+        return cached_json_response(payloads.get(
+            f'teams:{game_id}', db.get_leaderboard_version(game_id),
+            lambda: {'teams': db.get_all_teams(game_id)}
+        ))
+
+    result = {'teams': db.get_top_teams(limit, game_id)} if limit else {}
+    if around:
+        window = db.get_window(around, k) if db.get_team_game(around) == game_id else None
+        if window is None:
+            return jsonify({'error': 'Team not found'}), 404
+        result['around'] = {
+            'team_id': around,
+            'team_count': len(db.leaderboards.board(game_id)),
+            'teams': window
+        }
+    return jsonify(result)
 
 @app.route('/api/my-team')
 def api_my_team():
@@ -174,7 +739,8 @@ def api_my_team():
                     'id': team['id'],
                     'name': team['name'],
                     'score': team['score'],
-                    'is_locked': bool(team.get('is_locked', False))
+                    'is_locked': bool(team.get('is_locked', False)),
+                    'game_id': team['game_id']
                 }
             })
         else:
@@ -184,24 +750,97 @@ def api_my_team():
     return jsonify({'success': False, 'message': 'No team in session'})
 
 # WebSocket Events
-@socketio.on('connect')
-def handle_connect():
-    """Handle client connection."""
-    print(f"Client connected: {request.sid}")
-    emit('connected', {'message': 'Successfully connected to the game server'})
+@on_event('connect')
+def handle_connect(auth=None):
+    """Handle client connection and subscribe it to its game's and view's rooms.
+
+    A player with a team is on its team's game; anyone else is on the game
+    in the auth data, or follows the active game if there is none.
+    """
+    start_background_tasks()
+    CONNECTED_CLIENTS.inc()
+    auth = auth if isinstance(auth, dict) else {}
+    view = auth.get('view')
+    fmt = auth.get('format') if auth.get('format') in wire_format.FORMATS else 'json'
+    session['wire_format'] = fmt
+    team_id = get_team_for_session() if view == 'player' else None
+    game_id = db.get_team_game(team_id) or auth.get('game')
+    if not game_id:
+        game_id = db.get_active_game_id()
+        join_room(ACTIVE_GAME_ROOM)
+    if view == 'admin':
+        join_room(ADMINS_ROOM)
+    if not db.is_live_game(game_id):
+        session['game_id'] = None
+        emit_error('Game not found')
+        return
+    session['game_id'] = game_id
 
-@socketio.on('disconnect')
+    if team_id:
+        join_room(team_room(team_id))
+    for room in VIEW_ROOMS.get(view, VIEW_ROOMS['display']):
+        join_room(game_room(game_id, DISPLAY_ROOMS[fmt] if room == 'display' else room))
+        if room in TOP_TEAMS_ROOMS:
+            emit('leaderboard_top', payloads.get(
+                f'top:{game_id}:{room}', db.get_leaderboard_version(game_id),
+                lambda: {'teams': top_teams(game_id, TOP_TEAMS_ROOMS[room])}
+            ))
+    log.debug('client_connected', sid=request.sid, view=view, format=fmt, game_id=game_id)
+    emit('connected', {'message': 'Successfully connected to the game server', 'game_id': game_id})
+
+@on_event('disconnect')
 def handle_disconnect():
     """Handle client disconnection."""
-    print(f"Client disconnected: {request.sid}")
+    CONNECTED_CLIENTS.dec()
+    log.debug('client_disconnected', sid=request.sid)
 
-@socketio.on('request_leaderboard')
+@on_event('request_leaderboard')
 def handle_request_leaderboard():
-    """Send current leaderboard to requesting client."""
-    teams = db.get_all_teams()
-    emit('leaderboard_update', {'teams': teams})
+    """Send the current leaderboard of the socket's game to the requesting client."""
+    game_id = session_game()
+    if game_id is None:
+        emit_error('Game not found')
+        return
+    emit('leaderboard_update', leaderboard_snapshot(game_id, session.get('wire_format', 'json')))
+
+@on_event('request_top_teams')
+def handle_request_top_teams(data=None):
+    """Send the requesting client the top teams of its game (?limit, default 5)."""
+    limit = (data or {}).get('limit', PLAYER_TOP_TEAMS)
+    if not isinstance(limit, int) or not 1 <= limit <= MAX_TOP_TEAMS:
+        emit_error(f'limit must be between 1 and {MAX_TOP_TEAMS}')
+        return
+    game_id = session_game()
+    if game_id is None:
+        emit_error('Game not found')
+        return
+    emit('leaderboard_top', {'teams': top_teams(game_id, limit)})
+
+@on_event('request_team_window')
+def handle_request_team_window(data=None):
+    """Send a team's rank and its neighbours (the session's team by default)."""
+    data = data or {}
+    k = data.get('k', 2)
+    if not isinstance(k, int) or not 0 <= k <= MAX_WINDOW:
+        emit_error(f'k must be between 0 and {MAX_WINDOW}')
+        return
+
+    team_id = data.get('team_id') or get_team_for_session()
+    if not team_id:
+        emit_error('No team in session')
+        return
+
+    window = db.get_window(team_id, k)
+    if window is None:
+        emit_error('Team not found')
+        return
+    emit('team_window', {
+        'team_id': team_id,
+        'team_count': len(db.leaderboards.board(db.get_team_game(team_id))),
+        'teams': [board_row(team) for team in window]
+    })
 
-@socketio.on('join_game')
+@on_event('join_game')
 def handle_join_game(data):
     """Handle player joining the game."""
     # Check if user already has a team in session
@@ -209,7 +848,7 @@ def handle_join_game(data):
     if existing_team_id:
         existing_team = db.get_team_by_id(existing_team_id)
         if existing_team:
-            emit('error', {'message': 'You already have a team! Please refresh the page.'})
+            emit_error('You already have a team! Please refresh the page.')
             return
         else:
             # Team was deleted, clear session
@@ -218,29 +857,32 @@ def handle_join_game(data):
     team_name = data.get('team_name', '').strip()
 
     if not team_name:
-        emit('error', {'message': 'Team name is required'})
+        emit_error('Team name is required')
         return
 
     if len(team_name) > 50:
-        emit('error', {'message': 'Team name must be 50 characters or less'})
+        emit_error('Team name must be 50 characters or less')
         return
 
-    # Check if team name already exists
-    if db.team_name_exists(team_name):
-        emit('error', {'message': 'Team name already exists. Please choose a different name.'})
+    game_id = session_game()
+    if game_id is None:
+        emit_error('Game not found')
         return
 
     try:
         # Create new team
-        team = db.create_team(team_name)
+        team = offloader.run(db.create_team, team_name, game_id)
 
         # Verify team was created successfully
         if not team or 'id' not in team:
-            emit('error', {'message': 'Failed to create team. Please try again.'})
+            emit_error('Failed to create team. Please try again.')
             return
 
         # Store team ID in session using our session store
         set_team_for_session(team['id'])
+        join_room(team_room(team['id']))
+        # Now on the team's game for good, even if the active game changes
+        leave_room(ACTIVE_GAME_ROOM)
 
         # Emit success with redirect instruction
         emit('team_joined', {
@@ -250,134 +892,177 @@ def handle_join_game(data):
             'redirect': '/edit'
         })
 
-        # Broadcast leaderboard update to all clients
-        emit_leaderboard_update()
+        # Schedule a leaderboard broadcast to the game's clients
+        broadcaster.mark_dirty(game_id, changed=[team['id']])
 
-        print(f"Team '{team_name}' joined the game with ID: {team['id']}")
+        log.info('team_joined', team=team_name, team_id=team['id'], game_id=game_id)
 
+    except db.DuplicateTeamName:
+        emit_error('Team name already exists. Please choose a different name.')
+    except db.GameNotLive:
+        emit_error('This game has ended. Please refresh the page.')
     except ValueError as e:
-        print(f"ValueError creating team: {e}")
-        emit('error', {'message': 'Team name conflict. Please try a different name.'})
+        log.warning('create_team_failed', error=str(e))
+        emit_error('Team name conflict. Please try a different name.')
     except Exception as e:
-        print(f"Unexpected error creating team: {e}")
-        emit('error', {'message': 'Failed to join game. Please try again.'})
+        log.error('create_team_error', error=str(e))
+        emit_error('Failed to join game. Please try again.')
 
-@socketio.on('get_team_data')
+@on_event('get_team_data')
 def handle_get_team_data(data=None):
     """Get current user's team data from session."""
     team_id = get_team_for_session()
 
     if not team_id:
-        emit('error', {'message': 'No team in session'})
+        emit_error('No team in session')
         return
 
     team = db.get_team_by_id(team_id)
 
     if team:
-        emit('team_data', {
-            'team_id': team['id'],
-            'team_name': team['name'],
-            'score': team['score']
-        })
+        join_room(team_room(team_id))
+        emit('team_data', team_payload(team))
     else:
         # Team was deleted, clear session
         clear_team_for_session()
-        emit('error', {'message': 'Team not found'})
+        emit_error('Team not found')
 
-@socketio.on('update_team_name')
+@on_event('update_team_name')
 def handle_update_team_name(data):
     """Handle team name update."""
     team_id = get_team_for_session()
     new_name = data.get('team_name', '').strip()
 
     if not team_id:
-        emit('error', {'message': 'No team in session'})
+        emit_error('No team in session')
         return
 
     if not new_name:
-        emit('error', {'message': 'Team name is required'})
+        emit_error('Team name is required')
         return
 
     if len(new_name) > 50:
-        emit('error', {'message': 'Team name must be 50 characters or less'})
-        return
-
-    # Check if team name already exists (excluding current team)
-    if db.team_name_exists(new_name, exclude_id=team_id):
-        emit('error', {'message': 'Team name already exists. Please choose a different name.'})
+        emit_error('Team name must be 50 characters or less')
         return
 
     try:
-        updated_team = db.update_team_name(team_id, new_name)
+        updated_team = offloader.run(db.update_team_name, team_id, new_name)
 
         if updated_team:
-            # Emit success to updating client
-            emit('team_data', {
-                'team_id': updated_team['id'],
-                'team_name': updated_team['name'],
-                'score': updated_team['score']
-            })
+            # Update every device playing as this team
+            emit_team_data(updated_team)
 
-            # Broadcast leaderboard update to all clients
-            emit_leaderboard_update()
+            # Schedule a leaderboard broadcast to the game's clients
+            broadcaster.mark_dirty(updated_team['game_id'], changed=[team_id])
 
-            print(f"Team {team_id} updated name to: {new_name}")
+            log.info('team_renamed', team_id=team_id, name=new_name)
         else:
-            emit('error', {'message': 'Team not found'})
+            emit_error('Team not found')
 
+    except db.DuplicateTeamName:
+        emit_error('Team name already exists. Please choose a different name.')
     except Exception as e:
-        print(f"Error updating team name: {e}")
-        emit('error', {'message': 'Failed to update team name. Please try again.'})
+        log.error('update_team_name_error', error=str(e))
+        emit_error('Failed to update team name. Please try again.')
 
-@socketio.on('update_score')
+@on_event('update_score')
 def handle_update_score(data):
     """Handle score update."""
     team_id = get_team_for_session()
 
     if not team_id:
-        emit('error', {'message': 'No team in session'})
+        emit_error('No team in session')
         return
 
-    # Check if players are globally locked from updating scores
-    if db.are_players_locked():
-        emit('error', {'message': 'Score updates are currently locked by the admin'})
+    # Check if the team's game has its players locked from updating scores
+    if db.are_players_locked(db.get_team_game(team_id)):
+        emit_error('Score updates are currently locked by the admin')
         return
 
     # Check if this specific team is individually locked
     if db.is_team_locked(team_id):
-        emit('error', {'message': 'Your team has been locked by the admin'})
+        emit_error('Your team has been locked by the admin')
         return
 
     new_score = data.get('score')
 
     if new_score is None or new_score < 0:
-        emit('error', {'message': 'Valid score is required (must be 0 or greater)'})
+        emit_error('Valid score is required (must be 0 or greater)')
         return
 
     try:
-        updated_team = db.update_team_score(team_id, new_score)
+        updated_team = offloader.run(db.update_team_score, team_id, new_score)
 
         if updated_team:
-            # Emit success to updating client
-            emit('team_data', {
-                'team_id': updated_team['id'],
-                'team_name': updated_team['name'],
-                'score': updated_team['score']
-            })
+            # Update every device playing as this team
+            emit_team_data(updated_team)
 
-            # Broadcast leaderboard update to all clients
-            emit_leaderboard_update()
+            # Schedule a leaderboard broadcast to the game's clients
+            broadcaster.mark_dirty(updated_team['game_id'], changed=[team_id])
 
-            print(f"Team {updated_team['name']} updated score to: {new_score}")
+            log.info('score_updated', sample=True, team=updated_team['name'], score=new_score)
         else:
-            emit('error', {'message': 'Team not found'})
+            emit_error('Team not found')
 
     except Exception as e:
-        print(f"Error updating score: {e}")
-        emit('error', {'message': 'Failed to update score. Please try again.'})
+        log.error('update_score_error', error=str(e))
+        emit_error('Failed to update score. Please try again.')
+
+# Largest number of taps accepted in one increment_score message
+MAX_BATCHED_DELTAS = 100
+
+def is_number(value):
+    """True for real ints/floats (bools are rejected)."""
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value == value
+
+@on_event('increment_score')
+def handle_increment_score(data):
+    """Handle relative score changes; several taps can arrive in one message."""
+    team_id = get_team_for_session()
+
+    if not team_id:
+        emit_error('No team in session')
+        return
+
+    # Check if the team's game has its players locked from updating scores
+    if db.are_players_locked(db.get_team_game(team_id)):
+        emit_error('Score updates are currently locked by the admin')
+        return
+
+    # Check if this specific team is individually locked
+    if db.is_team_locked(team_id):
+        emit_error('Your team has been locked by the admin')
+        return
+
+    deltas = data.get('deltas')
+    if deltas is None:
+        deltas = [data.get('delta')]
+
+    if (not isinstance(deltas, list) or not deltas or len(deltas) > MAX_BATCHED_DELTAS
+            or not all(is_number(delta) and abs(delta) <= 1000 for delta in deltas)):
+        emit_error('Valid score change is required')
+        return
+
+    try:
+        updated_team = offloader.run(db.increment_team_score, team_id, sum(deltas))
+
+        if updated_team:
+            # Update every device playing as this team
+            emit_team_data(updated_team)
+
+            # Schedule a leaderboard broadcast to the game's clients
+            broadcaster.mark_dirty(updated_team['game_id'], changed=[team_id])
+
+            log.info('score_incremented', sample=True, team=updated_team['name'], delta=sum(deltas), score=updated_team['score'])
+        else:
+            emit_error('Team not found')
+
+    except Exception as e:
+        log.error('increment_score_error', error=str(e))
+        emit_error('Failed to update score. Please try again.')
 
 # Admin-only events
-@socketio.on('admin_update_team')
+@on_event('admin_update_team')
 def handle_admin_update_team(data):
     """Handle admin team updates (both name and score)."""
     team_id = data.get('team_id')
@@ -385,131 +1070,233 @@ def handle_admin_update_team(data):
     score = data.get('score')
 
     if not team_id:
-        emit('error', {'message': 'Team ID is required'})
+        emit_error('Team ID is required')
         return
 
     if not team_name:
-        emit('error', {'message': 'Team name is required'})
+        emit_error('Team name is required')
         return
 
     if len(team_name) > 50:
-        emit('error', {'message': 'Team name must be 50 characters or less'})
+        emit_error('Team name must be 50 characters or less')
         return
 
     if score is None or score < 0:
-        emit('error', {'message': 'Valid score is required (must be 0 or greater)'})
-        return
-
-    # Check if team name already exists (excluding current team)
-    if db.team_name_exists(team_name, exclude_id=team_id):
-        emit('error', {'message': 'Team name already exists. Please choose a different name.'})
+        emit_error('Valid score is required (must be 0 or greater)')
         return
 
     try:
-        updated_team = db.update_team(team_id, name=team_name, score=score)
+        updated_team = offloader.run(db.update_team, team_id, name=team_name, score=score)
 
         if updated_team:
-            # Broadcast leaderboard update to all clients
-            emit_leaderboard_update()
+            # Show the change on the team's own devices
+            socketio.emit('team_data', team_payload(updated_team), to=team_room(team_id))
+
+            # Schedule a leaderboard broadcast to the game's clients
+            broadcaster.mark_dirty(updated_team['game_id'], changed=[team_id])
 
-            print(f"Admin updated team {team_id}: {team_name} -> {score}")
+            log.info('admin_updated_team', team_id=team_id, name=team_name, score=score)
         else:
-            emit('error', {'message': 'Team not found'})
+            emit_error('Team not found')
 
+    except db.DuplicateTeamName:
+        emit_error('Team name already exists. Please choose a different name.')
     except Exception as e:
-        print(f"Error in admin update: {e}")
-        emit('error', {'message': 'Failed to update team. Please try again.'})
+        log.error('admin_update_error', error=str(e))
+        emit_error('Failed to update team. Please try again.')
 
-@socketio.on('delete_team')
+@on_event('delete_team')
 def handle_delete_team(data):
     """Handle team deletion (admin only)."""
     team_id = data.get('team_id')
 
     if not team_id:
-        emit('error', {'message': 'Team ID is required'})
+        emit_error('Team ID is required')
         return
 
     try:
-        deleted = db.delete_team(team_id)
+        game_id = offloader.run(db.delete_team, team_id)
 
-        if deleted:
+        if game_id:
             # Emit confirmation to admin
             emit('team_deleted', {'team_id': team_id})
 
-            # Broadcast leaderboard update to all clients
-            emit_leaderboard_update()
+            # Schedule a leaderboard broadcast to the game's clients
+            broadcaster.mark_dirty(game_id, removed=[team_id])
 
-            print(f"Admin deleted team: {team_id}")
+            log.info('admin_deleted_team', team_id=team_id)
         else:
-            emit('error', {'message': 'Team not found'})
+            emit_error('Team not found')
 
     except Exception as e:
-        print(f"Error deleting team: {e}")
-        emit('error', {'message': 'Failed to delete team. Please try again.'})
+        log.error('delete_team_error', error=str(e))
+        emit_error('Failed to delete team. Please try again.')
 
-@socketio.on('clear_all_teams')
+@on_event('clear_all_teams')
 def handle_clear_all_teams():
-    """Handle clearing all teams (admin only)."""
+    """Handle clearing all of the admin's game's teams (admin only)."""
+    game_id = session_game()
+    if game_id is None:
+        emit_error('Game not found')
+        return
+
     try:
-        deleted_count = db.clear_all_teams()
+        deleted_count = offloader.run(db.clear_all_teams, game_id)
+
+        # Schedule a full (now empty) leaderboard broadcast
+        broadcaster.mark_dirty(game_id, full=True)
 
-        # Broadcast leaderboard update to all clients
-        emit_leaderboard_update()
+        log.info('admin_cleared_teams', deleted=deleted_count, game_id=game_id)
 
-        print(f"Admin cleared all teams. Deleted {deleted_count} teams.")
+    except Exception as e:
+        log.error('clear_teams_error', error=str(e))
+        emit_error('Failed to clear teams. Please try again.')
 
+@on_event('create_backup')
+def handle_create_backup(data=None):
+    """Take a database backup now (admin only)."""
+    try:
+        result = run_backup()
+        emit('backup_created', {
+            'file': os.path.basename(result['path']),
+            'bytes': result['bytes'],
+            'seconds': result['seconds']
+        })
     except Exception as e:
-        print(f"Error clearing teams: {e}")
-        emit('error', {'message': 'Failed to clear teams. Please try again.'})
+        log.error('backup_error', error=str(e))
+        emit_error('Backup failed. Please check the server logs.')
 
-@socketio.on('toggle_player_lock')
+@on_event('toggle_player_lock')
 def handle_toggle_player_lock(data):
-    """Handle toggling player lock state (admin only)."""
+    """Handle toggling the player lock state of the admin's game (admin only)."""
     locked = data.get('locked', False)
+    game_id = session_game()
 
     try:
-        success = db.set_players_locked(locked)
+        success = game_id is not None and offloader.run(db.set_players_locked, locked, game_id)
 
         if success:
-            # Broadcast lock state update to all clients
-            socketio.emit('player_lock_changed', {'locked': locked})
+            # Tell the game's player pages and admins
+            socketio.emit('player_lock_changed', {'locked': locked},
+                          to=[game_room(game_id, 'players'), game_room(game_id, 'admin')])
 
             action = "locked" if locked else "unlocked"
-            print(f"Admin {action} player score updates")
+            log.info('admin_player_lock', action=action, game_id=game_id)
         else:
-            emit('error', {'message': 'Failed to update lock state'})
+            emit_error('Failed to update lock state')
 
     except Exception as e:
-        print(f"Error toggling player lock: {e}")
-        emit('error', {'message': 'Failed to update lock state. Please try again.'})
+        log.error('toggle_player_lock_error', error=str(e))
+        emit_error('Failed to update lock state. Please try again.')
 
-@socketio.on('toggle_team_lock')
+@on_event('toggle_team_lock')
 def handle_toggle_team_lock(data):
     """Handle toggling individual team lock state (admin only)."""
     team_id = data.get('team_id')
     locked = data.get('locked', False)
 
     if not team_id:
-        emit('error', {'message': 'Team ID is required'})
+        emit_error('Team ID is required')
         return
 
     try:
-        success = db.set_team_locked(team_id, locked)
+        success = offloader.run(db.set_team_locked, team_id, locked)
 
-        if success:
-            # Broadcast individual team lock state to all clients
-            socketio.emit('team_lock_changed', {'team_id': team_id, 'locked': locked})
+        team = db.get_team_by_id(team_id) if success else None
+
+        if team:
+            # Tell the team's devices; admins see it in the leaderboard patch
+            socketio.emit('team_lock_changed', {'team_id': team_id, 'locked': locked}, to=team_room(team_id))
+            broadcaster.mark_dirty(team['game_id'], changed=[team_id])
 
             action = "locked" if locked else "unlocked"
-            team = db.get_team_by_id(team_id)
-            team_name = team['name'] if team else team_id
-            print(f"Admin {action} team: {team_name}")
+            team_name = team['name']
+            log.info('admin_team_lock', action=action, team=team_name)
         else:
-            emit('error', {'message': 'Team not found'})
+            emit_error('Team not found')
 
     except Exception as e:
-        print(f"Error toggling team lock: {e}")
-        emit('error', {'message': 'Failed to update team lock state. Please try again.'})
+        log.error('toggle_team_lock_error', error=str(e))
+        emit_error('Failed to update team lock state. Please try again.')
+
+def emit_games_changed():
+    """Send every admin page the updated list of games."""
+    socketio.emit('games_changed', {
+        'games': offloader.run(db.get_games),
+        'active_game_id': db.get_active_game_id()
+    }, to=ADMINS_ROOM)
+
+@on_event('create_game')
+def handle_create_game(data):
+    """Start a new game, e.g. the next round (admin only); ``activate`` makes it the default."""
+    name = (data or {}).get('name', '').strip()
+    activate = bool((data or {}).get('activate', True))
+
+    if not name:
+        emit_error('Game name is required')
+        return
+
+    if len(name) > 50:
+        emit_error('Game name must be 50 characters or less')
+        return
+
+    try:
+        game_id = offloader.run(db.create_game, name, activate)
+        emit('game_created', {'game_id': game_id, 'name': name})
+        emit_games_changed()
+        if activate:
+            # Pages following the active game reload onto the new one
+            socketio.emit('game_changed', {'game_id': game_id}, to=ACTIVE_GAME_ROOM)
+        log.info('admin_created_game', game_id=game_id, name=name, active=activate)
+
+    except Exception as e:
+        log.error('create_game_error', error=str(e))
+        emit_error('Failed to create game. Please try again.')
+
+@on_event('activate_game')
+def handle_activate_game(data):
+    """Make a live game the one new players join and default pages show (admin only)."""
+    game_id = (data or {}).get('game_id')
+
+    if not game_id:
+        emit_error('Game ID is required')
+        return
+
+    try:
+        offloader.run(db.set_active_game, game_id)
+        emit_games_changed()
+        socketio.emit('game_changed', {'game_id': game_id}, to=ACTIVE_GAME_ROOM)
+        log.info('admin_activated_game', game_id=game_id)
+
+    except db.GameNotLive:
+        emit_error('Game not found')
+    except Exception as e:
+        log.error('activate_game_error', error=str(e))
+        emit_error('Failed to switch games. Please try again.')
+
+@on_event('archive_game')
+def handle_archive_game(data):
+    """Finish a game: move its teams to the archive and send its pages away (admin only)."""
+    game_id = (data or {}).get('game_id')
+
+    if not game_id:
+        emit_error('Game ID is required')
+        return
+
+    try:
+        archived = offloader.run(db.archive_game, game_id)
+        forget_game(game_id)
+        socketio.emit('game_archived', {'game_id': game_id}, to=all_game_rooms(game_id))
+        emit_games_changed()
+        log.info('admin_archived_game', game_id=game_id, teams=archived)
+
+    except db.GameNotLive:
+        emit_error('Game not found')
+    except ValueError as e:
+        emit_error(str(e))
+    except Exception as e:
+        log.error('archive_game_error', error=str(e))
+        emit_error('Failed to archive game. Please try again.')
 
 # Error handlers
 @app.errorhandler(404)
@@ -527,9 +1314,18 @@ if __name__ == '__main__':
     print(f"⚙️ Admin Panel: http://{HOST}:{PORT}/admin")
     print(f"📊 Scan Page: http://{HOST}:{PORT}/scan")
 
-    # Initialize database
-    db.init_database()
-    print("✅ Database initialized")
+    database_report = init_app()
+
+    if PUBLIC_HOST:
+        qr_cache.prewarm(f"http://{PUBLIC_HOST}/join")
+        print(f"✅ QR code ready for http://{PUBLIC_HOST}/join")
+
+    print(f"✅ Database ready: schema v{database_report['schema_version']}, "
+          f"{database_report['games']} live games with {database_report['teams']} teams, migrated in {database_report['migrate_ms']} ms "
+          f"and loaded in {database_report['load_ms']} ms")
+    print(f"✅ Started in {(time.perf_counter() - STARTUP_BEGAN) * 1000:.0f} ms")
+
+    start_background_tasks()
 
     # Run the application
     socketio.run(
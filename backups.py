@@ -0,0 +1,114 @@
+"""Scheduled online backups with rotation, optional gzip and restore.
+
+    python backups.py backup            # take a backup now
+    python backups.py list              # list kept backups
+    python backups.py restore <file>    # verify and restore (.db or .db.gz)
+"""
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import database as db
+
+BACKUP_DIR = os.environ.get('BACKUP_DIR') or os.path.join(
+    os.path.dirname(os.path.abspath(db.DATABASE_FILE)), 'backups'
+)
+# Seconds between scheduled backups (0 disables the schedule)
+BACKUP_INTERVAL = float(os.environ.get('BACKUP_INTERVAL', '0'))
+# Number of backups kept; older ones are deleted after each new backup
+BACKUP_KEEP = int(os.environ.get('BACKUP_KEEP', '10'))
+BACKUP_COMPRESS = os.environ.get('BACKUP_COMPRESS', '').lower() in ('1', 'true', 'yes')
+
+PREFIX = 'backup_leaderboard_'
+
+
+def list_backups(directory=BACKUP_DIR):
+    """Backup files in ``directory``, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(
+        name for name in os.listdir(directory)
+        if name.startswith(PREFIX) and name.endswith(('.db', '.db.gz'))
+    )
+    return [os.path.join(directory, name) for name in names]
+
+
+def rotate_backups(directory=BACKUP_DIR, keep=BACKUP_KEEP):
+    """Delete all but the newest ``keep`` backups and return the removed paths."""
+    backups = list_backups(directory)
+    removed = backups[:-keep] if keep > 0 else []
+    for path in removed:
+        os.remove(path)
+    return removed
+
+
+def create_backup(directory=BACKUP_DIR, compress=BACKUP_COMPRESS, keep=BACKUP_KEEP):
+    """Back up the live database into ``directory`` and rotate old backups.
+
+    Blocking; the app runs it through eventlet's thread pool.
+    """
+    os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    path = os.path.join(directory, f'{PREFIX}{timestamp}.db')
+
+    if db.backup_database(path) is None:
+        raise RuntimeError(f"No database at {db.DATABASE_FILE}")
+
+    if compress:
+        with open(path, 'rb') as src, gzip.open(path + '.gz', 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+        path += '.gz'
+
+    removed = rotate_backups(directory, keep)
+    return {
+        'path': path,
+        'bytes': os.path.getsize(path),
+        'seconds': round(time.perf_counter() - start, 3),
+        'removed': len(removed)
+    }
+
+
+def restore_backup(path):
+    """Verify a backup (decompressing .gz first) and restore it into the live database."""
+    if not path.endswith('.gz'):
+        db.restore_database(path)
+        return
+
+    fd, temp_path = tempfile.mkstemp(suffix='.db', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with gzip.open(path, 'rb') as src, os.fdopen(fd, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        db.restore_database(temp_path)
+    finally:
+        os.remove(temp_path)
+
+
+def main(argv):
+    command = argv[1] if len(argv) > 1 else None
+    if command == 'backup':
+        result = create_backup()
+        print(f"✅ Backup written to {result['path']} ({result['bytes']} bytes, {result['seconds']}s)")
+    elif command == 'list':
+        for path in list_backups():
+            print(f"{path}  {os.path.getsize(path)} bytes")
+    elif command == 'restore' and len(argv) > 2:
+        try:
+            restore_backup(argv[2])
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"✅ Restored {argv[2]} into {db.DATABASE_FILE}")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,62 @@
+"""Benchmark: queries per second with and without the connection pool.
+
+Replays reads that still go to SQLite from handlers against a temporary
+database: a setting (the scale-out leaderboard seq), the games list and
+the score history catch-up. Lock checks and team reads are answered from
+memory and writes go through the writer's own connection, so neither
+touches the pool.
+
+    python benchmarks/bench_db_pool.py [iterations]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEMP_DIR = tempfile.mkdtemp(prefix='scoreboard-bench-')
+os.environ['DATABASE_FILE'] = os.path.join(TEMP_DIR, 'bench.db')
+
+import database as db  # noqa: E402
+
+
+def reads(event_id):
+    """One pass over the pooled reads."""
+    db.get_setting('leaderboard_seq', 0)
+    db.get_games()
+    db.get_score_events(after_id=event_id)
+
+
+def run(label, pool_size, iterations, event_id):
+    db._pool.close_all()
+    db._pool.size = pool_size
+    db._pool.opened = 0
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        reads(event_id)
+    elapsed = time.perf_counter() - start
+
+    queries = iterations * 3
+    print(f"{label:<12} {queries / elapsed:>10.0f} queries/s  "
+          f"{db._pool.opened:>6} connections opened")
+    return queries / elapsed
+
+
+def main():
+    db.init_database()
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    team_id = db.create_team('Benchmark Team')['id']
+    for score in range(20):
+        db.update_team_score(team_id, score)
+    event_id = db.get_last_score_event_id()
+
+    print(f"{iterations} passes against {db.DATABASE_FILE}")
+    before = run('unpooled', 0, iterations, event_id)
+    after = run('pooled', db.POOL_SIZE or 8, iterations, event_id)
+    print(f"speedup: {after / before:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark: the active game's costs against the history in the same file.
+
+Plays G finished games of P teams each and archives them, then starts an
+active game of N teams. It compares that game's snapshot, top-10 and
+startup load with a single board that still holds every team, which is how
+the database behaved before teams were partitioned by game.
+
+    python benchmarks/bench_games.py [active teams] [past games] [teams per past game]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEMP_DIR = tempfile.mkdtemp(prefix='scoreboard-bench-')
+os.environ['DATABASE_FILE'] = os.path.join(TEMP_DIR, 'bench.db')
+
+import database as db  # noqa: E402
+from leaderboard import Leaderboard  # noqa: E402
+
+TOP_SQL = 'SELECT * FROM teams WHERE game_id = ? ORDER BY score DESC, created_at LIMIT 10'
+
+
+def add_teams(game_id, count):
+    rows = [(str(uuid.uuid4()), f'Team {i}', float(i % 500), game_id) for i in range(count)]
+    with db.db_connection() as conn:
+        conn.executemany('INSERT INTO teams (id, name, score, game_id) VALUES (?, ?, ?, ?)', rows)
+        conn.commit()
+
+
+def timed(fn, runs=50):
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main():
+    active = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    past_games = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    per_game = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    db.init_database()
+    history = []
+    for n in range(past_games):
+        game_id = db.create_game(f'Round {n}', activate=True)
+        add_teams(game_id, per_game)
+        history.append(game_id)
+    current = db.create_game('Tonight', activate=True)
+    add_teams(current, active)
+
+    with db.db_connection() as conn:
+        everything = [dict(row) for row in conn.execute('SELECT * FROM teams')]
+    unpartitioned = Leaderboard()
+    unpartitioned.load(everything)
+
+    start = time.perf_counter()
+    for game_id in history:
+        db.archive_game(game_id)
+    archive_ms = (time.perf_counter() - start) * 1000 / past_games
+    load_ms = timed(db.load_leaderboard, runs=10)
+
+    def unpartitioned_load():
+        with db.db_connection() as conn:
+            Leaderboard().load(dict(row) for row in conn.execute('SELECT * FROM archived_teams'))
+
+    print(f"active game: {active} teams; history: {past_games} games x {per_game} teams")
+    print(f"{'':<22} {'one board':>12} {'per game':>12}")
+    rows = (
+        ('snapshot bytes', len(json.dumps(unpartitioned.teams())), len(json.dumps(db.get_all_teams(current)))),
+        ('snapshot build ms', timed(unpartitioned.teams), timed(lambda: db.get_all_teams(current))),
+        ('top 10 ms', timed(lambda: unpartitioned.top(10)), timed(lambda: db.get_top_teams(10, current))),
+        ('startup load ms', timed(unpartitioned_load, runs=10) + load_ms, load_ms),
+    )
+    for label, before, after in rows:
+        print(f"{label:<22} {before:>12.3f} {after:>12.3f}" if isinstance(before, float)
+              else f"{label:<22} {before:>12} {after:>12}")
+    print(f"archiving one game: {archive_ms:.1f} ms")
+    with db.db_connection() as conn:
+        plan = '; '.join(row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + TOP_SQL, (current,)))
+    print(f"SQL top 10 plan: {plan}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark: does slow database work freeze the eventlet hub?
+
+Runs a green "broadcast" ticker every 20ms plus the HubMonitor, then
+makes the same blocking calls twice: directly on the hub, as handlers used
+to, and through the Offloader. The calls are a deliberately slow query
+and a burst of score writes from many green clients. Reports the longest
+gap between ticks (how long broadcasts froze for everyone) and the
+monitor's view of hub lag.
+
+    python benchmarks/bench_hub_blocking.py [clients] [writes_per_client]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEMP_DIR = tempfile.mkdtemp(prefix='scoreboard-bench-')
+os.environ['DATABASE_FILE'] = os.path.join(TEMP_DIR, 'bench.db')
+
+import eventlet  # noqa: E402
+
+import database as db  # noqa: E402
+from offload import Offloader, HubMonitor  # noqa: E402
+
+TICK = 0.02
+
+
+class GreenLoop:
+    """The bits of the Socket.IO server the monitor needs, on plain eventlet."""
+
+    def start_background_task(self, fn):
+        return eventlet.spawn(fn)
+
+    def sleep(self, seconds):
+        eventlet.sleep(seconds)
+
+
+def slow_query():
+    with db.db_connection() as conn:
+        return conn.execute(
+            'WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 2000000) '
+            'SELECT SUM(x) FROM c'
+        ).fetchone()[0]
+
+
+def scenario(label, call, work):
+    monitor = HubMonitor(GreenLoop(), interval=0.01, threshold=0.05)
+    monitor.start()
+    ticks = []
+    running = [True]
+
+    def ticker():
+        while running[0]:
+            ticks.append(time.perf_counter())
+            eventlet.sleep(TICK)
+
+    eventlet.spawn(ticker)
+    eventlet.sleep(0.1)
+
+    start = time.perf_counter()
+    pool = eventlet.GreenPool()
+    for fn, args in work:
+        pool.spawn(call, fn, *args)
+    pool.waitall()
+    elapsed = time.perf_counter() - start
+
+    eventlet.sleep(0.1)
+    running[0] = False
+    monitor._task.kill()
+
+    gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+    stats = monitor.stats()
+    print(f"{label:<28} {elapsed * 1000:>9.0f} {max(gaps) * 1000:>12.0f} "
+          f"{stats['max_lag_ms']:>12.0f} {stats['stalls']:>7}")
+
+
+def main():
+    db.init_database()
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    team_ids = [db.create_team(f'Team {i}')['id'] for i in range(clients)]
+    offloader = Offloader()
+
+    def direct(fn, *args):
+        return fn(*args)
+
+    def writes_for(call):
+        def client(team_id):
+            for _ in range(writes):
+                call(db.increment_team_score, team_id, 1)
+        return [(client, (team_id,)) for team_id in team_ids]
+
+    print(f"broadcast tick every {TICK * 1000:.0f}ms; times in ms")
+    print(f"{'':<28} {'wall':>9} {'max tick gap':>12} {'max hub lag':>12} {'stalls':>7}")
+    for mode, call in (('on hub', direct), ('offloaded', offloader.run)):
+        scenario(f'slow query, {mode}', call, [(slow_query, ())])
+        scenario(f'{clients}x{writes} writes, {mode}', direct, writes_for(call))
+    print(f"offloader: {offloader.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark: serializing the leaderboard once vs once per recipient.
+
+python-socketio encodes an emit separately for every socket in the room,
+and /api/teams used to run jsonify on every poll. This compares, for a
+board of T teams:
+
+  * a snapshot broadcast to R clients, with a plain dict (encoded R times)
+    and with a cached Encoded payload (encoded once, spliced R times)
+  * /api/teams polled P times, uncached jsonify vs the cache (200s and 304s)
+
+    python benchmarks/bench_payload_cache.py [teams] [recipients] [polls]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEMP_DIR = tempfile.mkdtemp(prefix='scoreboard-bench-')
+os.environ['DATABASE_FILE'] = os.path.join(TEMP_DIR, 'bench.db')
+
+from flask import jsonify  # noqa: E402
+from socketio import packet  # noqa: E402
+
+import app as scoreboard  # noqa: E402
+import database as db  # noqa: E402
+from payload_cache import Encoded, WireJSON  # noqa: E402
+
+
+def broadcast(payload, recipients, json_module):
+    """What python-socketio does for an emit to a room: one encode per socket."""
+    packet.Packet.json = json_module
+    try:
+        start = time.perf_counter()
+        for _ in range(recipients):
+            packet.Packet(packet.EVENT, data=['leaderboard_update', payload]).encode()
+        return time.perf_counter() - start
+    finally:
+        packet.Packet.json = WireJSON
+
+
+def main():
+    teams = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    recipients = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    polls = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+
+    scoreboard.init_app()
+    game_id = db.get_active_game_id()
+    db.leaderboards.load([
+        {'id': f'team-{i:05d}', 'name': f'Team {i}', 'score': float(i % 97), 'is_locked': 0,
+         'created_at': '2024-01-01 20:00:00', 'updated_at': '2024-01-01 20:00:00', 'game_id': game_id}
+        for i in range(teams)
+    ], game_ids=[game_id])
+    payload = {'teams': db.get_all_teams(), 'seq': 1}
+    print(f"{teams} teams, snapshot {len(json.dumps(payload, separators=(',', ':'))) / 1024:.0f} KB")
+
+    plain = broadcast(payload, recipients, json)
+    start = time.perf_counter()
+    encoded = Encoded(payload)
+    cached = broadcast(encoded, recipients, WireJSON) + (time.perf_counter() - start)
+    print(f"broadcast to {recipients:>5} clients  dict: {plain * 1000:8.1f} ms   "
+          f"encoded once: {cached * 1000:8.1f} ms   ({plain / cached:.0f}x)")
+
+    app = scoreboard.app
+    with app.test_request_context('/api/teams'):
+        start = time.perf_counter()
+        for _ in range(polls):
+            jsonify({'teams': db.get_all_teams()}).get_data()
+        uncached = time.perf_counter() - start
+
+    client = app.test_client()
+    start = time.perf_counter()
+    for _ in range(polls):
+        response = client.get('/api/teams', headers={'Accept-Encoding': 'gzip'})
+    full = time.perf_counter() - start
+    size = len(response.data)
+
+    etag = response.headers['ETag']
+    start = time.perf_counter()
+    for _ in range(polls):
+        response = client.get('/api/teams', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304
+    not_modified = time.perf_counter() - start
+
+    print(f"/api/teams x{polls}  jsonify: {uncached * 1000:8.1f} ms   cached gzip: {full * 1000:8.1f} ms "
+          f"({size / 1024:.0f} KB each)   304: {not_modified * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
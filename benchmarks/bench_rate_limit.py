@@ -0,0 +1,71 @@
+"""Benchmark: the rate limiter's cost per event and the memory it holds.
+
+Runs S sessions for 60 simulated seconds. Each sends increment_score at a
+normal player's pace (a batch every 150 ms while tapping), except one that
+sends 200 a second. New sessions keep arriving, as phones reconnect with
+fresh cookies, so buckets must be evicted to stay bounded. Reports the cost
+of ``allow()``, how many of each kind of event got through and how many
+buckets were held.
+
+    python benchmarks/bench_rate_limit.py [sessions] [max buckets]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit import DEFAULT_LIMITS, RateLimiter  # noqa: E402
+
+SECONDS = 60
+TICK = 0.01
+SPAM_PER_SECOND = 200
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    max_buckets = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    now = [0.0]
+    limiter = RateLimiter(DEFAULT_LIMITS, max_buckets=max_buckets, clock=lambda: now[0])
+    sent = {'player': 0, 'spammer': 0}
+    allowed = {'player': 0, 'spammer': 0}
+    peak = 0
+    calls = 0
+    spent = 0.0
+
+    def send(kind, key):
+        nonlocal calls, spent
+        start = time.perf_counter()
+        ok = limiter.allow('increment_score', key)
+        spent += time.perf_counter() - start
+        calls += 1
+        sent[kind] += 1
+        allowed[kind] += ok
+
+    ticks = int(SECONDS / TICK)
+    for tick in range(ticks):
+        now[0] = tick * TICK
+        # Each player taps in bursts of about two seconds, then pauses; a
+        # tenth of them rejoin on a new session every 10 seconds
+        generation = tick // int(10 / TICK)
+        for player in range(sessions):
+            if tick % 15 == player % 15 and (tick + player * 7) % 400 < 200:
+                session = player if player % 10 else f'{player}-{generation}'
+                send('player', session)
+        for _ in range(int(SPAM_PER_SECOND * TICK)):
+            send('spammer', 'spammer')
+        peak = max(peak, len(limiter))
+
+    print(f"{sessions} players + 1 spammer, {SECONDS} simulated seconds, "
+          f"increment_score limit {DEFAULT_LIMITS['increment_score'][0]:g}/s "
+          f"burst {DEFAULT_LIMITS['increment_score'][1]:g}")
+    print(f"allow(): {spent / calls * 1e6:.2f} us per call over {calls} calls")
+    for kind in ('player', 'spammer'):
+        print(f"{kind:<8} sent {sent[kind]:>8} allowed {allowed[kind]:>8} "
+              f"({allowed[kind] / sent[kind]:.1%})")
+    print(f"buckets: peak {peak}, at end {len(limiter)}, evicted {limiter.evicted}")
+
+
+if __name__ == '__main__':
+    main()
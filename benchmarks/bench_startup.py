@@ -0,0 +1,63 @@
+"""Benchmark: process startup cost against an existing database.
+
+Each case runs in a fresh interpreter, RUNS times, against a database that
+already holds the full schema and T teams:
+
+  * import database              (what scripts and test runners pay)
+  * import database + init       (schema check and leaderboard load)
+  * import app                   (only the module: no database work)
+  * import app + init_app        (a server worker's startup before serving)
+
+    python benchmarks/bench_startup.py [teams] [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = (
+    ('import database', 'import database'),
+    ('import database + init', 'import database; database.init_database()'),
+    ('import app', 'import app'),
+    ('import app + init_app', 'import app; app.init_app()'),
+)
+
+TIMED = '''
+import time
+start = time.perf_counter()
+{code}
+print(time.perf_counter() - start)
+'''
+
+
+def run(code, env):
+    output = subprocess.run(
+        [sys.executable, '-c', TIMED.format(code=code)],
+        cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    teams = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    env = dict(os.environ, LOG_LEVEL='WARNING')
+    env['DATABASE_FILE'] = os.path.join(tempfile.mkdtemp(prefix='scoreboard-bench-'), 'bench.db')
+    subprocess.run([sys.executable, '-c', (
+        'import database as db\n'
+        'db.init_database()\n'
+        f'for i in range({teams}): db.create_team(f"Team {{i}}")\n'
+    )], cwd=ROOT, env=env, check=True, capture_output=True)
+
+    print(f"{teams} teams, median of {runs} runs")
+    for label, code in CASES:
+        times = [run(code, env) for _ in range(runs)]
+        print(f"{label:<24} {statistics.median(times) * 1000:>8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark: team name lookups, joins and leaderboard ordering at 10k teams.
+
+Compares the old LOWER(name) = LOWER(?) scan with the per-game COLLATE
+NOCASE unique index, the old check-then-insert join with a single
+constrained insert, and one game's ORDER BY score DESC, created_at with and
+without idx_teams_game_score.
+
+    python benchmarks/bench_team_names.py [teams] [lookups]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEMP_DIR = tempfile.mkdtemp(prefix='scoreboard-bench-')
+os.environ['DATABASE_FILE'] = os.path.join(TEMP_DIR, 'bench.db')
+
+import database as db  # noqa: E402
+
+OLD_LOOKUP = 'SELECT COUNT(*) as count FROM teams WHERE LOWER(name) = LOWER(?)'
+NEW_LOOKUP = 'SELECT COUNT(*) as count FROM teams WHERE game_id = ? AND name = ? COLLATE NOCASE'
+ORDERED = 'SELECT * FROM teams {hint} WHERE game_id = ? ORDER BY score DESC, created_at LIMIT 10'
+
+
+def populate(count, game_id):
+    with db.db_connection() as conn:
+        conn.executemany(
+            'INSERT INTO teams (id, name, score, game_id) VALUES (?, ?, ?, ?)',
+            ((str(uuid.uuid4()), f'Team {i}', float(random.randint(0, 500)), game_id) for i in range(count))
+        )
+        conn.commit()
+    db.load_leaderboard()
+
+
+def plan(conn, sql, *params):
+    return '; '.join(row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params))
+
+
+def time_queries(conn, sql, params_list):
+    start = time.perf_counter()
+    for params in params_list:
+        conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / len(params_list) * 1e6
+
+
+def main():
+    db.init_database()
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    game_id = db.get_active_game_id()
+    populate(count, game_id)
+    names = [f'TEAM {random.randrange(count * 2)}' for _ in range(lookups)]
+
+    print(f"{count} teams in {db.DATABASE_FILE}")
+    with db.db_connection() as conn:
+        print("\nname lookup              us/query  plan")
+        print(f"{'LOWER(name) = LOWER(?)':<24} {time_queries(conn, OLD_LOOKUP, [(n,) for n in names]):>8.1f}  "
+              f"{plan(conn, OLD_LOOKUP, 'x')}")
+        print(f"{'name = ? COLLATE NOCASE':<24} {time_queries(conn, NEW_LOOKUP, [(game_id, n) for n in names]):>8.1f}  "
+              f"{plan(conn, NEW_LOOKUP, game_id, 'x')}")
+
+        print("\nleaderboard top 10       us/query  plan")
+        for label, hint in (('no index', 'NOT INDEXED'), ('idx_teams_game_score', 'INDEXED BY idx_teams_game_score')):
+            sql = ORDERED.format(hint=hint)
+            print(f"{label:<24} {time_queries(conn, sql, [(game_id,)] * 200):>8.1f}  {plan(conn, sql, game_id)}")
+
+    joins = min(lookups, 1000)
+    print(f"\n{joins} joins on top of {count} teams")
+
+    start = time.perf_counter()
+    for i in range(joins):
+        name = f'Old Join {i}'
+        with db.db_connection() as conn:
+            taken = conn.execute(OLD_LOOKUP, (name,)).fetchone()['count']
+        if not taken:
+            db.create_team(name)
+    old = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(joins):
+        db.create_team(f'New Join {i}')
+    new = time.perf_counter() - start
+
+    duplicates = 0
+    for i in range(joins):
+        try:
+            db.create_team(f'new join {i}')
+        except db.DuplicateTeamName:
+            duplicates += 1
+
+    print(f"check-then-insert        {joins / old:>8.0f} joins/s")
+    print(f"constrained insert       {joins / new:>8.0f} joins/s  ({old / new:.2f}x)")
+    print(f"case-only duplicates rejected: {duplicates}/{joins}")
+
+
+if __name__ == '__main__':
+    main()
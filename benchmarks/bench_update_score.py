@@ -0,0 +1,67 @@
+"""Microbenchmark: the update_score / increment_score socket handler path.
+
+Drives the handlers through Flask-SocketIO's test client against a temporary
+database and reports events per second and SQL statements per event.
+Statement counts include the BEGIN/SAVEPOINT/RELEASE/COMMIT the writer
+wraps around each write and the score_events insert that logs it, so a
+lone score write shows up as 6.
+
+    python benchmarks/bench_update_score.py [events]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEMP_DIR = tempfile.mkdtemp(prefix='scoreboard-bench-')
+os.environ['DATABASE_FILE'] = os.path.join(TEMP_DIR, 'bench.db')
+# One client sends as fast as it can; measure the handlers, not the limiter
+os.environ['RATE_LIMITS'] = 'off'
+
+import database as db  # noqa: E402
+
+statements = [0]
+configure_connection = db.configure_connection
+
+
+def counting_configure(conn):
+    configure_connection(conn)
+    conn.set_trace_callback(lambda sql: statements.__setitem__(0, statements[0] + 1))
+
+
+db.configure_connection = counting_configure
+db._pool.close_all()
+db._writer.stop()
+
+import app  # noqa: E402
+
+
+def run(label, client, event, payload, events):
+    statements[0] = 0
+    start = time.perf_counter()
+    for i in range(events):
+        client.emit(event, payload(i))
+    elapsed = time.perf_counter() - start
+    client.get_received()
+
+    print(f"{label:<16} {events / elapsed:>8.0f} events/s  "
+          f"{elapsed / events * 1e6:>7.0f} us/event  "
+          f"{statements[0] / events:>5.1f} SQL statements/event")
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app.init_app()
+    client = app.socketio.test_client(app.app, flask_test_client=app.app.test_client())
+    client.emit('join_game', {'team_name': 'Benchmark Team'})
+    client.get_received()
+
+    run('update_score', client, 'update_score', lambda i: {'score': i}, events)
+    run('increment_score', client, 'increment_score', lambda i: {'delta': 1}, events)
+    run('increment x10', client, 'increment_score', lambda i: {'deltas': [1] * 10}, events)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark: bytes on the wire and encode time per leaderboard snapshot.
+
+Compares today's {'teams': [row, ...]} JSON payload with the compact
+columnar format from wire_format.py, at 100, 1k and 10k teams (or the
+sizes given). Gzipped sizes show what a compressing proxy would send.
+MessagePack rows are included when the msgpack package is installed.
+
+    python benchmarks/bench_wire_format.py [teams ...]
+"""
+import gzip
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wire_format  # noqa: E402
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+REPEAT_SECONDS = 0.5
+
+
+def make_teams(count):
+    # The shape of database.get_all_teams() rows
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            'name': f'Team {i}',
+            'score': float((count - i) // 3) + (0.5 if i % 2 else 0),
+            'is_locked': 0,
+            'created_at': f'2024-06-01 20:{i // 60 % 60:02d}:{i % 60:02d}',
+            'updated_at': f'2024-06-01 21:{i // 60 % 60:02d}:{i % 60:02d}'
+        }
+        for i in range(count)
+    ]
+
+
+def timed(fn):
+    """Mean seconds per call, repeating for about REPEAT_SECONDS."""
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= REPEAT_SECONDS:
+            return elapsed / runs
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000]
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+
+    encoders = {
+        'json rows': lambda payload: dumps(payload).encode(),
+        'compact': lambda payload: dumps(wire_format.compact_snapshot(payload)).encode(),
+    }
+    if msgpack is not None:
+        encoders['msgpack rows'] = msgpack.packb
+
+    print(f"{'teams':>6} {'format':<13} {'bytes':>10} {'gzip':>9} {'vs json':>8} {'encode ms':>10}")
+    for count in sizes:
+        payload = {'teams': make_teams(count), 'seq': 1}
+        baseline = None
+        for name, encode in encoders.items():
+            data = encode(payload)
+            seconds = timed(lambda: encode(payload))
+            baseline = baseline or len(data)
+            print(f"{count:>6} {name:<13} {len(data):>10} {len(gzip.compress(data, 6)):>9} "
+                  f"{len(data) / baseline:>7.0%} {seconds * 1000:>10.2f}")
+    if msgpack is None:
+        print("(pip install msgpack to include MessagePack)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""Load test for the Socket.IO and HTTP paths.
+
+Starts the app on a temporary database, then runs K Socket.IO clients
+through join_game -> repeated update_score -> request_leaderboard. Each
+client waits for its reply before sending the next event. HTTP readers
+meanwhile poll /api/teams and /api/stats. Reports:
+
+  * p50/p95/p99 latency per socket event and HTTP route
+  * broadcast fan-out: time from an update being sent until every client
+    has seen it in a leaderboard broadcast
+  * server CPU time (from /proc, so Linux only)
+  * SQL statements executed by the server per event
+
+Results can be saved with --json so runs on different commits can be
+compared. Needs the Socket.IO client extras: pip install requests websocket-client
+
+    python benchmarks/load_test.py --clients 50 --updates 40 --readers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run_server(port):
+    """Entry point of the server subprocess: the app plus an SQL counter."""
+    import database as db
+
+    statements = [0]
+    configure_connection = db.configure_connection
+
+    def counting_configure(conn):
+        configure_connection(conn)
+        conn.set_trace_callback(lambda sql: statements.__setitem__(0, statements[0] + 1))
+
+    db.configure_connection = counting_configure
+    db._pool.close_all()
+    db._writer.stop()
+
+    import app
+    from flask import jsonify
+
+    @app.app.route('/_bench/db-ops')
+    def bench_db_ops():
+        return jsonify({'statements': statements[0]})
+
+    app.init_app()
+    app.start_background_tasks()
+    app.socketio.run(app.app, host='127.0.0.1', port=port, debug=False, log_output=False)
+
+
+def percentiles(samples):
+    if not samples:
+        return {'count': 0, 'p50': None, 'p95': None, 'p99': None}
+    ordered = sorted(samples)
+
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 2)
+
+    return {'count': len(ordered), 'p50': pick(50), 'p95': pick(95), 'p99': pick(99)}
+
+
+def cpu_seconds(pid):
+    with open(f'/proc/{pid}/stat') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    # utime and stime are fields 14 and 15 of /proc/<pid>/stat
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+class LoadClient:
+    """One phone running the join -> update -> leaderboard loop."""
+
+    def __init__(self, url, name, results, sent_updates):
+        import requests
+        import socketio
+
+        self.name = name
+        self.results = results
+        self.sent_updates = sent_updates
+        self.reply = threading.Event()
+        self.snapshot = threading.Event()
+        self.team_id = None
+
+        http = requests.Session()
+        http.get(url + '/join')
+        cookie = '; '.join(f'{key}={value}' for key, value in http.cookies.items())
+
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('team_joined', self.on_joined)
+        self.sio.on('team_data', lambda data: self.reply.set())
+        self.sio.on('leaderboard_update', lambda data: self.snapshot.set())
+        self.sio.on('leaderboard_patch', self.on_patch)
+        self.sio.on('error', lambda data: self.results['errors'].append(data['message']))
+        self.sio.connect(url, headers={'Cookie': cookie}, transports=['websocket'])
+
+    def on_joined(self, data):
+        self.team_id = data['team_id']
+        self.reply.set()
+
+    def on_patch(self, patch):
+        now = time.perf_counter()
+        for row in patch['teams']:
+            self.results['seen'].append((row['id'], row['score'], now))
+
+    def timed(self, event, payload, waiter, label):
+        waiter.clear()
+        start = time.perf_counter()
+        if payload is None:
+            self.sio.emit(event)
+        else:
+            self.sio.emit(event, payload)
+        if waiter.wait(10):
+            self.results['latency'].setdefault(label, []).append(time.perf_counter() - start)
+        else:
+            self.results['errors'].append(f'{label} timed out')
+
+    def run(self, updates, leaderboard_every):
+        self.timed('join_game', {'team_name': self.name}, self.reply, 'join_game')
+        for i in range(1, updates + 1):
+            self.sent_updates.append((self.team_id, float(i), time.perf_counter()))
+            self.timed('update_score', {'score': i}, self.reply, 'update_score')
+            if i % leaderboard_every == 0:
+                self.timed('request_leaderboard', None, self.snapshot, 'request_leaderboard')
+
+
+def http_reader(url, results, stop):
+    import requests
+    http = requests.Session()
+    while not stop.is_set():
+        for route in ('/api/teams', '/api/stats'):
+            start = time.perf_counter()
+            response = http.get(url + route)
+            elapsed = time.perf_counter() - start
+            if response.ok:
+                results['latency'].setdefault('GET ' + route, []).append(elapsed)
+            else:
+                results['errors'].append(f'GET {route}: {response.status_code}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--updates', type=int, default=40)
+    parser.add_argument('--leaderboard-every', type=int, default=10)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=18180)
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    import requests
+
+    temp_dir = tempfile.mkdtemp(prefix='scoreboard-load-')
+    # Every client shares one address and sends as fast as it can, so the
+    # rate limits are off: this measures the server, not the limiter
+    env = dict(os.environ, DATABASE_FILE=os.path.join(temp_dir, 'load.db'), RATE_LIMITS='off',
+               PYTHONUNBUFFERED='1')
+    log = open(os.path.join(temp_dir, 'server.log'), 'w')
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--server', str(args.port)],
+                              cwd=ROOT, env=env, stdout=log, stderr=log)
+    url = f'http://127.0.0.1:{args.port}'
+
+    try:
+        deadline = time.time() + 15
+        while True:
+            try:
+                requests.get(url + '/api/teams', timeout=1)
+                break
+            except requests.RequestException:
+                if time.time() > deadline:
+                    raise RuntimeError('server did not start')
+                time.sleep(0.2)
+
+        results = {'latency': {}, 'errors': [], 'seen': []}
+        sent_updates = []
+        clients = [LoadClient(url, f'Load Team {i}', results, sent_updates) for i in range(args.clients)]
+
+        stop = threading.Event()
+        readers = [threading.Thread(target=http_reader, args=(url, results, stop))
+                   for _ in range(args.readers)]
+        workers = [threading.Thread(target=client.run, args=(args.updates, args.leaderboard_every))
+                   for client in clients]
+
+        ops_before = requests.get(url + '/_bench/db-ops').json()['statements']
+        cpu_before = cpu_seconds(server.pid)
+        start = time.perf_counter()
+        for thread in readers + workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        for thread in readers:
+            thread.join()
+        time.sleep(1)  # let the last broadcasts arrive
+        cpu_used = cpu_seconds(server.pid) - cpu_before
+        ops = requests.get(url + '/_bench/db-ops').json()['statements'] - ops_before
+
+        # Fan-out: for each update, the time until the slowest client saw a
+        # broadcast with that score (or a later one) for the team
+        seen = {}
+        for team_id, score, at in results['seen']:
+            seen.setdefault(team_id, []).append((score, at))
+        fanout = []
+        for team_id, score, sent_at in sent_updates:
+            per_client = [at for s, at in seen.get(team_id, []) if s >= score and at >= sent_at]
+            if len(per_client) >= len(clients):
+                fanout.append(sorted(per_client)[len(clients) - 1] - sent_at)
+
+        socket_events = sum(len(v) for k, v in results['latency'].items() if not k.startswith('GET'))
+        http_requests = sum(len(v) for k, v in results['latency'].items() if k.startswith('GET'))
+        report = {
+            'commit': subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                     capture_output=True, text=True).stdout.strip(),
+            'clients': args.clients,
+            'updates_per_client': args.updates,
+            'readers': args.readers,
+            'duration_s': round(elapsed, 2),
+            'socket_events_per_s': round(socket_events / elapsed, 1),
+            'http_requests_per_s': round(http_requests / elapsed, 1),
+            'latency_ms': {label: percentiles(samples) for label, samples in sorted(results['latency'].items())},
+            'broadcast_fanout_ms': percentiles(fanout),
+            'server_cpu_s': round(cpu_used, 2),
+            'server_cpu_percent': round(100 * cpu_used / elapsed, 1),
+            'db_statements_per_event': round(ops / max(socket_events + http_requests, 1), 2),
+            'errors': len(results['errors'])
+        }
+
+        print(f"commit {report['commit']}: {args.clients} clients x {args.updates} updates, "
+              f"{args.readers} HTTP readers, {elapsed:.2f}s")
+        print(f"{'':<22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        rows = list(report['latency_ms'].items()) + [('broadcast fan-out', report['broadcast_fanout_ms'])]
+        for label, p in rows:
+            print(f"{label:<22}{p['count']:>8}{p['p50'] or 0:>10}{p['p95'] or 0:>10}{p['p99'] or 0:>10}")
+        print(f"socket events/s {report['socket_events_per_s']}, HTTP requests/s {report['http_requests_per_s']}")
+        print(f"server CPU {report['server_cpu_s']}s ({report['server_cpu_percent']}%), "
+              f"{report['db_statements_per_event']} SQL statements per event, {report['errors']} errors")
+        for error in results['errors'][:5]:
+            print(f"  {error}")
+
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+
+        for client in clients:
+            client.sio.disconnect()
+        return 1 if results['errors'] else 0
+    finally:
+        server.terminate()
+        server.wait()
+        log.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--server':
+        run_server(int(sys.argv[2]))
+    else:
+        sys.exit(main())
@@ -0,0 +1,285 @@
+"""Scale-out harness: N worker processes sharing one database and a message queue.
+
+Starts a small local pub/sub broker as a stand-in for Redis, then N app
+workers on consecutive ports. Each worker uses the broker as its Socket.IO
+message queue. Clients are spread across the workers, the way sticky
+sessions would pin them. Every client joins, taps increment_score and keeps
+its own leaderboard from snapshots and patches, like static/js/app.js.
+The run passes only if every client ends with every team at the right
+score.
+
+Needs the Socket.IO client extras: pip install requests websocket-client
+
+    python benchmarks/scaleout_harness.py [workers] [clients_per_worker] [taps]
+"""
+import os
+import pickle
+import socketserver
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASE_PORT = int(os.environ.get('HARNESS_BASE_PORT', '18080'))
+
+
+def read_frame(sock):
+    header = b''
+    while len(header) < 4:
+        chunk = sock.recv(4 - len(header))
+        if not chunk:
+            return None
+        header += chunk
+    size = struct.unpack('>I', header)[0]
+    payload = b''
+    while len(payload) < size:
+        chunk = sock.recv(size - len(payload))
+        if not chunk:
+            return None
+        payload += chunk
+    return payload
+
+
+def frame(payload):
+    return struct.pack('>I', len(payload)) + payload
+
+
+class Broker(socketserver.ThreadingTCPServer):
+    """Fan-out broker: every frame published is sent to every subscriber."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, BrokerHandler)
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.published = 0
+
+    def publish(self, payload):
+        with self.lock:
+            self.published += 1
+            for subscriber in list(self.subscribers):
+                try:
+                    subscriber.sendall(frame(payload))
+                except OSError:
+                    self.subscribers.remove(subscriber)
+
+
+class BrokerHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        role = self.request.recv(4)
+        if role == b'SUB ':
+            with self.server.lock:
+                self.server.subscribers.append(self.request)
+            # Keep the connection open until the subscriber goes away
+            while self.request.recv(1):
+                pass
+        elif role == b'PUB ':
+            while True:
+                payload = read_frame(self.request)
+                if payload is None:
+                    return
+                self.server.publish(payload)
+
+
+def local_queue_manager(port):
+    """python-socketio client manager that talks to the local Broker."""
+    import socketio
+    from eventlet.green import socket as green_socket
+
+    class LocalQueueManager(socketio.PubSubManager):
+        name = 'local'
+
+        def __init__(self):
+            super().__init__(channel='scoreboard')
+            self._pub = None
+
+        def _connect(self, role):
+            sock = green_socket.create_connection(('127.0.0.1', port))
+            sock.sendall(role)
+            return sock
+
+        def _publish(self, data):
+            if self._pub is None:
+                self._pub = self._connect(b'PUB ')
+            self._pub.sendall(frame(pickle.dumps(data)))
+
+        def _listen(self):
+            sock = self._connect(b'SUB ')
+            while True:
+                payload = read_frame(sock)
+                if payload is None:
+                    return
+                yield pickle.loads(payload)
+
+    return LocalQueueManager()
+
+
+def run_worker(port, queue_port):
+    """Entry point of a worker subprocess."""
+    import app
+
+    manager = local_queue_manager(queue_port)
+    server = app.socketio.server
+    manager.set_server(server)
+    server.manager = manager
+    server.manager_initialized = False
+
+    app.init_app()
+    app.start_background_tasks()
+    app.socketio.run(app.app, host='127.0.0.1', port=port, debug=False, log_output=False)
+
+
+class BoardClient:
+    """A phone: joins, taps, and mirrors the leaderboard like app.js does."""
+
+    def __init__(self, url, name):
+        import requests
+        import socketio
+
+        self.url = url
+        self.name = name
+        self.seq = None
+        self.teams = {}
+        self.patches = 0
+        self.snapshots = 0
+        self.joined = threading.Event()
+        self.lock = threading.Lock()
+
+        http = requests.Session()
+        http.get(url + '/join')
+        cookie = '; '.join(f'{key}={value}' for key, value in http.cookies.items())
+
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on('leaderboard_update', self.on_snapshot)
+        self.sio.on('leaderboard_patch', self.on_patch)
+        self.sio.on('team_joined', lambda data: self.joined.set())
+        self.sio.on('error', lambda data: print(f"{name}: error {data['message']}"))
+        self.sio.connect(url, headers={'Cookie': cookie}, transports=['websocket'])
+        self.sio.emit('request_leaderboard')
+
+    def on_snapshot(self, data):
+        with self.lock:
+            self.teams = {team['id']: team for team in data['teams']}
+            self.seq = data['seq']
+            self.snapshots += 1
+
+    def on_patch(self, patch):
+        with self.lock:
+            if self.seq is None or patch['seq'] <= self.seq:
+                return
+            if patch['base'] > self.seq:
+                self.seq = None
+                self.sio.emit('request_leaderboard')
+                return
+            for team_id in patch['removed']:
+                self.teams.pop(team_id, None)
+            for row in patch['teams']:
+                self.teams.setdefault(row['id'], {}).update(row)
+            self.seq = patch['seq']
+            self.patches += 1
+
+    def scores(self):
+        with self.lock:
+            return {team['name']: team['score'] for team in self.teams.values()}
+
+
+def wait_for(url, timeout=15):
+    import requests
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url + '/api/teams', timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"worker at {url} did not start")
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    per_worker = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    taps = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    temp_dir = tempfile.mkdtemp(prefix='scoreboard-scaleout-')
+    broker = Broker(('127.0.0.1', 0))
+    threading.Thread(target=broker.serve_forever, daemon=True).start()
+    queue_port = broker.server_address[1]
+
+    env = dict(os.environ,
+               DATABASE_FILE=os.path.join(temp_dir, 'scaleout.db'),
+               SCALE_OUT='1',
+               SESSION_STORE='sqlite',
+               RATE_LIMITS='off',
+               PYTHONUNBUFFERED='1')
+    # Create the schema (and shared secret key) once before workers race for it
+    subprocess.run([sys.executable, '-c', 'import app; app.init_app()'], cwd=ROOT, env=env,
+                   check=True, stdout=subprocess.DEVNULL)
+
+    processes = []
+    urls = []
+    log = open(os.path.join(temp_dir, 'workers.log'), 'w')
+    try:
+        for worker_id in range(workers):
+            port = BASE_PORT + worker_id
+            processes.append(subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), '--worker', str(port), str(queue_port)],
+                cwd=ROOT, env=dict(env, WORKER_ID=str(worker_id)), stdout=log, stderr=log
+            ))
+            urls.append(f'http://127.0.0.1:{port}')
+        for url in urls:
+            wait_for(url)
+
+        clients = []
+        for i in range(workers * per_worker):
+            clients.append(BoardClient(urls[i % workers], f'Team {i}'))
+
+        for client in clients:
+            client.sio.emit('join_game', {'team_name': client.name})
+        for client in clients:
+            if not client.joined.wait(10):
+                raise RuntimeError(f"{client.name} could not join")
+
+        start = time.perf_counter()
+        for _ in range(taps):
+            for client in clients:
+                client.sio.emit('increment_score', {'delta': 1})
+            time.sleep(0.01)
+
+        expected = {client.name: float(taps) for client in clients}
+        deadline = time.time() + 20
+        while time.time() < deadline:
+            if all(client.scores() == expected for client in clients):
+                break
+            time.sleep(0.1)
+        elapsed = time.perf_counter() - start
+
+        converged = [client for client in clients if client.scores() == expected]
+        print(f"{workers} workers, {len(clients)} clients, {taps} taps each "
+              f"({len(clients) * taps} updates) in {elapsed:.2f}s")
+        print(f"queue messages: {broker.published}")
+        print(f"patches per client: {min(c.patches for c in clients)}-{max(c.patches for c in clients)}, "
+              f"snapshots per client: {max(c.snapshots for c in clients)}")
+        print(f"clients that saw every update: {len(converged)}/{len(clients)}")
+        for client in clients:
+            client.sio.disconnect()
+        return 0 if len(converged) == len(clients) else 1
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+        log.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        run_worker(int(sys.argv[2]), int(sys.argv[3]))
+    else:
+        sys.exit(main())
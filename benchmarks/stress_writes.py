@@ -0,0 +1,81 @@
+"""Stress test: hundreds of concurrent score writers against a temp database.
+
+Every writer thread owns one team and writes an increasing score sequence
+while reader threads keep polling the leaderboard. At the end each team must
+hold its writer's last score and no call may have failed with
+"database is locked".
+
+    python benchmarks/stress_writes.py [writers] [writes_per_writer] [readers]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEMP_DIR = tempfile.mkdtemp(prefix='scoreboard-stress-')
+os.environ['DATABASE_FILE'] = os.path.join(TEMP_DIR, 'stress.db')
+
+import database as db  # noqa: E402
+
+
+def main():
+    db.init_database()
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    teams = [db.create_team(f'Team {i}')['id'] for i in range(writers)]
+    errors = []
+    reads = [0]
+    stop_reading = threading.Event()
+    start = threading.Barrier(writers + readers)
+
+    def write(team_id):
+        start.wait()
+        for score in range(1, writes + 1):
+            try:
+                db.update_team_score(team_id, score)
+            except Exception as e:
+                errors.append(f'write {team_id}: {e}')
+
+    def read():
+        start.wait()
+        while not stop_reading.is_set():
+            try:
+                db.get_all_teams()
+                reads[0] += 1
+            except Exception as e:
+                errors.append(f'read: {e}')
+
+    threads = [threading.Thread(target=write, args=(t,)) for t in teams]
+    reader_threads = [threading.Thread(target=read) for _ in range(readers)]
+
+    began = time.perf_counter()
+    for thread in threads + reader_threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    stop_reading.set()
+    for thread in reader_threads:
+        thread.join()
+
+    final = {team['id']: team['score'] for team in db.get_all_teams()}
+    wrong = [t for t in teams if final.get(t) != writes]
+
+    total = writers * writes
+    print(f"profile={db.STORAGE_PROFILE} writers={writers} writes={total} readers={readers}")
+    print(f"{total / elapsed:.0f} writes/s, {reads[0]} leaderboard reads in {elapsed:.2f}s")
+    print(f"{db._writer.batches} commits ({total / max(db._writer.batches, 1):.1f} writes per commit)")
+    print(f"errors: {len(errors)}, wrong final scores: {len(wrong)}")
+    for error in errors[:10]:
+        print(f"  {error}")
+
+    return 1 if errors or wrong else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import threading
+import time
+
+from logs import get_logger
+
+log = get_logger('broadcast')
+
+
+class BroadcastScheduler:
+    """Coalesces leaderboard changes into a bounded number of broadcasts.
+
+    Handlers call ``mark_dirty()`` instead of broadcasting. A background task
+    on the Socket.IO hub wakes every ``interval`` seconds and flushes once the
+    burst has gone quiet for a tick, or once the oldest pending change is
+    ``max_latency`` seconds old, whichever comes first. That caps broadcasts
+    at ``1 / interval`` per second no matter how fast players tap.
+
+    Changes are tracked per game, and ``flush(game_id, changed_ids,
+    removed_ids, full)`` does the actual emit for each game that changed.
+    An ``interval`` of 0 disables coalescing and flushes on every change.
+
+    ``poll()``, if given, is called every tick and returns
+    ``{game_id: (changed_ids, removed_ids)}`` for changes made elsewhere
+    (e.g. by other worker processes); those are broadcast like local ones.
+    """
+
+    def __init__(self, socketio, flush, interval=0.1, max_latency=0.5, poll=None):
+        self.socketio = socketio
+        self.flush = flush
+        self.interval = interval
+        self.max_latency = max_latency
+        self.poll = poll
+
+        self._lock = threading.Lock()
+        self._dirty = {}  # game id -> [changed, removed, full]
+        self._pending = 0
+        self._first_mark = None
+        self._marked_since_tick = False
+        self._task = None
+
+        self.flushes = 0
+        self.mutations = 0
+        self.max_coalesced = 0
+        self.last_coalesced = 0
+
+    def mark_dirty(self, game_id, changed=(), removed=(), full=False):
+        """Record a change to a game to be included in its next broadcast."""
+        with self._lock:
+            dirty = self._dirty.setdefault(game_id, [set(), set(), False])
+            dirty[0].update(changed)
+            dirty[0].difference_update(removed)
+            dirty[1].update(removed)
+            dirty[2] = dirty[2] or full
+            self._pending += 1
+            self._marked_since_tick = True
+            if self._first_mark is None:
+                self._first_mark = time.monotonic()
+
+        if self.interval <= 0:
+            self.flush_now()
+        else:
+            self.start()
+
+    def start(self):
+        """Start the background flush task if it isn't running yet."""
+        if self._task is None:
+            self._task = self.socketio.start_background_task(self._run)
+
+    def flush_now(self):
+        """Broadcast everything pending immediately."""
+        with self._lock:
+            if not self._pending:
+                return
+            dirty = self._dirty
+            coalesced = self._pending
+            self._dirty = {}
+            self._pending = 0
+            self._first_mark = None
+            self._marked_since_tick = False
+
+        for game_id, (changed, removed, full) in dirty.items():
+            self.flush(game_id, changed, removed, full)
+
+        self.flushes += len(dirty)
+        self.mutations += coalesced
+        self.last_coalesced = coalesced
+        self.max_coalesced = max(self.max_coalesced, coalesced)
+
+    def _run(self):
+        while True:
+            self.socketio.sleep(self.interval or 0.1)
+            if self.poll is not None:
+                try:
+                    for game_id, (changed, removed) in self.poll().items():
+                        self.mark_dirty(game_id, changed, removed)
+                except Exception as e:
+                    log.error('leaderboard_poll_failed', error=str(e))
+            with self._lock:
+                if not self._pending:
+                    continue
+                quiet = not self._marked_since_tick
+                overdue = time.monotonic() - self._first_mark >= self.max_latency
+                self._marked_since_tick = False
+            if quiet or overdue:
+                try:
+                    self.flush_now()
+                except Exception as e:
+                    log.error('leaderboard_broadcast_failed', error=str(e))
+
+    def stats(self):
+        """Coalescing metrics for the admin/monitoring endpoints."""
+        return {
+            'interval': self.interval,
+            'max_latency': self.max_latency,
+            'flushes': self.flushes,
+            'mutations': self.mutations,
+            'pending': self._pending,
+            'avg_coalesced': round(self.mutations / self.flushes, 2) if self.flushes else 0,
+            'last_coalesced': self.last_coalesced,
+            'max_coalesced': self.max_coalesced
+        }
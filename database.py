@@ -1,328 +1,913 @@
 import sqlite3
 import uuid
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
+import json
 import os
-
-DATABASE_FILE = 'leaderboard.db'
+from leaderboard import Leaderboard, Leaderboards
+import metrics
+import migrations
+from logs import get_logger
+from score_log import ScoreLog, replay
+
+DATABASE_FILE = os.environ.get('DATABASE_FILE', 'leaderboard.db')
+
+log = get_logger('database')
+_timed = metrics.timed(metrics.db_call_seconds)
+
+WRITE_BATCH_SECONDS = metrics.registry.histogram(
+    'scoreboard_db_write_batch_seconds', 'Time to run and commit one writer batch'
+)
+WRITE_BATCH_JOBS = metrics.registry.histogram(
+    'scoreboard_db_write_batch_jobs', 'Write jobs committed per batch', buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+
+class DuplicateTeamName(ValueError):
+    """Raised when a team name is already taken in its game (case-insensitive)."""
+
+class GameNotLive(ValueError):
+    """Raised when a game doesn't exist or has been archived."""
+
+# Number of idle connections kept open for reuse (0 disables pooling)
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '8'))
+
+# Online backups copy this many pages per step, sleeping in between
+BACKUP_PAGES = int(os.environ.get('BACKUP_PAGES', '256'))
+BACKUP_STEP_SLEEP = float(os.environ.get('BACKUP_STEP_SLEEP', '0.005'))
+
+# Score history: a snapshot of all teams is stored every N events or T seconds
+SNAPSHOT_EVERY = int(os.environ.get('SCORE_SNAPSHOT_EVERY', '500'))
+SNAPSHOT_INTERVAL = float(os.environ.get('SCORE_SNAPSHOT_INTERVAL', '60'))
+
+# Storage profiles: pragmas applied to every connection.
+# 'fast' suits a party: WAL lets phones read while a write is in flight and
+# synchronous=NORMAL only fsyncs at checkpoints. 'safe' fsyncs every commit,
+# 'legacy' is SQLite's default rollback journal.
+STORAGE_PROFILES = {
+    'fast': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 64 * 1024 * 1024,
+        'cache_size': -16000,  # negative = KiB, so ~16 MB
+    },
+    'safe': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'busy_timeout': 10000,
+        'mmap_size': 0,
+        'cache_size': -8000,
+    },
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+        'mmap_size': 0,
+        'cache_size': -2000,
+    },
+}
+
+STORAGE_PROFILE = os.environ.get('DB_STORAGE_PROFILE', 'fast')
+
+def get_storage_profile():
+    """Return the pragma settings for the configured storage profile."""
+    if STORAGE_PROFILE not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile: {STORAGE_PROFILE}")
+    return STORAGE_PROFILES[STORAGE_PROFILE]
 
 def get_db_connection():
     """Get a database connection with row factory for easier access."""
-    conn = sqlite3.connect(DATABASE_FILE)
+    conn = sqlite3.connect(DATABASE_FILE, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    configure_connection(conn)
     return conn
 
-def init_database():
-    """Initialize the database with required tables."""
-    conn = get_db_connection()
-
-    # Create teams table
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS teams (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            score REAL DEFAULT 0,
-            is_locked BOOLEAN DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    # Add is_locked column if it doesn't exist
-    try:
-        conn.execute('ALTER TABLE teams ADD COLUMN is_locked BOOLEAN DEFAULT 0')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-
-    # Migrate existing tables to support decimal scores
+def configure_connection(conn):
+    """Apply per-connection pragmas. Runs once when a connection is opened."""
+    profile = get_storage_profile()
+    conn.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout'])}")
+    conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+    conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+    conn.execute(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+    conn.execute('PRAGMA temp_store = MEMORY')
+
+class ConnectionPool:
+    """Pool of long-lived SQLite connections.
+
+    Idle connections are handed out LIFO so the connection with the warmest
+    page cache is reused first. The pool never blocks: if every connection is
+    borrowed a temporary one is opened and closed again on release, so a
+    greenthread holding a connection can't deadlock the eventlet hub.
+    """
+
+    def __init__(self, size=POOL_SIZE):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self.opened += 1
+            return get_db_connection()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._idle.qsize() < self.size:
+            self._idle.put_nowait(conn)
+        else:
+            conn.close()
+
+    def close_all(self):
+        """Close every idle connection (e.g. before swapping DATABASE_FILE)."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+_pool = ConnectionPool()
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled connection for the duration of a ``with`` block."""
+    conn = _pool.acquire()
     try:
-        # Check if score column is INTEGER and migrate if needed
-        cursor = conn.execute("PRAGMA table_info(teams)")
-        columns = cursor.fetchall()
-        score_column = next((col for col in columns if col[1] == 'score'), None)
-
-        if score_column and score_column[2] == 'INTEGER':
-            # Create backup and migrate
-            conn.execute('''
-                CREATE TABLE teams_backup AS SELECT * FROM teams
-            ''')
-            conn.execute('DROP TABLE teams')
-            conn.execute('''
-                CREATE TABLE teams (
-                    id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    score REAL DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        yield conn
+    finally:
+        _pool.release(conn)
+
+class _WriteJob:
+    """A mutation waiting for the writer thread."""
+
+    def __init__(self, fn, args, on_commit):
+        self.fn = fn
+        self.args = args
+        self.on_commit = on_commit
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+class WriteQueue:
+    """Single-writer queue that funnels every mutation through one connection.
+
+    Readers use pooled connections and, in WAL mode, never wait on a writer.
+    Jobs queued while a transaction is running are committed together, so a
+    burst of taps costs one commit instead of one per tap. Each job runs in
+    its own savepoint so a failing job doesn't undo the rest of its batch.
+
+    Score events recorded by jobs in ``log`` are flushed just before the
+    batch commits, so they cost no extra fsync.
+    """
+
+    MAX_BATCH = 64
+
+    def __init__(self, log=None):
+        self.log = log
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._conn = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.jobs = 0
+
+    def submit(self, fn, *args, on_commit=None):
+        """Run ``fn(conn, *args)`` on the writer connection and return its result.
+
+        ``on_commit(result)`` is called on the writer thread once the job's
+        transaction has committed, in commit order.
+        """
+        self._ensure_started()
+        job = _WriteJob(fn, args, on_commit)
+        self._jobs.put(job)
+        job.done.wait()
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='sqlite-writer', daemon=True
                 )
-            ''')
-            conn.execute('''
-                INSERT INTO teams (id, name, score, created_at, updated_at)
-                SELECT id, name, CAST(score AS REAL), created_at, updated_at
-                FROM teams_backup
-            ''')
-            conn.execute('DROP TABLE teams_backup')
-            print("✅ Database migrated to support decimal scores")
-    except Exception as e:
-        print(f"Migration info: {e}")
-
-    # Create games table (for future multi-game support)
-    conn.execute('''
-        CREATE TABLE IF NOT EXISTS games (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            is_active BOOLEAN DEFAULT 0,
-            players_locked BOOLEAN DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-
-    # Add players_locked column if it doesn't exist
-    try:
-        conn.execute('ALTER TABLE games ADD COLUMN players_locked BOOLEAN DEFAULT 0')
-    except sqlite3.OperationalError:
-        pass  # Column already exists
-
-    # Create a default game if none exists
-    existing_game = conn.execute('SELECT COUNT(*) as count FROM games').fetchone()
-    if existing_game['count'] == 0:
-        game_id = str(uuid.uuid4())
-        conn.execute(
-            'INSERT INTO games (id, name, is_active, players_locked) VALUES (?, ?, ?, ?)',
-            (game_id, 'Birthday Game', 1, 0)
-        )
-
-    conn.commit()
-    conn.close()
+                self._thread.start()
+
+    def stop(self):
+        """Stop the writer thread and close its connection."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._jobs.put(None)
+            thread.join()
+
+    def _run(self):
+        self._conn = get_db_connection()
+        self._conn.isolation_level = None  # transactions are managed below
+
+        try:
+            while True:
+                job = self._jobs.get()
+                if job is None:
+                    return
+                batch = [job]
+                while len(batch) < self.MAX_BATCH:
+                    try:
+                        job = self._jobs.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        self._jobs.put(None)
+                        break
+                    batch.append(job)
+                self._run_batch(batch)
+        finally:
+            self._conn.close()
+
+    def _run_batch(self, batch):
+        conn = self._conn
+        start = time.perf_counter()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for job in batch:
+                conn.execute('SAVEPOINT job')
+                mark = self.log.mark() if self.log else None
+                try:
+                    job.result = job.fn(conn, *job.args)
+                except Exception as e:
+                    job.error = e
+                    conn.execute('ROLLBACK TO job')
+                    if self.log:
+                        self.log.rollback(mark)
+                conn.execute('RELEASE job')
+            if self.log:
+                self.log.flush(conn)
+            conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            if self.log:
+                self.log.discard()
+            for job in batch:
+                if job.error is None:
+                    job.error = e
+        for job in batch:
+            if job.error is None and job.on_commit is not None:
+                try:
+                    job.on_commit(job.result)
+                except Exception as e:
+                    log.error('write_hook_failed', error=str(e))
+        WRITE_BATCH_SECONDS.observe(time.perf_counter() - start)
+        WRITE_BATCH_JOBS.observe(len(batch))
+        self.batches += 1
+        self.jobs += len(batch)
+        for job in batch:
+            job.done.set()
+
+def _committed_score(team_id):
+    team = leaderboards.get(team_id)
+    return team['score'] if team else None
+
+score_log = ScoreLog(_committed_score, snapshot_every=SNAPSHOT_EVERY, snapshot_interval=SNAPSHOT_INTERVAL)
+
+_writer = WriteQueue(log=score_log)
+
+# In-memory ranking of each live game, served to every reader; SQLite
+# remains the durable store
+leaderboards = Leaderboards()
+
+def _cache_team(team):
+    if team is not None:
+        leaderboards.upsert(team)
+
+def _uncache_team(team_id):
+    return lambda game_id: game_id and leaderboards.remove(team_id)
+
+# Live games and their players lock are checked on every score tap but only
+# changed by the admin, so they are cached here; team locks are read from
+# the boards. New teams and pages without a game use the active game.
+_live_games = {}  # game id -> players_locked
+_active_game_id = None
+
+LIVE_GAMES = 'SELECT id, is_active, players_locked FROM games WHERE archived_at IS NULL'
+
+def _cache_games(games):
+    global _live_games, _active_game_id
+    _live_games = {game['id']: bool(game['players_locked']) for game in games}
+    _active_game_id = next((game['id'] for game in games if game['is_active']), None)
+    for game_id in leaderboards.games():
+        if game_id not in _live_games:
+            leaderboards.drop(game_id)
+
+def _cache_players_locked(game_id, locked):
+    if game_id in _live_games:
+        _live_games[game_id] = bool(locked)
+
+@_timed
+def load_leaderboard():
+    """(Re)load every live game's board and lock state from the database."""
+    with db_connection() as conn:
+        teams = conn.execute('SELECT * FROM teams').fetchall()
+        games = conn.execute(LIVE_GAMES).fetchall()
+    _cache_games(games)
+    leaderboards.load([dict(team) for team in teams], game_ids=_live_games)
+
+# Multi-process support: other workers write to the same file, so each
+# process watches PRAGMA data_version (which changes whenever another
+# connection commits) and pulls in recently updated rows when it moves.
+_sync_lock = threading.Lock()
+_watch_conn = None
+_watch_version = None
+_sync_watermark = ''
+
+# Rows updated this many seconds before the newest one already seen are
+# fetched again, covering transactions that committed out of order
+SYNC_OVERLAP_SECONDS = 2
+
+def _game_changes(changes, game_id):
+    return changes.setdefault(game_id, (set(), set()))
+
+def _sync_team(team, changes):
+    if leaderboards.get(team['id']) != team:
+        leaderboards.upsert(team)
+        _game_changes(changes, team['game_id'])[0].add(team['id'])
+
+@_timed
+def sync_from_peers():
+    """Apply writes committed by other processes to the in-memory state.
+
+    Returns ``{game_id: (changed_ids, removed_ids)}`` for the games that
+    changed. When nothing was committed this costs a single PRAGMA on a
+    dedicated connection.
+    """
+    global _watch_conn, _watch_version, _sync_watermark
+    changes = {}
+
+    with _sync_lock:
+        if _watch_conn is None:
+            _watch_conn = get_db_connection()
+        version = _watch_conn.execute('PRAGMA data_version').fetchone()[0]
+        if version == _watch_version:
+            return changes
+        _watch_version = version
+
+        # One read transaction so rows, count and lock state agree
+        _watch_conn.execute('BEGIN')
+        try:
+            if _sync_watermark:
+                rows = _watch_conn.execute(
+                    'SELECT * FROM teams WHERE updated_at >= datetime(?, ?)',
+                    (_sync_watermark, f'-{SYNC_OVERLAP_SECONDS} seconds')
+                ).fetchall()
+            else:
+                rows = _watch_conn.execute('SELECT * FROM teams').fetchall()
+            count = _watch_conn.execute('SELECT COUNT(*) as count FROM teams').fetchone()['count']
+            games = _watch_conn.execute(LIVE_GAMES).fetchall()
+
+            for row in rows:
+                _sync_team(dict(row), changes)
+                _sync_watermark = max(_sync_watermark, row['updated_at'])
+
+            # Deleted, archived (or unseen) rows don't show up by timestamp;
+            # resync them all
+            if count != len(leaderboards):
+                teams = {row['id']: dict(row) for row in _watch_conn.execute('SELECT * FROM teams')}
+                for team_id in leaderboards.ids() - teams.keys():
+                    _game_changes(changes, leaderboards.game_of(team_id))[1].add(team_id)
+                    leaderboards.remove(team_id)
+                for team in teams.values():
+                    _sync_team(team, changes)
+        finally:
+            _watch_conn.execute('COMMIT')
+
+        _cache_games(games)
+
+    return changes
+
+@_timed
+def init_database():
+    """Bring the schema up to date and load the leaderboard.
+
+    Call once at startup; importing this module doesn't touch the database.
+    Returns a timing report, which is also logged.
+    """
+    start = time.perf_counter()
+    with db_connection() as conn:
+        conn.execute(f"PRAGMA journal_mode = {get_storage_profile()['journal_mode']}")
+        applied = migrations.migrate(conn)
+        version = migrations.get_version(conn)
+    migrated = time.perf_counter()
+    load_leaderboard()
+    loaded = time.perf_counter()
+
+    report = {
+        'schema_version': version,
+        'migrations_applied': applied,
+        'migrate_ms': round((migrated - start) * 1000, 1),
+        'load_ms': round((loaded - migrated) * 1000, 1),
+        'games': len(_live_games),
+        'teams': len(leaderboards)
+    }
+    log.info('database_ready', **report)
+    return report
 
+def _raise_integrity_error(e):
+    """Translate a constraint failure on the teams table."""
+    if 'teams.name' in str(e):
+        raise DuplicateTeamName("Team name already exists")
+    raise ValueError("Team ID conflict")
+
+@_timed
 def get_active_game():
     """Get the currently active game."""
-    conn = get_db_connection()
-    game = conn.execute('SELECT * FROM games WHERE is_active = 1 LIMIT 1').fetchone()
-    conn.close()
+    with db_connection() as conn:
+        game = conn.execute('SELECT * FROM games WHERE is_active = 1 LIMIT 1').fetchone()
     return dict(game) if game else None
 
-def get_all_teams():
-    """Get all teams ordered by score descending."""
-    conn = get_db_connection()
-    teams = conn.execute(
-        'SELECT * FROM teams ORDER BY score DESC, created_at ASC'
-    ).fetchall()
-    conn.close()
-    return [dict(team) for team in teams]
+def get_active_game_id():
+    """ID of the game new teams join and pages without a game show."""
+    return _active_game_id
+
+def is_live_game(game_id):
+    """True if the game exists and hasn't been archived."""
+    return game_id in _live_games
+
+def _game(game_id):
+    return game_id or _active_game_id
+
+@_timed
+def get_games():
+    """Every game, live ones first, each with its team count."""
+    with db_connection() as conn:
+        games = [dict(row) for row in conn.execute('''
+            SELECT games.*, (SELECT COUNT(*) FROM archived_teams WHERE game_id = games.id) AS archived_teams
+            FROM games ORDER BY archived_at IS NOT NULL, created_at
+        ''')]
+    for game in games:
+        # Live teams are counted from memory, archived ones in the cold table
+        game['team_count'] = len(leaderboards.board(game['id'])) if game['archived_at'] is None \
+            else game['archived_teams']
+        del game['archived_teams']
+    return games
+
+def _insert_game(conn, game_id, name, activate):
+    if activate:
+        conn.execute('UPDATE games SET is_active = 0 WHERE is_active = 1')
+    conn.execute(
+        'INSERT INTO games (id, name, is_active, players_locked) VALUES (?, ?, ?, 0)',
+        (game_id, name, 1 if activate else 0)
+    )
+    return [dict(row) for row in conn.execute(LIVE_GAMES)]
+
+@_timed
+def create_game(name, activate=False):
+    """Start a new, empty game and return its ID; ``activate`` makes it the default."""
+    game_id = str(uuid.uuid4())
+    _writer.submit(_insert_game, game_id, name, activate, on_commit=_cache_games)
+    return game_id
+
+def _activate_game(conn, game_id):
+    if not conn.execute('SELECT 1 FROM games WHERE id = ? AND archived_at IS NULL', (game_id,)).fetchone():
+        raise GameNotLive("Game not found")
+    conn.execute('UPDATE games SET is_active = (id = ?)', (game_id,))
+    return [dict(row) for row in conn.execute(LIVE_GAMES)]
+
+@_timed
+def set_active_game(game_id):
+    """Make a live game the default. Raises GameNotLive if it isn't one."""
+    _writer.submit(_activate_game, game_id, on_commit=_cache_games)
+
+def _archive_game(conn, game_id):
+    game = conn.execute('SELECT is_active FROM games WHERE id = ? AND archived_at IS NULL', (game_id,)).fetchone()
+    if game is None:
+        raise GameNotLive("Game not found")
+    if game['is_active']:
+        raise ValueError("Make another game active before archiving this one")
+    # Final ranks in leaderboard order (see Leaderboard._key)
+    archived = conn.execute('''
+        INSERT INTO archived_teams (id, game_id, name, score, final_rank, is_locked, created_at, updated_at)
+        SELECT id, game_id, name, score,
+               ROW_NUMBER() OVER (ORDER BY score DESC, COALESCE(created_at, ''), id),
+               is_locked, created_at, updated_at
+        FROM teams WHERE game_id = ?
+    ''', (game_id,)).rowcount
+    for row in conn.execute('DELETE FROM teams WHERE game_id = ? RETURNING id', (game_id,)).fetchall():
+        score_log.record(row['id'], 'archive', game_id=game_id)
+    conn.execute('UPDATE games SET archived_at = CURRENT_TIMESTAMP WHERE id = ?', (game_id,))
+    return archived, [dict(row) for row in conn.execute(LIVE_GAMES)]
+
+@_timed
+def archive_game(game_id):
+    """Move a finished game's teams to archived_teams and drop its board.
+
+    Returns the number of teams archived. Raises GameNotLive if the game
+    isn't live, and ValueError if it's the active game.
+    """
+    return _writer.submit(_archive_game, game_id, on_commit=lambda result: _cache_games(result[1]))[0]
+
+@_timed
+def get_archived_teams(game_id):
+    """Final standings of an archived game, each with its rank."""
+    with db_connection() as conn:
+        rows = conn.execute(
+            'SELECT *, final_rank AS rank FROM archived_teams WHERE game_id = ? ORDER BY final_rank',
+            (game_id,)
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+def get_team_game(team_id):
+    """ID of the live game a team plays in, or None."""
+    return leaderboards.game_of(team_id)
+
+def get_leaderboard_version(game_id=None):
+    """Counter bumped by every change to a game's board; payload caches key on it."""
+    return leaderboards.board(_game(game_id)).version
+
+def get_all_teams(game_id=None):
+    """Get all of a game's teams (the active game's by default) ordered by score descending."""
+    return leaderboards.board(_game(game_id)).teams()
+
+def get_rank(team_id):
+    """Get a team's 1-based rank in its game, or None if it doesn't exist."""
+    return leaderboards.board(leaderboards.game_of(team_id)).rank(team_id)
+
+def get_top_teams(n, game_id=None):
+    """Get a game's n highest-scoring teams, each with its rank."""
+    return [dict(team, rank=rank) for rank, team in enumerate(leaderboards.board(_game(game_id)).top(n), 1)]
+
+def get_window(team_id, k):
+    """Get a team and up to k teams above and below it in its game, each with its rank.
+
+    Returns None if the team doesn't exist.
+    """
+    first_rank, teams = leaderboards.board(leaderboards.game_of(team_id)).window(team_id, k)
+    if first_rank is None:
+        return None
+    return [dict(team, rank=rank) for rank, team in enumerate(teams, first_rank)]
 
 def get_team_by_id(team_id):
     """Get a specific team by ID."""
-    conn = get_db_connection()
-    team = conn.execute('SELECT * FROM teams WHERE id = ?', (team_id,)).fetchone()
-    conn.close()
-    return dict(team) if team else None
+    return leaderboards.get(team_id)
 
-def create_team(name):
-    """Create a new team and return its data."""
+def _insert_team(conn, team_id, name, game_id):
+    try:
+        team = conn.execute(
+            'INSERT INTO teams (id, name, score, game_id) '
+            'SELECT ?, ?, ?, id FROM games WHERE id = ? AND archived_at IS NULL RETURNING *',
+            (team_id, name, 0, game_id)
+        ).fetchone()
+    except sqlite3.IntegrityError as e:
+        _raise_integrity_error(e)
+    if team is None:
+        raise GameNotLive("Game not found")
+    score_log.record(team_id, 'join', team['score'], name=team['name'], delta=0.0, game_id=game_id)
+    return dict(team)
+
+@_timed
+def create_team(name, game_id=None):
+    """Create a new team in a game (the active game by default) and return its data.
+
+    Raises DuplicateTeamName if the name is taken in that game
+    (case-insensitive) and GameNotLive if the game has been archived.
+    """
     team_id = str(uuid.uuid4())
-    conn = get_db_connection()
+    return _writer.submit(_insert_team, team_id, name, _game(game_id), on_commit=_cache_team)
 
+def _update_team_columns(conn, team_id, assignments, params, source=None):
+    """UPDATE one team and return its new row, logging a score event if ``source`` is set."""
     try:
-        conn.execute(
-            'INSERT INTO teams (id, name, score) VALUES (?, ?, ?)',
-            (team_id, name, 0)
-        )
-        conn.commit()
-
-        # Get the created team
-        team = conn.execute('SELECT * FROM teams WHERE id = ?', (team_id,)).fetchone()
-        result = dict(team) if team else None
-        conn.close()
-        return result
+        team = conn.execute(
+            f'UPDATE teams SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ? RETURNING *',
+            (*params, team_id)
+        ).fetchone()
     except sqlite3.IntegrityError as e:
-        conn.close()
-        raise ValueError("Team ID conflict")
-    except Exception as e:
-        conn.close()
-        raise e
-
+        _raise_integrity_error(e)
+    if team is None:
+        return None
+    if source is not None:
+        name = team['name'] if source in ('rename', 'admin') else None
+        score_log.record(team_id, source, team['score'], name=name, game_id=team['game_id'])
+    return dict(team)
+
+@_timed
 def update_team_name(team_id, new_name):
-    """Update a team's name."""
-    conn = get_db_connection()
-
-    cursor = conn.execute(
-        'UPDATE teams SET name = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-        (new_name, team_id)
-    )
-
-    updated = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-
-    if updated:
-        return get_team_by_id(team_id)
-    return None
+    """Update a team's name. Raises DuplicateTeamName if the name is taken."""
+    return _writer.submit(_update_team_columns, team_id, 'name = ?', (new_name,), 'rename',
+                          on_commit=_cache_team)
 
+@_timed
 def update_team_score(team_id, new_score):
     """Update a team's score."""
-    conn = get_db_connection()
+    return _writer.submit(_update_team_columns, team_id, 'score = ?', (new_score,), 'update',
+                          on_commit=_cache_team)
 
-    cursor = conn.execute(
-        'UPDATE teams SET score = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-        (new_score, team_id)
-    )
-
-    updated = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-
-    if updated:
-        return get_team_by_id(team_id)
-    return None
+@_timed
+def increment_team_score(team_id, delta):
+    """Atomically add ``delta`` to a team's score (never below 0) and return the team."""
+    return _writer.submit(_update_team_columns, team_id, 'score = MAX(score + ?, 0.0)', (float(delta),),
+                          'increment', on_commit=_cache_team)
 
+@_timed
 def update_team(team_id, name=None, score=None):
     """Update both team name and score."""
     if name is None and score is None:
         return get_team_by_id(team_id)
 
-    conn = get_db_connection()
-
     if name is not None and score is not None:
-        cursor = conn.execute(
-            'UPDATE teams SET name = ?, score = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-            (name, score, team_id)
-        )
+        return _writer.submit(_update_team_columns, team_id, 'name = ?, score = ?', (name, score),
+                              'admin', on_commit=_cache_team)
     elif name is not None:
-        cursor = conn.execute(
-            'UPDATE teams SET name = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-            (name, team_id)
-        )
+        return update_team_name(team_id, name)
     else:
-        cursor = conn.execute(
-            'UPDATE teams SET score = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-            (score, team_id)
-        )
-
-    updated = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+        return update_team_score(team_id, score)
 
-    if updated:
-        return get_team_by_id(team_id)
-    return None
+def _delete_team(conn, team_id):
+    row = conn.execute('DELETE FROM teams WHERE id = ? RETURNING game_id', (team_id,)).fetchone()
+    if row is None:
+        return None
+    score_log.record(team_id, 'delete', game_id=row['game_id'])
+    return row['game_id']
 
+@_timed
 def delete_team(team_id):
-    """Delete a team."""
-    conn = get_db_connection()
-    cursor = conn.execute('DELETE FROM teams WHERE id = ?', (team_id,))
-    deleted = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return deleted
-
-def clear_all_teams():
-    """Delete all teams."""
-    conn = get_db_connection()
-    cursor = conn.execute('DELETE FROM teams')
-    deleted_count = cursor.rowcount
-    conn.commit()
-    conn.close()
-    return deleted_count
-
-def get_team_count():
-    """Get the total number of teams."""
-    conn = get_db_connection()
-    count = conn.execute('SELECT COUNT(*) as count FROM teams').fetchone()
-    conn.close()
-    return count['count']
-
-def team_name_exists(name, exclude_id=None):
-    """Check if a team name already exists (case-insensitive)."""
-    conn = get_db_connection()
-
-    if exclude_id:
-        result = conn.execute(
-            'SELECT COUNT(*) as count FROM teams WHERE LOWER(name) = LOWER(?) AND id != ?',
-            (name, exclude_id)
+    """Delete a team. Returns the ID of its game, or None if it didn't exist."""
+    return _writer.submit(_delete_team, team_id, on_commit=_uncache_team(team_id))
+
+def _clear_all_teams(conn, game_id):
+    # One delete event per team rather than a 'clear', which would wipe
+    # every game's history
+    rows = conn.execute('DELETE FROM teams WHERE game_id = ? RETURNING id', (game_id,)).fetchall()
+    for row in rows:
+        score_log.record(row['id'], 'delete', game_id=game_id)
+    return len(rows)
+
+@_timed
+def clear_all_teams(game_id=None):
+    """Delete all of a game's teams (the active game's by default)."""
+    game_id = _game(game_id)
+    return _writer.submit(_clear_all_teams, game_id, on_commit=lambda count: leaderboards.clear(game_id))
+
+@_timed
+def get_teams_at(timestamp):
+    """Rebuild the leaderboard as it stood at ``timestamp`` (unix seconds).
+
+    Starts from the newest snapshot taken at or before ``timestamp`` and
+    replays only the events recorded after it.
+    """
+    with db_connection() as conn:
+        snapshot = conn.execute(
+            'SELECT event_id, teams FROM score_snapshots WHERE created_at <= ? ORDER BY id DESC LIMIT 1',
+            (timestamp,)
         ).fetchone()
-    else:
-        result = conn.execute(
-            'SELECT COUNT(*) as count FROM teams WHERE LOWER(name) = LOWER(?)',
-            (name,)
+        teams = {team['id']: team for team in json.loads(snapshot['teams'])} if snapshot else {}
+        events = conn.execute(
+            'SELECT * FROM score_events WHERE id > ? AND created_at <= ? ORDER BY id',
+            (snapshot['event_id'] if snapshot else 0, timestamp)
+        ).fetchall()
+        replay(teams, events)
+    return sorted(teams.values(), key=Leaderboard._key)
+
+@_timed
+def get_score_events(since=None, after_id=0):
+    """Score events newer than ``since`` (unix seconds) or after an event id, in log order."""
+    with db_connection() as conn:
+        if since is not None:
+            rows = conn.execute(
+                'SELECT * FROM score_events WHERE created_at > ? ORDER BY id', (since,)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                'SELECT * FROM score_events WHERE id > ? ORDER BY id', (after_id,)
+            ).fetchall()
+    return [dict(row) for row in rows]
+
+@_timed
+def get_last_score_event_id():
+    with db_connection() as conn:
+        return conn.execute('SELECT COALESCE(MAX(id), 0) FROM score_events').fetchone()[0]
+
+@_timed
+def get_team_count(game_id=None):
+    """Get the number of teams in a game (the active game by default)."""
+    with db_connection() as conn:
+        count = conn.execute(
+            'SELECT COUNT(*) as count FROM teams WHERE game_id = ?', (_game(game_id),)
         ).fetchone()
+    return count['count']
+
+@_timed
+def team_name_exists(name, exclude_id=None, game_id=None):
+    """Check if a team name already exists in a game (case-insensitive)."""
+    with db_connection() as conn:
+        if exclude_id:
+            result = conn.execute(
+                'SELECT COUNT(*) as count FROM teams WHERE game_id = ? AND name = ? COLLATE NOCASE AND id != ?',
+                (_game(game_id), name, exclude_id)
+            ).fetchone()
+        else:
+            result = conn.execute(
+                'SELECT COUNT(*) as count FROM teams WHERE game_id = ? AND name = ? COLLATE NOCASE',
+                (_game(game_id), name)
+            ).fetchone()
 
-    conn.close()
     return result['count'] > 0
 
-def backup_database(backup_path=None):
-    """Create a backup of the database."""
+class _BackupRestarting(Exception):
+    pass
+
+@_timed
+def backup_database(backup_path=None, pages=BACKUP_PAGES, step_sleep=BACKUP_STEP_SLEEP):
+    """Create a backup of the live database with SQLite's online backup API.
+
+    Pages are copied ``pages`` at a time with a short sleep in between, and
+    each step only holds a read lock, so writers keep going. SQLite restarts
+    the copy whenever another connection commits during it; if that keeps
+    happening the rest is copied in one step, which is still a consistent
+    snapshot. Blocks the calling thread, so run it off the eventlet hub.
+    """
     if backup_path is None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = f"backup_leaderboard_{timestamp}.db"
 
-    if os.path.exists(DATABASE_FILE):
-        import shutil
-        shutil.copy2(DATABASE_FILE, backup_path)
-        return backup_path
-    return None
-
-def are_players_locked():
-    """Check if players are locked from updating scores."""
-    conn = get_db_connection()
-    game = conn.execute('SELECT players_locked FROM games WHERE is_active = 1 LIMIT 1').fetchone()
-    conn.close()
-    return bool(game['players_locked']) if game else False
-
-def set_players_locked(locked):
-    """Set the players locked state."""
-    conn = get_db_connection()
+    if not os.path.exists(DATABASE_FILE):
+        return None
+
+    last_remaining = [None]
+    restarts = [0]
+
+    def progress(status, remaining, total):
+        # remaining only grows when a commit elsewhere restarted the copy
+        if last_remaining[0] is not None and remaining >= last_remaining[0]:
+            restarts[0] += 1
+            if restarts[0] > 3:
+                raise _BackupRestarting()
+        last_remaining[0] = remaining
+        time.sleep(step_sleep)
+
+    source = get_db_connection()
+    target = sqlite3.connect(backup_path)
+    try:
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        except _BackupRestarting:
+            source.backup(target)
+        # A self-contained file: no -wal sidecar when the backup is opened
+        target.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        target.close()
+        source.close()
+    return backup_path
+
+@_timed
+def verify_database(path):
+    """Raise ValueError unless ``path`` is an intact leaderboard database."""
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        problems = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+        has_teams = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'teams'"
+        ).fetchone()
+    except sqlite3.DatabaseError as e:
+        raise ValueError(f"{path} is not a usable database: {e}")
+    finally:
+        conn.close()
+    if problems != ['ok']:
+        raise ValueError(f"{path} failed the integrity check: {'; '.join(problems[:5])}")
+    if not has_teams:
+        raise ValueError(f"{path} has no teams table")
+
+@_timed
+def restore_database(backup_path):
+    """Replace the database's contents with a verified backup and reload caches."""
+    verify_database(backup_path)
+    _writer.stop()
+    _pool.close_all()
+    source = sqlite3.connect(backup_path)
+    target = get_db_connection()
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+    # Older backups may predate some migrations
+    init_database()
+
+def are_players_locked(game_id=None):
+    """Check if a game's players (the active game's by default) are locked from updating scores."""
+    return _live_games.get(_game(game_id), False)
+
+def _set_players_locked(conn, locked, game_id):
     cursor = conn.execute(
-        'UPDATE games SET players_locked = ? WHERE is_active = 1',
-        (1 if locked else 0,)
+        'UPDATE games SET players_locked = ? WHERE id = ? AND archived_at IS NULL',
+        (1 if locked else 0, game_id)
     )
-    updated = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return updated
+    return cursor.rowcount > 0
+
+@_timed
+def set_players_locked(locked, game_id=None):
+    """Set a game's players locked state (the active game's by default)."""
+    game_id = _game(game_id)
+    return _writer.submit(_set_players_locked, locked, game_id,
+                          on_commit=lambda updated: updated and _cache_players_locked(game_id, locked))
 
 def is_team_locked(team_id):
     """Check if a specific team is locked."""
-    conn = get_db_connection()
-    team = conn.execute('SELECT is_locked FROM teams WHERE id = ?', (team_id,)).fetchone()
-    conn.close()
-    return bool(team['is_locked']) if team else False
+    return leaderboards.board(leaderboards.game_of(team_id)).is_locked(team_id)
 
+@_timed
 def set_team_locked(team_id, locked):
     """Set the locked state for a specific team."""
-    conn = get_db_connection()
-    cursor = conn.execute(
-        'UPDATE teams SET is_locked = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
-        (1 if locked else 0, team_id)
+    team = _writer.submit(_update_team_columns, team_id, 'is_locked = ?', (1 if locked else 0,),
+                          on_commit=_cache_team)
+    return team is not None
+
+def _get_or_create_setting(conn, key, value):
+    conn.execute('INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)', (key, value))
+    return conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()['value']
+
+@_timed
+def get_or_create_setting(key, default):
+    """Return a stored setting, storing ``default`` first if it's missing."""
+    with db_connection() as conn:
+        row = conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+    if row:
+        return row['value']
+    return _writer.submit(_get_or_create_setting, key, default)
+
+@_timed
+def get_setting(key, default=None):
+    """Return a stored setting, or ``default`` if it's missing."""
+    with db_connection() as conn:
+        row = conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
+    return row['value'] if row else default
+
+def _set_setting(conn, key, value):
+    conn.execute('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', (key, str(value)))
+
+@_timed
+def set_setting(key, value):
+    """Store a setting shared by every process using this database."""
+    _writer.submit(_set_setting, key, value)
+
+@_timed
+def get_session_team(session_id):
+    """Get the team ID stored for a browser session, if it hasn't expired."""
+    with db_connection() as conn:
+        row = conn.execute(
+            'SELECT team_id FROM sessions WHERE session_id = ? AND expires_at > ?',
+            (session_id, time.time())
+        ).fetchone()
+    return row['team_id'] if row else None
+
+def _set_session_team(conn, session_id, team_id, expires_at):
+    conn.execute(
+        'INSERT OR REPLACE INTO sessions (session_id, team_id, expires_at) VALUES (?, ?, ?)',
+        (session_id, team_id, expires_at)
     )
-    updated = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return updated
 
-def get_database_stats():
-    """Get database statistics."""
-    conn = get_db_connection()
+@_timed
+def set_session_team(session_id, team_id, expires_at):
+    """Store the team for a browser session until ``expires_at`` (epoch seconds)."""
+    _writer.submit(_set_session_team, session_id, team_id, expires_at)
+
+def _delete_session(conn, session_id):
+    conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
 
-    team_count = conn.execute('SELECT COUNT(*) as count FROM teams').fetchone()['count']
-    total_score = conn.execute('SELECT SUM(score) as total FROM teams').fetchone()['total'] or 0
-    avg_score = conn.execute('SELECT AVG(score) as avg FROM teams').fetchone()['avg'] or 0
+@_timed
+def delete_session(session_id):
+    """Forget a browser session's team."""
+    _writer.submit(_delete_session, session_id)
 
-    top_team = conn.execute('SELECT name, score FROM teams ORDER BY score DESC LIMIT 1').fetchone()
-    players_locked = conn.execute('SELECT players_locked FROM games WHERE is_active = 1 LIMIT 1').fetchone()
+def _purge_expired_sessions(conn, now):
+    return conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (now,)).rowcount
 
-    conn.close()
+@_timed
+def purge_expired_sessions():
+    """Delete expired sessions and return how many were removed."""
+    return _writer.submit(_purge_expired_sessions, time.time())
 
+def get_database_stats(game_id=None):
+    """Get a game's statistics (from its in-memory board, no queries)."""
+    game_id = _game(game_id)
+    stats = leaderboards.board(game_id).summary()
+    team_count = stats['team_count']
     return {
         'team_count': team_count,
-        'total_score': total_score,
-        'average_score': round(avg_score, 2),
-        'top_team': dict(top_team) if top_team else None,
-        'players_locked': bool(players_locked['players_locked']) if players_locked else False
+        'total_score': stats['total_score'],
+        'average_score': round(stats['total_score'] / team_count, 2) if team_count else 0,
+        'top_team': stats['top_team'],
+        'players_locked': are_players_locked(game_id)
     }
 
-# Initialize database when module is imported
 if __name__ == "__main__":
-    init_database()
-    print("Database initialized successfully!")
-else:
-    init_database()
\ No newline at end of file
+    report = init_database()
+    print(f"Database initialized successfully! (schema v{report['schema_version']}, {report['games']} live games, "
+          f"{report['migrate_ms'] + report['load_ms']:.1f} ms)")
\ No newline at end of file
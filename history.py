@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import deque
+
+import database as db
+
+# (bucket seconds, buckets kept): 5s for an hour, 30s for 6 hours, 5m for a day
+ROLLUPS = ((5, 720), (30, 720), (300, 288))
+
+# Most points returned per team when the resolution is picked automatically
+MAX_POINTS = 720
+
+
+class Rollup:
+    """Last score per team in fixed time buckets of one resolution.
+
+    Only buckets in which something changed are stored. When the oldest
+    bucket is evicted its values are folded into ``base``, the state just
+    before the retained buckets, so a series can be rebuilt from ``horizon``
+    onwards by carrying values forward.
+    """
+
+    def __init__(self, resolution, max_buckets, horizon):
+        self.resolution = resolution
+        self.max_buckets = max_buckets
+        self.horizon = horizon
+        self.base = {}
+        self.buckets = deque()  # [start, {team_id: score or None}, cleared]
+
+    def add(self, timestamp, team_id, score, clear=False):
+        start = int(timestamp // self.resolution * self.resolution)
+        if not self.buckets or self.buckets[-1][0] < start:
+            self.buckets.append([start, {}, False])
+            while len(self.buckets) > self.max_buckets:
+                self._evict()
+        # Late events (e.g. clock skew between workers) land in the newest bucket
+        bucket = self.buckets[-1]
+        if clear:
+            bucket[1], bucket[2] = {}, True
+        else:
+            bucket[1][team_id] = score
+
+    def _evict(self):
+        start, changes, cleared = self.buckets.popleft()
+        if cleared:
+            self.base = {}
+        self.base.update(changes)
+        self.base = {team_id: score for team_id, score in self.base.items() if score is not None}
+        self.horizon = start + self.resolution
+
+    def series(self, team_ids, since, until):
+        """Bucket timestamps and one carried-forward value list per team."""
+        first = int(max(since, self.horizon) // self.resolution * self.resolution)
+        last = int(until // self.resolution * self.resolution)
+        state = dict(self.base)
+        timestamps = []
+        values = [[] for _ in team_ids]
+
+        buckets = iter(self.buckets)
+        bucket = next(buckets, None)
+        for start in range(first, last + 1, self.resolution):
+            while bucket is not None and bucket[0] <= start:
+                if bucket[2]:
+                    state = {}
+                state.update(bucket[1])
+                bucket = next(buckets, None)
+            timestamps.append(start)
+            for column, team_id in zip(values, team_ids):
+                column.append(state.get(team_id))
+        return timestamps, values
+
+
+class ScoreHistory:
+    """Score rollups kept up to date from the ``score_events`` log.
+
+    ``load()`` seeds them once at startup. After that ``catch_up()``, run in
+    the background, reads only the events recorded since its last call, so
+    each event is read once and chart requests only read the rollups.
+    Reading from the table also picks up events written by other worker
+    processes.
+    """
+
+    def __init__(self, rollups=ROLLUPS):
+        self._lock = threading.Lock()
+        self._spec = rollups
+        self._rollups = None
+        self._last_event_id = 0
+
+    @property
+    def resolutions(self):
+        return [resolution for resolution, _ in self._spec]
+
+    @property
+    def loaded(self):
+        return self._rollups is not None
+
+    def load(self):
+        """Seed the rollups from a snapshot replay plus the recent events."""
+        now = time.time()
+        since = now - max(resolution * buckets for resolution, buckets in self._spec)
+        rollups = {resolution: Rollup(resolution, buckets, since) for resolution, buckets in self._spec}
+        last_event_id = db.get_last_score_event_id()
+        base = {team['id']: team['score'] for team in db.get_teams_at(since)}
+        for rollup in rollups.values():
+            rollup.base = dict(base)
+        events = db.get_score_events(since=since)
+        with self._lock:
+            self._rollups, self._last_event_id = rollups, last_event_id
+            self._apply(events)
+
+    def _apply(self, events):
+        for event in events:
+            self._last_event_id = max(self._last_event_id, event['id'])
+            clear = event['source'] == 'clear'
+            for rollup in self._rollups.values():
+                rollup.add(event['created_at'], event['team_id'], event['score'], clear=clear)
+
+    def catch_up(self):
+        """Fold events recorded since the last call into the rollups, loading them first if needed."""
+        if not self.loaded:
+            self.load()
+            return
+        events = db.get_score_events(after_id=self._last_event_id)
+        with self._lock:
+            self._apply(events)
+
+    def series(self, team_ids, window, resolution=None):
+        """Columnar score history for ``team_ids`` over the last ``window`` seconds.
+
+        Reads the rollups only; they must have been loaded.
+        """
+        if resolution is None:
+            resolution = next((r for r in self.resolutions if window / r <= MAX_POINTS), self.resolutions[-1])
+        now = time.time()
+        with self._lock:
+            timestamps, values = self._rollups[resolution].series(team_ids, now - window, now)
+        return {
+            'resolution': resolution,
+            'timestamps': timestamps,
+            'teams': list(team_ids),
+            'values': values
+        }
@@ -0,0 +1,212 @@
+import threading
+from sortedcontainers import SortedList
+
+
+class Leaderboard:
+    """Authoritative in-memory ranking of teams.
+
+    Teams are kept in a sorted container keyed by (-score, created_at, id),
+    the same order as ``ORDER BY score DESC, created_at ASC``, so every
+    write is an O(log n) insert/remove and reads never touch SQLite.
+    SQLite stays the durable store; the database module writes through to
+    this cache after each commit.
+
+    The score total is kept up to date on every write, so summary stats are
+    O(1) as well.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._teams = {}
+        self._order = SortedList()
+        self._total = 0.0
+        self.version = 0
+
+    @staticmethod
+    def _key(team):
+        return (-team['score'], team['created_at'] or '', team['id'])
+
+    def load(self, teams):
+        """Replace the whole board, e.g. from the database at startup."""
+        with self._lock:
+            self._teams = {team['id']: dict(team) for team in teams}
+            self._order = SortedList(self._key(team) for team in self._teams.values())
+            self._total = sum(team['score'] for team in self._teams.values())
+            self.version += 1
+
+    def upsert(self, team):
+        """Insert a team or replace its previous row."""
+        with self._lock:
+            previous = self._teams.get(team['id'])
+            if previous is not None:
+                self._order.remove(self._key(previous))
+                self._total -= previous['score']
+            team = dict(team)
+            self._teams[team['id']] = team
+            self._order.add(self._key(team))
+            self._total += team['score']
+            self.version += 1
+
+    def remove(self, team_id):
+        """Drop a team. Returns False if it wasn't on the board."""
+        with self._lock:
+            team = self._teams.pop(team_id, None)
+            if team is None:
+                return False
+            self._order.remove(self._key(team))
+            self._total -= team['score']
+            self.version += 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._teams = {}
+            self._order = SortedList()
+            self._total = 0.0
+            self.version += 1
+
+    def get(self, team_id):
+        """Return a copy of one team, or None."""
+        team = self._teams.get(team_id)
+        return dict(team) if team else None
+
+    def is_locked(self, team_id):
+        team = self._teams.get(team_id)
+        return bool(team['is_locked']) if team else False
+
+    def rank(self, team_id):
+        """1-based rank of a team, or None if it isn't on the board."""
+        with self._lock:
+            team = self._teams.get(team_id)
+            if team is None:
+                return None
+            return self._order.index(self._key(team)) + 1
+
+    def ids(self):
+        with self._lock:
+            return set(self._teams)
+
+    def teams(self):
+        """All teams in leaderboard order."""
+        with self._lock:
+            return [dict(self._teams[key[2]]) for key in self._order]
+
+    def top(self, n):
+        """The first ``n`` teams in leaderboard order, in O(log n + n)."""
+        with self._lock:
+            return [dict(self._teams[key[2]]) for key in self._order.islice(0, n)]
+
+    def window(self, team_id, k):
+        """A team and up to ``k`` teams either side of it.
+
+        Returns ``(rank of the first team, teams)``, or ``(None, [])`` if the
+        team isn't on the board. O(log n + k) however big the board is.
+        """
+        with self._lock:
+            team = self._teams.get(team_id)
+            if team is None:
+                return None, []
+            index = self._order.index(self._key(team))
+            start = max(index - k, 0)
+            keys = self._order.islice(start, index + k + 1)
+            return start + 1, [dict(self._teams[key[2]]) for key in keys]
+
+    def summary(self):
+        """Team count, score total and the leading team."""
+        with self._lock:
+            top = self._teams[self._order[0][2]] if self._order else None
+            return {
+                'team_count': len(self._teams),
+                # Rounded to hide float drift from adding and removing scores
+                'total_score': round(self._total, 6) if self._teams else 0,
+                'top_team': {'name': top['name'], 'score': top['score']} if top else None
+            }
+
+    def __len__(self):
+        return len(self._teams)
+
+
+class Leaderboards:
+    """One Leaderboard per live game, plus the game each team is in.
+
+    Every write goes to the board of the team's ``game_id``, so ranks,
+    top-N lists and snapshots only ever touch the teams of one game.
+    Archived games are dropped from memory.
+    """
+
+    # Returned for games without a board, so readers never create one
+    _EMPTY = Leaderboard()
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._boards = {}
+        self._games = {}
+
+    def board(self, game_id):
+        """The board for ``game_id`` (an empty one if it has no teams here)."""
+        return self._boards.get(game_id, self._EMPTY)
+
+    def _board_for(self, game_id):
+        board = self._boards.get(game_id)
+        if board is None:
+            board = self._boards[game_id] = Leaderboard()
+        return board
+
+    def load(self, teams, game_ids=()):
+        """Replace every board; ``game_ids`` are live games that may have no teams yet."""
+        by_game = {game_id: [] for game_id in game_ids}
+        for team in teams:
+            by_game.setdefault(team['game_id'], []).append(team)
+        with self._lock:
+            for game_id in set(self._boards) - by_game.keys():
+                del self._boards[game_id]
+            for game_id, rows in by_game.items():
+                self._board_for(game_id).load(rows)
+            self._games = {
+                team['id']: game_id for game_id, rows in by_game.items() for team in rows
+            }
+
+    def upsert(self, team):
+        with self._lock:
+            self._games[team['id']] = team['game_id']
+            self._board_for(team['game_id']).upsert(team)
+
+    def remove(self, team_id):
+        """Drop a team. Returns False if it wasn't on any board."""
+        with self._lock:
+            game_id = self._games.pop(team_id, None)
+            return game_id is not None and self._board_for(game_id).remove(team_id)
+
+    def clear(self, game_id):
+        """Empty one game's board."""
+        with self._lock:
+            board = self._board_for(game_id)
+            for team_id in board.ids():
+                self._games.pop(team_id, None)
+            board.clear()
+
+    def drop(self, game_id):
+        """Forget a game entirely, e.g. once it's archived."""
+        with self._lock:
+            board = self._boards.pop(game_id, None)
+            if board is not None:
+                for team_id in board.ids():
+                    self._games.pop(team_id, None)
+
+    def game_of(self, team_id):
+        return self._games.get(team_id)
+
+    def get(self, team_id):
+        """Return a copy of one team from whichever board it's on, or None."""
+        return self.board(self._games.get(team_id)).get(team_id)
+
+    def games(self):
+        with self._lock:
+            return list(self._boards)
+
+    def ids(self):
+        with self._lock:
+            return set(self._games)
+
+    def __len__(self):
+        return len(self._games)
@@ -0,0 +1,103 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+# DEBUG, INFO, WARNING or ERROR
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# 'text' (key=value) or 'json' (one object per line)
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+# Fraction of per-event (sampled) log lines that are kept, e.g. 0.01
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', '1'))
+
+_listener = None
+
+
+class StructuredLogger:
+    """Logs an event name plus key/value fields.
+
+    High-volume lines (one per tap, join or page view) pass ``sample=True``
+    and are kept with probability LOG_SAMPLE_RATE; warnings and errors are
+    never sampled.
+    """
+
+    def __init__(self, name):
+        self._logger = logging.getLogger(name)
+
+    def _log(self, level, event, sample, fields):
+        if not self._logger.isEnabledFor(level):
+            return
+        if sample and LOG_SAMPLE_RATE < 1 and random.random() >= LOG_SAMPLE_RATE:
+            return
+        self._logger.log(level, event, extra={'fields': fields})
+
+    def debug(self, event, sample=False, **fields):
+        self._log(logging.DEBUG, event, sample, fields)
+
+    def info(self, event, sample=False, **fields):
+        self._log(logging.INFO, event, sample, fields)
+
+    def warning(self, event, **fields):
+        self._log(logging.WARNING, event, False, fields)
+
+    def error(self, event, **fields):
+        self._log(logging.ERROR, event, False, fields)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        fields = ' '.join(f'{key}={_text_value(value)}' for key, value in getattr(record, 'fields', {}).items())
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created))
+        line = f'{timestamp} {record.levelname:<7} {record.name} {record.getMessage()}'
+        return f'{line} {fields}' if fields else line
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', {}))
+        return json.dumps(entry, default=str)
+
+
+def _text_value(value):
+    text = str(value)
+    return json.dumps(text) if not text or any(c in text for c in ' ="') else text
+
+
+def configure_logging(level=LOG_LEVEL, fmt=LOG_FORMAT):
+    """Send log records through a queue to a background thread that writes stdout.
+
+    The request path only enqueues the record; formatting and the write
+    happen on the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JSONFormatter() if fmt == 'json' else TextFormatter())
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger('scoreboard')
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def get_logger(name):
+    configure_logging()
+    return StructuredLogger(f'scoreboard.{name}')
@@ -0,0 +1,267 @@
+"""Schema migrations, tracked with SQLite's ``PRAGMA user_version``.
+
+Each migration runs once, in order, in a transaction that also records
+its version, so an up-to-date database costs a single PRAGMA read at
+startup. Add new migrations to the end of MIGRATIONS; never edit or
+reorder one that has shipped.
+"""
+import sqlite3
+import time
+import uuid
+
+from logs import get_logger
+from score_log import write_snapshot
+
+log = get_logger('migrations')
+
+
+def _baseline(conn):
+    """Every table and index as of schema version 1.
+
+    Written to be safe on any database the app created before versioning
+    (user_version 0): tables and indexes are created only if missing and
+    legacy columns are added in place.
+    """
+    # Create teams table
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS teams (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            score REAL DEFAULT 0,
+            is_locked BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Migrate existing tables to support decimal scores
+    try:
+        # Check if score column is INTEGER and migrate if needed
+        cursor = conn.execute("PRAGMA table_info(teams)")
+        columns = cursor.fetchall()
+        score_column = next((col for col in columns if col[1] == 'score'), None)
+
+        if score_column and score_column[2] == 'INTEGER':
+            # Create backup and migrate
+            conn.execute('''
+                CREATE TABLE teams_backup AS SELECT * FROM teams
+            ''')
+            conn.execute('DROP TABLE teams')
+            conn.execute('''
+                CREATE TABLE teams (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    score REAL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.execute('''
+                INSERT INTO teams (id, name, score, created_at, updated_at)
+                SELECT id, name, CAST(score AS REAL), created_at, updated_at
+                FROM teams_backup
+            ''')
+            conn.execute('DROP TABLE teams_backup')
+            log.info('migrated_decimal_scores')
+    except Exception as e:
+        log.warning('decimal_score_migration_failed', error=str(e))
+
+    # Add is_locked column if it doesn't exist (the decimal migration above
+    # rebuilds the table without it)
+    try:
+        conn.execute('ALTER TABLE teams ADD COLUMN is_locked BOOLEAN DEFAULT 0')
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+
+    # Create games table (for future multi-game support)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS games (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            is_active BOOLEAN DEFAULT 0,
+            players_locked BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # Add players_locked column if it doesn't exist
+    try:
+        conn.execute('ALTER TABLE games ADD COLUMN players_locked BOOLEAN DEFAULT 0')
+    except sqlite3.OperationalError:
+        pass  # Column already exists
+
+    # Lets other worker processes find recently changed teams (sync_from_peers)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_teams_updated_at ON teams (updated_at)')
+
+    # Team names are unique regardless of case; the index enforces it and
+    # makes name lookups a B-tree search instead of a scan of LOWER(name)
+    if not conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_teams_name_nocase'"
+    ).fetchone():
+        _rename_duplicate_team_names(conn)
+        conn.execute('CREATE UNIQUE INDEX idx_teams_name_nocase ON teams (name COLLATE NOCASE)')
+
+    # Leaderboard order (ORDER BY score DESC, created_at)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_teams_score ON teams (score DESC, created_at)')
+
+    # Append-only score history (see score_log.py). source is what caused
+    # the event: join, update, increment, admin, rename, delete or clear
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS score_events (
+            id INTEGER PRIMARY KEY,
+            team_id TEXT,
+            source TEXT NOT NULL,
+            delta REAL,
+            score REAL,
+            name TEXT,
+            created_at REAL NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_score_events_created_at ON score_events (created_at)')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS score_snapshots (
+            id INTEGER PRIMARY KEY,
+            event_id INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            teams TEXT NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_score_snapshots_created_at ON score_snapshots (created_at)')
+    # Teams created before the log existed are only known from a snapshot
+    if not conn.execute('SELECT 1 FROM score_snapshots LIMIT 1').fetchone() and \
+            conn.execute('SELECT 1 FROM teams LIMIT 1').fetchone():
+        # Columns as of version 1; later migrations add to SNAPSHOT_COLUMNS
+        write_snapshot(conn, columns=('id', 'name', 'score', 'is_locked', 'created_at'))
+
+    # Browser session -> team associations (see session_store.py)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            team_id TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)')
+
+    # Key/value settings shared by every process using this database
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS settings (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )
+    ''')
+
+    # Create a default game if none exists
+    existing_game = conn.execute('SELECT COUNT(*) as count FROM games').fetchone()
+    if existing_game['count'] == 0:
+        game_id = str(uuid.uuid4())
+        conn.execute(
+            'INSERT INTO games (id, name, is_active, players_locked) VALUES (?, ?, ?, ?)',
+            (game_id, 'Birthday Game', 1, 0)
+        )
+
+
+def _rename_duplicate_team_names(conn):
+    """Suffix names that clash case-insensitively so the unique index can be built.
+
+    The oldest team keeps its name; later ones become "Name (2)", "Name (3)"...
+    """
+    rows = conn.execute('SELECT id, name FROM teams ORDER BY created_at, rowid').fetchall()
+    taken = {row['name'].lower() for row in rows}
+    seen = set()
+    for row in rows:
+        key = row['name'].lower()
+        if key not in seen:
+            seen.add(key)
+            continue
+        n = 2
+        while f"{row['name']} ({n})".lower() in taken:
+            n += 1
+        new_name = f"{row['name']} ({n})"
+        taken.add(new_name.lower())
+        conn.execute('UPDATE teams SET name = ? WHERE id = ?', (new_name, row['id']))
+        log.info('renamed_duplicate_team', name=row['name'], new_name=new_name)
+
+
+def _partition_by_game(conn):
+    """Give every team a game and move finished games out of the hot table.
+
+    Several games (rooms, rounds) can be live at once. Teams are ranked,
+    named and broadcast within their own game, and indexed by game first,
+    so the active game's reads cost the same however much history the
+    file holds. Archiving a game moves its teams to archived_teams.
+    """
+    conn.execute('ALTER TABLE teams ADD COLUMN game_id TEXT')
+    conn.execute('ALTER TABLE games ADD COLUMN archived_at TIMESTAMP')
+    conn.execute('ALTER TABLE score_events ADD COLUMN game_id TEXT')
+
+    # Existing teams belong to the active game; exactly one stays active
+    game = conn.execute('SELECT id FROM games ORDER BY is_active DESC, created_at LIMIT 1').fetchone()
+    conn.execute('UPDATE games SET is_active = (id = ?)', (game['id'],))
+    conn.execute('UPDATE teams SET game_id = ?', (game['id'],))
+    conn.execute('UPDATE score_events SET game_id = ?', (game['id'],))
+
+    # Names only have to be unique within a game, so a team can play every round
+    conn.execute('DROP INDEX IF EXISTS idx_teams_name_nocase')
+    conn.execute('CREATE UNIQUE INDEX idx_teams_game_name ON teams (game_id, name COLLATE NOCASE)')
+    # One game's leaderboard order, without visiting other games' rows
+    conn.execute('DROP INDEX IF EXISTS idx_teams_score')
+    conn.execute('CREATE INDEX idx_teams_game_score ON teams (game_id, score DESC, created_at)')
+
+    # Final standings of archived games
+    conn.execute('''
+        CREATE TABLE archived_teams (
+            id TEXT PRIMARY KEY,
+            game_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            score REAL NOT NULL,
+            final_rank INTEGER NOT NULL,
+            is_locked BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('CREATE INDEX idx_archived_teams_game ON archived_teams (game_id, final_rank)')
+
+
+MIGRATIONS = [
+    (1, 'baseline schema', _baseline),
+    (2, 'partition teams by game', _partition_by_game),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def migrate(conn):
+    """Bring ``conn``'s database up to SCHEMA_VERSION.
+
+    Returns the versions applied. Each migration takes the write lock
+    (BEGIN IMMEDIATE) and re-checks the version, so workers starting at the
+    same time don't apply one twice.
+    """
+    if get_version(conn) >= SCHEMA_VERSION:
+        return []
+
+    applied = []
+    for version, description, migration in MIGRATIONS:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if get_version(conn) >= version:
+                conn.rollback()
+                continue
+            start = time.perf_counter()
+            migration(conn)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        log.info('schema_migrated', version=version, description=description,
+                 ms=round((time.perf_counter() - start) * 1000, 1))
+        applied.append(version)
+    return applied
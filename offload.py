@@ -0,0 +1,152 @@
+import os
+import time
+from collections import deque
+
+import greenlet
+from eventlet import tpool
+from eventlet.semaphore import Semaphore
+
+from logs import get_logger
+
+log = get_logger('offload')
+
+# Blocking calls allowed in flight or queued for eventlet's native threads
+# (EVENTLET_THREADPOOL_SIZE, default 20, run them). Callers beyond that wait
+# up to OFFLOAD_QUEUE_TIMEOUT seconds for a slot and are then turned away.
+OFFLOAD_MAX_PENDING = int(os.environ.get('OFFLOAD_MAX_PENDING', '64'))
+OFFLOAD_QUEUE_TIMEOUT = float(os.environ.get('OFFLOAD_QUEUE_TIMEOUT', '2'))
+
+# The hub monitor wakes every HUB_MONITOR_INTERVAL seconds and reports any
+# wake-up late by more than HUB_STALL_THRESHOLD seconds as a stall
+HUB_MONITOR_INTERVAL = float(os.environ.get('HUB_MONITOR_INTERVAL', '0.05'))
+HUB_STALL_THRESHOLD = float(os.environ.get('HUB_STALL_THRESHOLD', '0.1'))
+
+
+class Overloaded(RuntimeError):
+    """Raised when too many blocking calls are already waiting for a thread."""
+
+
+def on_hub():
+    """True in a green thread, e.g. a request or socket handler.
+
+    Green threads are switched to by a hub; a thread's own main greenlet
+    (a native thread, a tpool worker, startup code) has no parent.
+    """
+    return greenlet.getcurrent().parent is not None
+
+
+class Offloader:
+    """Runs blocking SQLite and Pillow calls on native threads.
+
+    The app isn't monkey-patched, so a blocking call made on the eventlet hub
+    stalls every socket. ``run()`` hands the call to ``eventlet.tpool`` and
+    parks only the calling green thread. At most ``max_pending`` calls are
+    queued; further callers wait up to ``queue_timeout`` seconds for a slot
+    and then get ``Overloaded``, so a backlog turns into quick errors rather
+    than unbounded memory and latency.
+
+    Calls made off the hub (the writer thread, scripts, startup code) run
+    directly. Being on the hub means running in a green thread, whichever
+    OS thread the hub is in: under the debug reloader it isn't the main one.
+    """
+
+    def __init__(self, max_pending=OFFLOAD_MAX_PENDING, queue_timeout=OFFLOAD_QUEUE_TIMEOUT):
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+        self._slots = Semaphore(max_pending)
+
+        self.calls = 0
+        self.rejected = 0
+        self.pending = 0
+        self.max_seen_pending = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def run(self, fn, *args, **kwargs):
+        if not on_hub():
+            return fn(*args, **kwargs)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self.rejected += 1
+            raise Overloaded(f"{self.max_pending} blocking calls already queued")
+
+        self.pending += 1
+        self.max_seen_pending = max(self.max_seen_pending, self.pending)
+        start = time.perf_counter()
+        try:
+            return tpool.execute(fn, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.pending -= 1
+            self.calls += 1
+            self.total_seconds += elapsed
+            self.max_seconds = max(self.max_seconds, elapsed)
+            self._slots.release()
+
+    def stats(self):
+        return {
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'max_seen_pending': self.max_seen_pending,
+            'calls': self.calls,
+            'rejected': self.rejected,
+            'avg_ms': round(self.total_seconds / self.calls * 1000, 2) if self.calls else 0,
+            'max_ms': round(self.max_seconds * 1000, 2)
+        }
+
+
+class HubMonitor:
+    """Measures how long the eventlet hub is blocked.
+
+    A green thread sleeps ``interval`` seconds at a time; any extra delay
+    before it wakes up is time the hub spent running something that didn't
+    yield. Lags above ``threshold`` are counted and logged as stalls.
+    """
+
+    def __init__(self, socketio, interval=HUB_MONITOR_INTERVAL, threshold=HUB_STALL_THRESHOLD, window=1000):
+        self.socketio = socketio
+        self.interval = interval
+        self.threshold = threshold
+        self._lags = deque(maxlen=window)
+        self._task = None
+
+        self.ticks = 0
+        self.stalls = 0
+        self.stalled_seconds = 0.0
+        self.max_lag = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._task = self.socketio.start_background_task(self._run)
+
+    def _run(self):
+        while True:
+            start = time.perf_counter()
+            self.socketio.sleep(self.interval)
+            self.record(time.perf_counter() - start - self.interval)
+
+    def record(self, lag):
+        lag = max(lag, 0.0)
+        self.ticks += 1
+        self._lags.append(lag)
+        self.max_lag = max(self.max_lag, lag)
+        if lag > self.threshold:
+            self.stalls += 1
+            self.stalled_seconds += lag
+            log.warning('event_loop_blocked', ms=round(lag * 1000))
+
+    def stats(self):
+        lags = sorted(self._lags)
+
+        def pick(p):
+            return round(lags[min(len(lags) - 1, int(p / 100 * len(lags)))] * 1000, 2) if lags else 0
+
+        return {
+            'interval_ms': self.interval * 1000,
+            'ticks': self.ticks,
+            'lag_p50_ms': pick(50),
+            'lag_p99_ms': pick(99),
+            'max_lag_ms': round(self.max_lag * 1000, 2),
+            'stalls': self.stalls,
+            'stalled_seconds': round(self.stalled_seconds, 3)
+        }
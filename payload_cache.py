@@ -0,0 +1,119 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+# Responses smaller than this are sent uncompressed
+GZIP_MIN_BYTES = int(os.environ.get('GZIP_MIN_BYTES', '1024'))
+
+
+class Encoded:
+    """A JSON payload serialized once and sent as-is.
+
+    Socket.IO emits carry ``text`` through ``WireJSON``; HTTP responses use
+    ``body``, ``etag`` and ``gzipped``, each worked out on first use and kept.
+    """
+
+    __slots__ = ('text', '_body', '_etag', '_gzipped')
+
+    def __init__(self, payload):
+        # ensure_ascii (the default) keeps len(text) equal to the byte count
+        self.text = json.dumps(payload, separators=(',', ':'))
+        self._body = None
+        self._etag = None
+        self._gzipped = None
+
+    def __len__(self):
+        return len(self.text)
+
+    @property
+    def body(self):
+        if self._body is None:
+            self._body = self.text.encode('ascii')
+        return self._body
+
+    @property
+    def etag(self):
+        if self._etag is None:
+            self._etag = hashlib.sha1(self.body).hexdigest()
+        return self._etag
+
+    @property
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6)
+        return self._gzipped
+
+    def __getstate__(self):
+        # Sent to other workers through the message queue; they only need the text
+        return self.text
+
+    def __setstate__(self, text):
+        self.text = text
+        self._body = self._etag = self._gzipped = None
+
+
+class WireJSON:
+    """JSON module for python-socketio that splices ``Encoded`` payloads in.
+
+    python-socketio encodes an emit once for every recipient, so a
+    broadcast to a room of N screens serialized the leaderboard N times.
+    Packets holding an ``Encoded`` argument are now assembled from its
+    text instead.
+    """
+
+    @staticmethod
+    def dumps(obj, *args, **kwargs):
+        if isinstance(obj, list) and any(isinstance(item, Encoded) for item in obj):
+            return '[' + ','.join(
+                item.text if isinstance(item, Encoded) else json.dumps(item, *args, **kwargs)
+                for item in obj
+            ) + ']'
+        return json.dumps(obj, *args, **kwargs)
+
+    @staticmethod
+    def loads(*args, **kwargs):
+        return json.loads(*args, **kwargs)
+
+
+class PayloadCache:
+    """Latest encoded payload per name, tagged with the state it was built from.
+
+    ``get()`` rebuilds a payload only when ``version`` differs from the
+    cached one, so every emit and HTTP response between two leaderboard
+    changes shares one buffer.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, version, build):
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == version:
+            self.hits += 1
+            return entry[1]
+
+        # Built outside the lock; two callers racing on a new version both
+        # build it and the last one is kept
+        encoded = Encoded(build())
+        with self._lock:
+            self.misses += 1
+            self._entries[name] = (version, encoded)
+        return encoded
+
+    def discard(self, *names):
+        """Forget payloads that won't be asked for again."""
+        with self._lock:
+            for name in names:
+                self._entries.pop(name, None)
+
+    def stats(self):
+        return {
+            'entries': {name: len(encoded) for name, (_, encoded) in self._entries.items()},
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,64 @@
+import hashlib
+import io
+import os
+from functools import lru_cache
+
+import qrcode
+import qrcode.image.svg
+
+# Number of rendered QR codes kept (one per join URL, size and format)
+QR_CACHE_SIZE = int(os.environ.get('QR_CACHE_SIZE', '32'))
+
+FORMATS = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml',
+}
+
+DEFAULT_BOX_SIZE = 10
+MIN_BOX_SIZE = 2
+MAX_BOX_SIZE = 40
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def render_qr(join_url, box_size=DEFAULT_BOX_SIZE, fmt='png'):
+    """Render a QR code once and return ``(body, mimetype, etag)``.
+
+    The same join URL is requested by the big screen and every phone that
+    opens /scan, so rendered images are cached in a bounded LRU keyed by
+    (join URL, size, format).
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=box_size,
+        border=4,
+    )
+    qr.add_data(join_url)
+    qr.make(fit=True)
+
+    output = io.BytesIO()
+    if fmt == 'svg':
+        img = qr.make_image(image_factory=qrcode.image.svg.SvgPathImage)
+        img.save(output)
+    else:
+        img = qr.make_image(fill_color="black", back_color="white")
+        img.save(output, 'PNG')
+
+    body = output.getvalue()
+    etag = hashlib.sha1(body).hexdigest()
+    return body, FORMATS[fmt], etag
+
+
+def parse_box_size(value):
+    """Clamp a ``size`` query parameter to a sensible box size."""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_BOX_SIZE
+    return max(MIN_BOX_SIZE, min(MAX_BOX_SIZE, size))
+
+
+def prewarm(join_url):
+    """Render the default images for a join URL ahead of the first request."""
+    for fmt in FORMATS:
+        render_qr(join_url, DEFAULT_BOX_SIZE, fmt)
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Per-session limits as (events per second, burst). Players' own clients
+# stay well inside them: taps are batched every 150 ms and the pages ask
+# for a snapshot or window only on (re)connect and after their own
+# changes. Admin events aren't limited unless configured.
+DEFAULT_LIMITS = {
+    'join_game': (0.2, 5),
+    'update_team_name': (1, 5),
+    'update_score': (5, 10),
+    'increment_score': (10, 20),
+    'get_team_data': (5, 10),
+    'request_leaderboard': (2, 5),
+    'request_top_teams': (2, 5),
+    'request_team_window': (5, 10),
+    'create_backup': (1 / 60, 2),
+}
+
+
+def scale_limits(limits, factor):
+    """``limits`` with rates and bursts multiplied by ``factor``; none if it's 0."""
+    if factor <= 0:
+        return {}
+    return {event: (rate * factor, burst * factor) for event, (rate, burst) in limits.items()}
+
+
+def parse_limits(spec, defaults=DEFAULT_LIMITS):
+    """``defaults`` overridden by ``"event=rate/burst,..."``; a rate of 0 removes a limit.
+
+    ``"off"`` turns every limit off. Raises ValueError on a malformed entry.
+    """
+    if (spec or '').strip() == 'off':
+        return {}
+    limits = dict(defaults)
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        event, _, value = item.partition('=')
+        rate, _, burst = value.partition('/')
+        rate = float(rate)
+        if rate <= 0:
+            limits.pop(event.strip(), None)
+        else:
+            limits[event.strip()] = (rate, float(burst) if burst else max(rate, 1.0))
+    return limits
+
+
+class RateLimiter:
+    """Token buckets per (event, key), kept in memory.
+
+    Each bucket holds up to ``burst`` tokens and refills at ``rate`` per
+    second; an event spends one token and is refused when none is left.
+    Nothing is queued: a refused event is the caller's to drop.
+
+    Buckets are kept in least recently used order. A bucket that has had
+    time to refill completely is the same as no bucket, so idle ones are
+    evicted from the front as others are used, and ``max_buckets`` caps
+    the total however many keys are seen.
+    """
+
+    def __init__(self, limits, max_buckets=10000, clock=time.monotonic):
+        if max_buckets < 1:
+            raise ValueError('max_buckets must be at least 1')
+        self.limits = limits
+        self.max_buckets = max_buckets
+        self.clock = clock
+        self._buckets = OrderedDict()  # (event, key) -> (tokens, updated)
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.evicted = 0
+
+    def allow(self, event, key):
+        """Spend a token for ``event`` from ``key``'s bucket; False if it's empty.
+
+        Events without a limit are always allowed and cost nothing.
+        """
+        limit = self.limits.get(event)
+        if limit is None:
+            return True
+        rate, burst = limit
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.pop((event, key), None)
+            tokens = burst if bucket is None else min(burst, bucket[0] + (now - bucket[1]) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            else:
+                self.rejected += 1
+            self._buckets[(event, key)] = (tokens, now)
+            self._evict(now)
+        return allowed
+
+    def retry_after(self, event, key):
+        """Seconds until ``key`` has a token for ``event`` again."""
+        limit = self.limits.get(event)
+        bucket = self._buckets.get((event, key))
+        if limit is None or bucket is None:
+            return 0.0
+        rate, _ = limit
+        tokens = bucket[0] + (self.clock() - bucket[1]) * rate
+        return max(0.0, (1 - tokens) / rate)
+
+    def _evict(self, now):
+        # A couple per call keeps eviction O(1) while still draining idle keys
+        for _ in range(2):
+            if not self._buckets:
+                return
+            (event, key), (tokens, updated) = next(iter(self._buckets.items()))
+            rate, burst = self.limits.get(event, (1.0, 0.0))
+            if len(self._buckets) <= self.max_buckets and tokens + (now - updated) * rate < burst:
+                return
+            del self._buckets[(event, key)]
+            self.evicted += 1
+
+    def __len__(self):
+        return len(self._buckets)
+
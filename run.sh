@@ -81,7 +81,11 @@ backup_db() {
     TIMESTAMP=$(date +"%Y%m%d_%H%M%S")
     BACKUP_FILE="backup_leaderboard_${TIMESTAMP}.db"
 
-    if [ -f "data/leaderboard.db" ]; then
+    if docker-compose ps | grep -q "Up"; then
+        # Copying a live database file can capture a half-written page;
+        # let the app take an online backup into data/backups instead
+        docker-compose exec -T birthday-scoreboard python backups.py backup
+    elif [ -f "data/leaderboard.db" ]; then
         cp "data/leaderboard.db" "data/${BACKUP_FILE}"
         echo "✅ Database backed up to: data/${BACKUP_FILE}"
     else
@@ -0,0 +1,116 @@
+import json
+import time
+from datetime import datetime, timezone
+
+
+class ScoreLog:
+    """Buffer of score events flushed by the database writer.
+
+    Write jobs ``record()`` events as they change teams; the writer calls
+    ``flush(conn)`` right before committing its batch, so the events land in
+    the same transaction (and the same fsync) as the rows they describe.
+    A snapshot of every team is written every ``snapshot_every`` events or
+    ``snapshot_interval`` seconds, so replaying history to any moment only
+    has to read from the nearest snapshot forward.
+
+    ``previous_score(team_id)`` returns the last committed score of a team
+    and is used to work out deltas for events that set a score outright.
+    """
+
+    def __init__(self, previous_score, snapshot_every=500, snapshot_interval=60):
+        self.previous_score = previous_score
+        self.snapshot_every = snapshot_every
+        self.snapshot_interval = snapshot_interval
+
+        self._pending = []
+        self._scores = {}  # scores written earlier in the current batch
+        self._since_snapshot = 0
+        self._last_snapshot = time.time()
+
+        self.events = 0
+        self.snapshots = 0
+
+    def record(self, team_id, source, score=None, name=None, delta=None, game_id=None):
+        """Queue one event; ``score`` is the team's new score (None if removed)."""
+        if delta is None and score is not None:
+            previous = self._scores.get(team_id)
+            if previous is None:
+                previous = self.previous_score(team_id)
+            delta = score - previous if previous is not None else score
+        self._scores[team_id] = score
+        self._pending.append((team_id, source, delta, score, name, game_id, time.time()))
+
+    def mark(self):
+        """Position to roll back to if the current job fails."""
+        return len(self._pending)
+
+    def rollback(self, mark):
+        del self._pending[mark:]
+
+    def flush(self, conn):
+        """Insert buffered events (and a snapshot if one is due) on ``conn``."""
+        if self._pending:
+            conn.executemany(
+                'INSERT INTO score_events (team_id, source, delta, score, name, game_id, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                self._pending
+            )
+            self.events += len(self._pending)
+            self._since_snapshot += len(self._pending)
+        self._pending = []
+        self._scores = {}
+
+        due = self._since_snapshot and (
+            self._since_snapshot >= self.snapshot_every or
+            time.time() - self._last_snapshot >= self.snapshot_interval
+        )
+        if due:
+            write_snapshot(conn)
+            self._since_snapshot = 0
+            self._last_snapshot = time.time()
+            self.snapshots += 1
+
+    def discard(self):
+        """Forget buffered events after their batch was rolled back."""
+        self._pending = []
+        self._scores = {}
+
+
+SNAPSHOT_COLUMNS = ('id', 'game_id', 'name', 'score', 'is_locked', 'created_at')
+
+
+def write_snapshot(conn, columns=SNAPSHOT_COLUMNS):
+    """Store every team's current row alongside the latest event id."""
+    event_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM score_events').fetchone()[0]
+    teams = [dict(row) for row in conn.execute(
+        f'SELECT {", ".join(columns)} FROM teams'
+    )]
+    conn.execute(
+        'INSERT INTO score_snapshots (event_id, created_at, teams) VALUES (?, ?, ?)',
+        (event_id, time.time(), json.dumps(teams))
+    )
+
+
+def replay(teams, events):
+    """Apply score events to a ``{team_id: row}`` snapshot in place."""
+    for event in events:
+        team_id, source = event['team_id'], event['source']
+        if source == 'clear':
+            teams.clear()
+        elif source in ('delete', 'archive'):
+            teams.pop(team_id, None)
+        elif team_id in teams:
+            teams[team_id]['score'] = event['score']
+            if event['name'] is not None:
+                teams[team_id]['name'] = event['name']
+        else:
+            created_at = datetime.fromtimestamp(event['created_at'], timezone.utc)
+            teams[team_id] = {
+                'id': team_id,
+                'game_id': event['game_id'],
+                'name': event['name'],
+                'score': event['score'],
+                'is_locked': 0,
+                'created_at': created_at.strftime('%Y-%m-%d %H:%M:%S')
+            }
+    return teams
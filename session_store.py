@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+
+import database as db
+
+# Matches PERMANENT_SESSION_LIFETIME in app.py
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+class MemorySessionStore:
+    """In-process session -> team map with LRU and TTL eviction.
+
+    Entries expire ``ttl`` seconds after they were stored, and the least
+    recently used entry is dropped once ``max_entries`` is reached, so the
+    map can't grow without bound. All operations are O(1).
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return None
+            team_id, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[session_id]
+                return None
+            self._entries.move_to_end(session_id)
+            return team_id
+
+    def cached(self, session_id):
+        """Lookup that never blocks (everything is in memory here)."""
+        return self.get(session_id)
+
+    def set(self, session_id, team_id):
+        with self._lock:
+            self._entries[session_id] = (team_id, time.time() + self.ttl)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteSessionStore:
+    """Sessions persisted in the ``sessions`` table of the leaderboard DB.
+
+    Survives restarts and is shared by every process using the same database
+    file. Hits are cached in a short-lived in-memory LRU so repeated lookups
+    don't touch SQLite; expired rows are purged every ``purge_every`` writes.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, cache_ttl=300, max_cached=10000, purge_every=500):
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._cache = MemorySessionStore(ttl=cache_ttl, max_entries=max_cached)
+        self._writes = 0
+
+    def get(self, session_id):
+        team_id = self._cache.get(session_id)
+        if team_id is None:
+            team_id = db.get_session_team(session_id)
+            if team_id is not None:
+                self._cache.set(session_id, team_id)
+        return team_id
+
+    def cached(self, session_id):
+        """Lookup in the memory cache only; None means ask ``get()``."""
+        return self._cache.get(session_id)
+
+    def set(self, session_id, team_id):
+        db.set_session_team(session_id, team_id, time.time() + self.ttl)
+        self._cache.set(session_id, team_id)
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            db.purge_expired_sessions()
+
+    def delete(self, session_id):
+        db.delete_session(session_id)
+        self._cache.delete(session_id)
+
+
+class RedisSessionStore:
+    """Sessions kept in Redis (or anything speaking its get/set/delete API).
+
+    ``client`` only needs ``get``, ``set(name, value, ex=seconds)`` and
+    ``delete``, so a local stand-in such as fakeredis works for testing.
+    Redis expires keys itself.
+    """
+
+    def __init__(self, client, ttl=DEFAULT_TTL, prefix='scoreboard:session:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SESSION_STORE=redis requires the 'redis' package")
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, session_id):
+        team_id = self.client.get(self.prefix + session_id)
+        if isinstance(team_id, bytes):
+            team_id = team_id.decode()
+        return team_id
+
+    def cached(self, session_id):
+        return None
+
+    def set(self, session_id, team_id):
+        self.client.set(self.prefix + session_id, team_id, ex=int(self.ttl))
+
+    def delete(self, session_id):
+        self.client.delete(self.prefix + session_id)
+
+
+def create_session_store(kind, ttl=DEFAULT_TTL, max_entries=10000, redis_url=None):
+    """Build the session store selected by the SESSION_STORE setting."""
+    if kind == 'memory':
+        return MemorySessionStore(ttl=ttl, max_entries=max_entries)
+    if kind == 'sqlite':
+        return SQLiteSessionStore(ttl=ttl, max_cached=max_entries)
+    if kind == 'redis':
+        return RedisSessionStore.from_url(redis_url or 'redis://localhost:6379/0', ttl=ttl)
+    raise ValueError(f"Unknown session store: {kind}")
@@ -14,6 +14,157 @@ function getRankDisplay(rank) {
     return rank;
 }
 
+// The game this page shows (?game=<id>, set by the server on <body>), or
+// null for the active game
+function currentGame() {
+    return document.body.dataset.game || null;
+}
+
+// An API URL scoped to the page's game
+function gameUrl(path) {
+    const game = currentGame();
+    return game ? `${path}?game=${encodeURIComponent(game)}` : path;
+}
+
+// Opens the Socket.IO connection for a page. The view ('display', 'admin' or
+// 'player') and game are sent on every (re)connect and decide which rooms the
+// server puts the socket in, so the page only receives the broadcasts it uses.
+// format 'compact' asks for columnar leaderboard payloads (see teamRows).
+function connectSocket(view, format = 'json') {
+    const socket = io({auth: {view: view, format: format, game: currentGame()}});
+    // The active game changed (pages without a game follow it), or this
+    // game was archived: start over on the active game
+    socket.on('game_changed', () => location.reload());
+    socket.on('game_archived', () => location.assign(location.pathname));
+    // An event was dropped by the server's rate limit
+    socket.on('rate_limited', () => showToast('Slow down a little!', 'error'));
+    return socket;
+}
+
+// Team objects from a leaderboard payload in either wire format. Compact
+// payloads send one array per field, named once in 'columns'.
+function teamRows(data) {
+    if (!data.columns) {
+        return data.teams;
+    }
+    const count = data.teams.length ? data.teams[0].length : 0;
+    const rows = [];
+    for (let i = 0; i < count; i++) {
+        const row = {};
+        data.columns.forEach((column, j) => { row[column] = data.teams[j][i]; });
+        rows.push(row);
+    }
+    return rows;
+}
+
+// Live leaderboard state kept in sync with the server.
+// The server sends a full snapshot ('leaderboard_update') on request and then
+// only the rows that changed ('leaderboard_patch'). Every message carries a
+// sequence number. Patches hold whole rows, so one whose base is at or before
+// our sequence can be applied safely; a base beyond it means we missed
+// something, so we ask for a fresh snapshot instead of guessing.
+class LeaderboardState {
+    constructor(socket, onChange) {
+        this.socket = socket;
+        this.onChange = onChange;
+        this.seq = null;
+        this.teams = new Map();
+
+        socket.on('connect', () => this.requestSnapshot());
+        socket.on('leaderboard_update', data => this.applySnapshot(data));
+        socket.on('leaderboard_patch', data => this.applyPatch(data));
+    }
+
+    requestSnapshot() {
+        this.seq = null;
+        this.socket.emit('request_leaderboard');
+    }
+
+    applySnapshot(data) {
+        this.teams = new Map(teamRows(data).map(team => [team.id, team]));
+        this.seq = data.seq;
+        this.onChange(this.sorted());
+    }
+
+    applyPatch(patch) {
+        if (this.seq === null || patch.seq <= this.seq) {
+            return; // Waiting for a snapshot, or already covered by one
+        }
+        if (patch.base > this.seq) {
+            this.requestSnapshot(); // Missed a patch
+            return;
+        }
+
+        patch.removed.forEach(id => this.teams.delete(id));
+        teamRows(patch).forEach(row => {
+            this.teams.set(row.id, Object.assign(this.teams.get(row.id) || {}, row));
+        });
+        this.seq = patch.seq;
+        this.onChange(this.sorted());
+    }
+
+    // Same order as the server: score descending, then earliest join
+    sorted() {
+        return Array.from(this.teams.values()).sort((a, b) =>
+            (b.score - a.score)
+            || String(a.created_at).localeCompare(String(b.created_at))
+            || String(a.id).localeCompare(String(b.id))
+        );
+    }
+}
+
+// Collects quick-score taps and sends them as one 'increment_score' message,
+// so fast tapping costs the server one event per burst instead of one per tap.
+// When the server's rate limit drops a message, taps are held and merged
+// until it says to try again.
+class ScoreTapBatcher {
+    constructor(socket, wait = 150) {
+        this.socket = socket;
+        this.wait = wait;
+        this.deltas = [];
+        this.timer = null;
+        this.holdUntil = 0;
+        socket.on('rate_limited', data => {
+            if (data.event === 'increment_score') {
+                this.holdUntil = Date.now() + data.retry_after * 1000;
+            }
+        });
+    }
+
+    add(points) {
+        this.deltas.push(points);
+        if (!this.timer) {
+            this.timer = setTimeout(() => this.flush(), Math.max(this.wait, this.holdUntil - Date.now()));
+        }
+    }
+
+    flush() {
+        clearTimeout(this.timer);
+        this.timer = null;
+        if (this.deltas.length > 0) {
+            this.socket.emit('increment_score', {deltas: this.deltas});
+            this.deltas = [];
+        }
+    }
+
+    // Taps not yet acknowledged by the server
+    pendingTotal() {
+        return this.deltas.reduce((total, points) => total + points, 0);
+    }
+}
+
+// The server dropped a change to our team for coming too fast, so the page
+// may show a score or name it never saved. Ask for the saved team again once
+// the server will take more.
+function resyncTeamWhenRateLimited(socket) {
+    const teamEvents = ['increment_score', 'update_score', 'update_team_name', 'get_team_data'];
+    socket.on('rate_limited', data => {
+        if (teamEvents.includes(data.event)) {
+            setTimeout(() => socket.emit('get_team_data'), data.retry_after * 1000);
+        }
+    });
+}
+
 // Toast notification system
 function showToast(message, type = 'info') {
     const toast = document.createElement('div');
@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set before anything imports database or app: a throwaway database, no
+# rate limits, and one broadcast per change so tests see them straight away
+os.environ['DATABASE_FILE'] = os.path.join(tempfile.mkdtemp(prefix='scoreboard-test-'), 'test.db')
+os.environ['RATE_LIMITS'] = 'off'
+os.environ['BROADCAST_INTERVAL'] = '0'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+
+@pytest.fixture(scope='session')
+def scoreboard():
+    """The app module, initialised once for the test session."""
+    import app
+    app.init_app()
+    return app
+
+
+@pytest.fixture
+def game(scoreboard):
+    """A fresh active game, so each test starts with an empty board."""
+    import database as db
+    return db.create_game('Test game', activate=True)
@@ -0,0 +1,75 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history import Rollup  # noqa: E402
+
+
+def make_rollup():
+    rollup = Rollup(10, 3, horizon=0)
+    rollup.add(0, 'a', 1)
+    rollup.add(9.9, 'a', 2)
+    rollup.add(10, 'b', 5)
+    rollup.add(35, 'a', 7)
+    return rollup
+
+
+def test_buckets_keep_the_last_score_and_skip_quiet_periods():
+    rollup = make_rollup()
+    assert [bucket[0] for bucket in rollup.buckets] == [0, 10, 30]
+    assert rollup.buckets[0][1] == {'a': 2}
+
+
+def test_series_carries_values_forward():
+    timestamps, values = make_rollup().series(['a', 'b', 'z'], 0, 44)
+    assert timestamps == [0, 10, 20, 30, 40]
+    assert values == [[2, 2, 2, 7, 7], [None, 5, 5, 5, 5], [None] * 5]
+
+
+def test_series_snaps_to_bucket_boundaries():
+    timestamps, values = make_rollup().series(['a'], 12, 31)
+    assert timestamps == [10, 20, 30]
+    assert values == [[2, 2, 7]]
+
+
+def test_evicted_buckets_fold_into_the_base():
+    rollup = make_rollup()
+    rollup.add(40, 'c', 3)
+    assert len(rollup.buckets) == 3
+    assert rollup.base == {'a': 2}
+    assert rollup.horizon == 10
+    # Nothing before the horizon is returned, and the base carries on
+    timestamps, values = rollup.series(['a', 'b', 'c'], 0, 40)
+    assert timestamps == [10, 20, 30, 40]
+    assert values == [[2, 2, 7, 7], [5, 5, 5, 5], [None, None, None, 3]]
+
+
+def test_late_events_land_in_the_newest_bucket():
+    rollup = make_rollup()
+    rollup.add(15, 'b', 6)
+    assert rollup.series(['b'], 30, 30) == ([30], [[6]])
+
+
+def test_clear_drops_earlier_scores():
+    rollup = make_rollup()
+    rollup.add(50, None, None, clear=True)
+    rollup.add(51, 'b', 1)
+    timestamps, values = rollup.series(['a', 'b'], 40, 50)
+    assert values == [[7, None], [5, 1]]
+
+    # An evicted clear empties the base
+    rollup = Rollup(10, 1, horizon=0)
+    rollup.add(0, 'a', 1)
+    rollup.add(15, None, None, clear=True)
+    rollup.add(20, 'c', 2)
+    assert rollup.base == {}
+    assert rollup.series(['a', 'c'], 0, 20) == ([20], [[None], [2]])
+
+
+def test_removed_teams_leave_the_base():
+    rollup = Rollup(10, 1, horizon=0)
+    rollup.add(0, 'a', 1)
+    rollup.add(10, 'a', None)
+    rollup.add(20, 'b', 2)
+    assert rollup.base == {}
@@ -0,0 +1,94 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from leaderboard import Leaderboard, Leaderboards  # noqa: E402
+
+
+def team(team_id, score, created_at='2024-01-01 00:00:00', game_id='g1', name=None):
+    return {'id': team_id, 'name': name or team_id.upper(), 'score': score,
+            'is_locked': 0, 'created_at': created_at, 'game_id': game_id}
+
+
+def ids(teams):
+    return [t['id'] for t in teams]
+
+
+def make_board():
+    board = Leaderboard()
+    board.load([
+        team('a', 10, '2024-01-01 00:00:03'),
+        team('b', 30, '2024-01-01 00:00:02'),
+        team('c', 20, '2024-01-01 00:00:01'),
+        team('d', 20, '2024-01-01 00:00:00'),
+        team('e', 5, '2024-01-01 00:00:04'),
+    ])
+    return board
+
+
+def test_orders_by_score_then_join_time():
+    board = make_board()
+    # c and d tie on 20; d joined first
+    assert ids(board.teams()) == ['b', 'd', 'c', 'a', 'e']
+    assert [board.rank(t) for t in 'bdcae'] == [1, 2, 3, 4, 5]
+    assert board.rank('missing') is None
+
+
+def test_ties_on_score_and_time_break_by_id():
+    board = Leaderboard()
+    board.load([team('y', 1), team('x', 1)])
+    assert ids(board.teams()) == ['x', 'y']
+
+
+def test_upsert_moves_a_team_and_keeps_totals():
+    board = make_board()
+    version = board.version
+    board.upsert(team('e', 40, '2024-01-01 00:00:04'))
+    assert ids(board.teams()) == ['e', 'b', 'd', 'c', 'a']
+    assert board.version == version + 1
+    assert board.summary() == {'team_count': 5, 'total_score': 120,
+                               'top_team': {'name': 'E', 'score': 40}}
+    assert board.remove('e') and not board.remove('e')
+    assert board.summary()['total_score'] == 80
+
+
+def test_top():
+    board = make_board()
+    assert ids(board.top(3)) == ['b', 'd', 'c']
+    assert ids(board.top(100)) == ['b', 'd', 'c', 'a', 'e']
+    assert board.top(0) == []
+
+
+def test_window():
+    board = make_board()
+    assert board.window('c', 1) == (2, [board.get('d'), board.get('c'), board.get('a')])
+    # Clipped at either end of the board
+    first, teams = board.window('b', 2)
+    assert (first, ids(teams)) == (1, ['b', 'd', 'c'])
+    first, teams = board.window('e', 2)
+    assert (first, ids(teams)) == (3, ['c', 'a', 'e'])
+    assert board.window('missing', 2) == (None, [])
+
+
+def test_rows_are_copies():
+    board = make_board()
+    board.get('a')['score'] = 999
+    board.top(1)[0]['score'] = 999
+    assert board.get('a')['score'] == 10
+    assert board.top(1)[0]['score'] == 30
+
+
+def test_boards_are_per_game():
+    boards = Leaderboards()
+    boards.load([team('a', 1, game_id='g1'), team('b', 2, game_id='g2')], game_ids=['g1', 'g2', 'g3'])
+    assert ids(boards.board('g1').teams()) == ['a']
+    assert len(boards.board('g3')) == 0
+    assert boards.game_of('b') == 'g2'
+
+    boards.upsert(team('c', 5, game_id='g1'))
+    assert ids(boards.board('g1').teams()) == ['c', 'a']
+    boards.drop('g1')
+    assert boards.get('a') is None and boards.game_of('c') is None
+    assert len(boards.board('g1')) == 0
+    assert len(boards) == 1
@@ -0,0 +1,90 @@
+def received(client, name):
+    return [message['args'][0] for message in client.get_received() if message['name'] == name]
+
+
+def player(scoreboard, name):
+    http = scoreboard.app.test_client()
+    http.get('/join')
+    client = scoreboard.socketio.test_client(scoreboard.app, flask_test_client=http, auth={'view': 'player'})
+    client.emit('join_game', {'team_name': name})
+    team_id = received(client, 'team_joined')[0]['team_id']
+    return client, team_id
+
+
+class BoardMirror:
+    """What LeaderboardState in static/js/app.js does with snapshots and patches."""
+
+    def __init__(self, snapshot):
+        self.teams = {team['id']: dict(team) for team in snapshot['teams']}
+        self.seq = snapshot['seq']
+        self.missed = False
+
+    def apply(self, patch):
+        if patch['seq'] <= self.seq:
+            return
+        if patch['base'] > self.seq:
+            self.missed = True
+            return
+        for team_id in patch['removed']:
+            self.teams.pop(team_id, None)
+        for row in patch['teams']:
+            self.teams.setdefault(row['id'], {}).update(row)
+        self.seq = patch['seq']
+
+    def scores(self):
+        return {team_id: team['score'] for team_id, team in self.teams.items()}
+
+
+def test_patches_chain_from_the_snapshot_and_rebuild_the_board(scoreboard, game):
+    display = scoreboard.socketio.test_client(scoreboard.app, auth={'view': 'display', 'game': game})
+    display.get_received()
+    display.emit('request_leaderboard')
+    mirror = BoardMirror(received(display, 'leaderboard_update')[0])
+
+    foxes, foxes_id = player(scoreboard, 'Foxes')
+    owls, owls_id = player(scoreboard, 'Owls')
+    foxes.emit('increment_score', {'deltas': [1, 0.5]})
+    owls.emit('update_score', {'score': 4})
+    foxes.emit('increment_score', {'delta': 5})
+
+    patches = received(display, 'leaderboard_patch')
+    assert patches
+    seq = mirror.seq
+    for patch in patches:
+        # Each patch applies on top of exactly the previous one
+        assert patch['base'] == seq and patch['seq'] == seq + 1
+        seq = patch['seq']
+        mirror.apply(patch)
+    assert not mirror.missed
+    assert mirror.scores() == {foxes_id: 6.5, owls_id: 4.0}
+
+    # Changed rows carry their rank at the time: Owls led 4 to 1.5 until Foxes' +5
+    ranks = [{row['id']: row['rank'] for row in patch['teams']} for patch in patches]
+    assert ranks[-2:] == [{owls_id: 1}, {foxes_id: 1}]
+
+    display.emit('request_leaderboard')
+    snapshot = received(display, 'leaderboard_update')[0]
+    assert snapshot['seq'] == mirror.seq
+    assert {team['id']: team['score'] for team in snapshot['teams']} == mirror.scores()
+
+
+def test_removed_teams_and_gaps(scoreboard, game):
+    display = scoreboard.socketio.test_client(scoreboard.app, auth={'view': 'display', 'game': game})
+    display.emit('request_leaderboard')
+    mirror = BoardMirror(received(display, 'leaderboard_update')[0])
+
+    _, team_id = player(scoreboard, 'Bats')
+    admin = scoreboard.socketio.test_client(scoreboard.app, auth={'view': 'admin', 'game': game})
+    admin.emit('delete_team', {'team_id': team_id})
+
+    patches = received(display, 'leaderboard_patch')
+    assert len(patches) == 2  # the join, then the delete
+    assert patches[-1]['removed'] == [team_id]
+    for patch in patches:
+        mirror.apply(patch)
+    assert mirror.scores() == {}
+
+    # A client that skipped a patch sees base > its seq and asks for a snapshot
+    stale = BoardMirror({'teams': [], 'seq': patches[0]['base']})
+    stale.apply(patches[-1])
+    assert stale.missed
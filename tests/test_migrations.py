@@ -0,0 +1,118 @@
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations  # noqa: E402
+
+
+@pytest.fixture
+def legacy_db(tmp_path):
+    """A database as the app left it before schema versioning (user_version 0).
+
+    Integer scores, no is_locked or players_locked columns, and team names
+    that only differ in case.
+    """
+    conn = sqlite3.connect(tmp_path / 'legacy.db')
+    conn.row_factory = sqlite3.Row
+    conn.executescript('''
+        CREATE TABLE teams (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            score INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE games (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            is_active BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        INSERT INTO games (id, name, is_active, created_at) VALUES
+            ('old', 'Old game', 0, '2024-01-01 00:00:00'),
+            ('live', 'Live game', 1, '2024-01-02 00:00:00');
+        INSERT INTO teams (id, name, score, created_at) VALUES
+            ('t1', 'Owls', 3, '2024-01-02 10:00:00'),
+            ('t2', 'owls', 5, '2024-01-02 10:00:01'),
+            ('t3', 'OWLS', 1, '2024-01-02 10:00:02'),
+            ('t4', 'Owls (2)', 2, '2024-01-02 09:00:00'),
+            ('t5', 'Foxes', 4, '2024-01-02 10:00:03');
+    ''')
+    yield conn
+    conn.close()
+
+
+def columns(conn, table):
+    return {row['name']: row['type'] for row in conn.execute(f'PRAGMA table_info({table})')}
+
+
+def test_migrates_a_legacy_database(legacy_db):
+    assert migrations.get_version(legacy_db) == 0
+    assert migrations.migrate(legacy_db) == [1, 2]
+    assert migrations.get_version(legacy_db) == migrations.SCHEMA_VERSION
+
+    # Case-only duplicates are suffixed; the oldest keeps its name and
+    # suffixes that are already taken are skipped
+    names = dict(legacy_db.execute('SELECT id, name FROM teams'))
+    assert names == {'t1': 'Owls', 't2': 'owls (3)', 't3': 'OWLS (4)', 't4': 'Owls (2)', 't5': 'Foxes'}
+
+    assert columns(legacy_db, 'teams')['score'] == 'REAL'
+    assert {'is_locked', 'game_id'} <= set(columns(legacy_db, 'teams'))
+    assert {'players_locked', 'archived_at'} <= set(columns(legacy_db, 'games'))
+    assert dict(legacy_db.execute('SELECT id, score FROM teams')) == {'t1': 3, 't2': 5, 't3': 1, 't4': 2, 't5': 4}
+
+    # Existing teams join the active game, which stays the only active one
+    assert {row[0] for row in legacy_db.execute('SELECT game_id FROM teams')} == {'live'}
+    assert [row[0] for row in legacy_db.execute('SELECT id FROM games WHERE is_active')] == ['live']
+
+    # Teams from before the score log are kept in a snapshot
+    snapshot = legacy_db.execute('SELECT event_id, teams FROM score_snapshots').fetchall()
+    assert len(snapshot) == 1 and snapshot[0]['event_id'] == 0
+    assert {team['id']: team['score'] for team in json.loads(snapshot[0]['teams'])}['t2'] == 5
+
+    # Names are unique per game, regardless of case
+    with pytest.raises(sqlite3.IntegrityError):
+        legacy_db.execute("INSERT INTO teams (id, name, game_id) VALUES ('t6', 'FOXES', 'live')")
+    legacy_db.execute("INSERT INTO teams (id, name, game_id) VALUES ('t6', 'FOXES', 'old')")
+
+
+def test_migrate_is_idempotent(legacy_db):
+    migrations.migrate(legacy_db)
+    schema = legacy_db.execute('SELECT type, name, sql FROM sqlite_master ORDER BY name').fetchall()
+    teams = legacy_db.execute('SELECT * FROM teams ORDER BY id').fetchall()
+
+    assert migrations.migrate(legacy_db) == []
+    assert legacy_db.execute('SELECT type, name, sql FROM sqlite_master ORDER BY name').fetchall() == schema
+    assert legacy_db.execute('SELECT * FROM teams ORDER BY id').fetchall() == teams
+
+
+def test_creates_a_new_database(tmp_path):
+    conn = sqlite3.connect(tmp_path / 'new.db')
+    conn.row_factory = sqlite3.Row
+    assert migrations.migrate(conn) == [1, 2]
+    games = conn.execute('SELECT name, is_active FROM games').fetchall()
+    assert [tuple(game) for game in games] == [('Birthday Game', 1)]
+    assert not conn.execute('SELECT 1 FROM score_snapshots').fetchone()
+    assert migrations.migrate(conn) == []
+    conn.close()
+
+
+def test_a_failed_migration_leaves_the_version_alone(tmp_path, monkeypatch):
+    def broken(conn):
+        conn.execute('CREATE TABLE half_done (id INTEGER)')
+        raise RuntimeError('boom')
+
+    monkeypatch.setattr(migrations, 'MIGRATIONS', migrations.MIGRATIONS + [(3, 'broken', broken)])
+    monkeypatch.setattr(migrations, 'SCHEMA_VERSION', 3)
+    conn = sqlite3.connect(tmp_path / 'broken.db')
+    conn.row_factory = sqlite3.Row
+    with pytest.raises(RuntimeError):
+        migrations.migrate(conn)
+    assert migrations.get_version(conn) == 2
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone()
+    conn.close()
@@ -0,0 +1,71 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import eventlet
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from offload import Offloader, on_hub  # noqa: E402
+
+
+def test_runs_inline_off_the_hub():
+    offloader = Offloader()
+    assert not on_hub()
+    assert offloader.run(lambda: 42) == 42
+    assert offloader.calls == 0
+
+
+def test_offloads_from_a_hub_in_another_thread():
+    # The debug reloader serves from a thread that isn't the main one
+    offloader = Offloader()
+    results = []
+
+    def serve():
+        pool = eventlet.GreenPool()
+        pool.spawn_n(lambda: results.append((on_hub(), offloader.run(lambda: 42))))
+        pool.waitall()
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    thread.join()
+    assert results == [(True, 42)]
+    assert offloader.calls == 1
+
+
+def get_json(url):
+    with urllib.request.urlopen(url, timeout=2) as response:
+        return json.load(response)
+
+
+def test_app_offloads_under_the_reloader():
+    temp_dir = tempfile.mkdtemp(prefix='scoreboard-test-')
+    port = 18280
+    env = dict(os.environ, DATABASE_FILE=os.path.join(temp_dir, 'test.db'), PORT=str(port))
+    server = subprocess.Popen([sys.executable, 'app.py'], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    url = f'http://127.0.0.1:{port}'
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                before = get_json(url + '/api/hub-stats')['offload']['calls']
+                break
+            except OSError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.2)
+        # A new session misses the session store's cache, which reads SQLite
+        urllib.request.urlopen(url + '/join', timeout=2).read()
+        assert get_json(url + '/api/hub-stats')['offload']['calls'] > before
+    finally:
+        # Also stops the reloader's child, which serves the requests
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait(10)
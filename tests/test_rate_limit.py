@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limit import RateLimiter, parse_limits  # noqa: E402
+
+
+def test_bucket_refills_at_its_rate():
+    now = [0.0]
+    limiter = RateLimiter({'e': (1, 2)}, clock=lambda: now[0])
+    assert [limiter.allow('e', 'k') for _ in range(3)] == [True, True, False]
+    assert limiter.retry_after('e', 'k') == pytest.approx(1.0)
+    now[0] += 1
+    assert limiter.allow('e', 'k')
+    assert limiter.allow('other', 'k')
+
+
+def test_evicts_down_to_max_buckets():
+    limiter = RateLimiter({'e': (1, 5)}, max_buckets=1)
+    for key in 'abcabc':
+        assert limiter.allow('e', key)
+    assert len(limiter) == 1
+    assert limiter.evicted == 5
+
+
+def test_rejects_max_buckets_below_one():
+    with pytest.raises(ValueError):
+        RateLimiter({'e': (1, 5)}, max_buckets=0)
+
+
+def test_parse_limits():
+    limits = parse_limits('increment_score=20/40, join_game=0')
+    assert limits['increment_score'] == (20.0, 40.0)
+    assert 'join_game' not in limits
+    assert parse_limits('off') == {}
@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+
+def scores_at(db, timestamp, game_id):
+    return {team['name']: team['score'] for team in db.get_teams_at(timestamp) if team['game_id'] == game_id}
+
+
+def pause():
+    # Events and snapshots are stamped with time.time(); keep moments apart
+    time.sleep(0.01)
+    moment = time.time()
+    time.sleep(0.01)
+    return moment
+
+
+@pytest.mark.parametrize('snapshot_every', [1, 3, 10000])
+def test_get_teams_at_replays_from_the_nearest_snapshot(scoreboard, game, monkeypatch, snapshot_every):
+    import database as db
+    monkeypatch.setattr(db.score_log, 'snapshot_every', snapshot_every)
+    snapshots = db.score_log.snapshots
+
+    before = pause()
+    ants = db.create_team('Ants', game)['id']
+    bees = db.create_team('Bees', game)['id']
+    db.update_team_score(ants, 5)
+    db.increment_team_score(bees, 2)
+    first = pause()
+    db.increment_team_score(ants, 1.5)
+    db.update_team(bees, name='Wasps', score=9)
+    db.create_team('Moths', game)
+    second = pause()
+    db.delete_team(ants)
+    db.increment_team_score(bees, 1)
+
+    assert scores_at(db, before, game) == {}
+    assert scores_at(db, first, game) == {'Ants': 5, 'Bees': 2}
+    assert scores_at(db, second, game) == {'Ants': 6.5, 'Wasps': 9, 'Moths': 0}
+    assert scores_at(db, time.time(), game) == {'Wasps': 10, 'Moths': 0}
+    assert {team['name']: team['score'] for team in db.get_all_teams(game)} == {'Wasps': 10, 'Moths': 0}
+    if snapshot_every < 10000:
+        assert db.score_log.snapshots > snapshots
+
+
+def test_teams_at_a_moment_come_back_ranked(scoreboard, game):
+    import database as db
+    for name, score in (('Low', 1), ('High', 3), ('Mid', 2)):
+        db.update_team_score(db.create_team(name, game)['id'], score)
+    teams = [team for team in db.get_teams_at(time.time()) if team['game_id'] == game]
+    assert [team['name'] for team in teams] == ['High', 'Mid', 'Low']
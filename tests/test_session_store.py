@@ -0,0 +1,78 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_store import RedisSessionStore  # noqa: E402
+
+
+class LocalRedis:
+    """In-process stand-in for the part of redis.Redis the store uses.
+
+    Values come back as bytes and keys set with ``ex`` expire, as in Redis.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.data = {}
+        self.expiry = {}
+
+    def _expire(self, name):
+        if name in self.expiry and self.expiry[name] <= self.now:
+            del self.data[name]
+            del self.expiry[name]
+
+    def get(self, name):
+        self._expire(name)
+        return self.data.get(name)
+
+    def set(self, name, value, ex=None):
+        self.data[name] = str(value).encode()
+        if ex is None:
+            self.expiry.pop(name, None)
+        else:
+            self.expiry[name] = self.now + ex
+
+    def delete(self, name):
+        self.expiry.pop(name, None)
+        return int(self.data.pop(name, None) is not None)
+
+
+def test_get_set_delete():
+    client = LocalRedis()
+    store = RedisSessionStore(client)
+    assert store.get('s1') is None
+    store.set('s1', 'team-a')
+    assert store.get('s1') == 'team-a'
+    assert 'scoreboard:session:s1' in client.data
+    store.set('s1', 'team-b')
+    assert store.get('s1') == 'team-b'
+    store.delete('s1')
+    assert store.get('s1') is None
+    store.delete('s1')
+
+
+def test_sessions_expire_after_ttl():
+    client = LocalRedis()
+    store = RedisSessionStore(client, ttl=60)
+    store.set('s1', 'team-a')
+    client.now = 59
+    assert store.get('s1') == 'team-a'
+    client.now = 60
+    assert store.get('s1') is None
+
+
+def test_set_restarts_the_ttl():
+    client = LocalRedis()
+    store = RedisSessionStore(client, ttl=60)
+    store.set('s1', 'team-a')
+    client.now = 50
+    store.set('s1', 'team-a')
+    client.now = 100
+    assert store.get('s1') == 'team-a'
+
+
+def test_cached_never_answers():
+    store = RedisSessionStore(LocalRedis())
+    store.set('s1', 'team-a')
+    assert store.cached('s1') is None
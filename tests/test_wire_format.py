@@ -0,0 +1,85 @@
+import json
+
+import wire_format
+
+
+def team_rows(data):
+    """What teamRows in static/js/app.js does with either format."""
+    if 'columns' not in data:
+        return data['teams']
+    count = len(data['teams'][0]) if data['teams'] else 0
+    return [{column: data['teams'][j][i] for j, column in enumerate(data['columns'])} for i in range(count)]
+
+
+def expected(rows, columns):
+    """``rows`` cut down to the compact columns, with is_locked as 0/1."""
+    return [{column: int(row[column]) if column == 'is_locked' else row[column] for column in columns}
+            for row in rows]
+
+
+def team(team_id, name, score, is_locked=False, rank=None):
+    row = {'id': team_id, 'name': name, 'score': score, 'is_locked': is_locked,
+           'created_at': '2024-01-01 00:00:00'}
+    if rank is not None:
+        row['rank'] = rank
+    return row
+
+
+def as_sent(payload):
+    """A JSON round trip, as Socket.IO delivers it."""
+    return json.loads(json.dumps(payload))
+
+
+def test_snapshot_round_trip():
+    payload = {'seq': 7, 'teams': [team('a1', 'Foxes', 12.5), team('b2', 'Owls', 9, is_locked=True)]}
+    compact = as_sent(wire_format.compact_snapshot(payload))
+    assert compact['seq'] == 7
+    assert compact['teams'][2] == [12.5, 9]
+    # Same rows, in the same order; is_locked arrives as 0/1
+    assert team_rows(compact) == expected(payload['teams'], wire_format.SNAPSHOT_COLUMNS)
+    assert team_rows(compact)[1]['is_locked'] == 1
+
+
+def test_patch_round_trip():
+    payload = {'base': 3, 'seq': 4, 'teams': [team('b2', 'Owls', 10, rank=1)], 'removed': ['c3']}
+    compact = as_sent(wire_format.compact_patch(payload))
+    assert (compact['base'], compact['seq'], compact['removed']) == (3, 4, ['c3'])
+    assert team_rows(compact) == expected(payload['teams'], wire_format.PATCH_COLUMNS)
+
+
+def test_empty_payloads():
+    assert team_rows(wire_format.compact_snapshot({'seq': 0, 'teams': []})) == []
+    patch = wire_format.compact_patch({'base': 0, 'seq': 1, 'teams': [], 'removed': ['a1']})
+    assert team_rows(patch) == [] and patch['removed'] == ['a1']
+
+
+def test_displays_get_the_same_board_in_either_format(scoreboard, game):
+    import database as db
+    displays = {
+        fmt: scoreboard.socketio.test_client(scoreboard.app, auth={'view': 'display', 'format': fmt, 'game': game})
+        for fmt in wire_format.FORMATS
+    }
+    for client in displays.values():
+        client.get_received()
+    team_id = db.create_team('Herons', game)['id']
+    scoreboard.broadcaster.mark_dirty(game, changed=[team_id])
+    db.update_team_score(team_id, 3)
+    scoreboard.broadcaster.mark_dirty(game, changed=[team_id])
+
+    received = {}
+    for fmt, client in displays.items():
+        client.emit('request_leaderboard')
+        messages = client.get_received()
+        received[fmt] = {
+            name: [message['args'][0] for message in messages if message['name'] == name]
+            for name in ('leaderboard_patch', 'leaderboard_update')
+        }
+    json_patches, compact_patches = received['json']['leaderboard_patch'], received['compact']['leaderboard_patch']
+    assert len(json_patches) == len(compact_patches) == 2
+    for plain, compact in zip(json_patches, compact_patches):
+        assert (plain['base'], plain['seq']) == (compact['base'], compact['seq'])
+        assert team_rows(compact) == expected(plain['teams'], wire_format.PATCH_COLUMNS)
+    plain, compact = received['json']['leaderboard_update'][0], received['compact']['leaderboard_update'][0]
+    assert compact['seq'] == plain['seq']
+    # Compact snapshots leave out the columns displays don't use
+    assert team_rows(compact) == expected(plain['teams'], wire_format.SNAPSHOT_COLUMNS)
@@ -0,0 +1,43 @@
+"""Compact, columnar encoding of leaderboard payloads.
+
+The default ('json') payloads are lists of team objects, so every row
+repeats the same keys. A client that connects with ``format: 'compact'``
+gets the same data as one array per field instead, named once in
+``columns``:
+
+    {"seq": 7, "columns": ["id", "name", "score", "is_locked", "created_at"],
+     "teams": [["a1", "b2"], ["Foxes", "Owls"], [12.5, 9], [0, 1], [...]]}
+
+Rows keep leaderboard order. Patches carry a ``rank`` column as well.
+"""
+
+FORMATS = ('json', 'compact')
+
+SNAPSHOT_COLUMNS = ('id', 'name', 'score', 'is_locked', 'created_at')
+PATCH_COLUMNS = SNAPSHOT_COLUMNS + ('rank',)
+
+
+def to_columns(rows, columns):
+    """One list per column; booleans become 0/1."""
+    return [
+        [int(row[column]) if column == 'is_locked' else row[column] for row in rows]
+        for column in columns
+    ]
+
+
+def compact_snapshot(payload):
+    return {
+        'seq': payload['seq'],
+        'columns': list(SNAPSHOT_COLUMNS),
+        'teams': to_columns(payload['teams'], SNAPSHOT_COLUMNS)
+    }
+
+
+def compact_patch(payload):
+    return {
+        'base': payload['base'],
+        'seq': payload['seq'],
+        'columns': list(PATCH_COLUMNS),
+        'teams': to_columns(payload['teams'], PATCH_COLUMNS),
+        'removed': payload['removed']
+    }